@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, cast
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.parcels.models import Parcel
+from apps.parcels.services.analysis import (
+    apply_climate_batch,
+    apply_soil,
+    fetch_soil,
+    record_fingerprint,
+)
+from apps.parcels.services.http_clients import set_rate_limit
+from apps.parcels.services.macrostrat import MacrostratError
+from apps.parcels.services.soilgrids import SoilData, max_requests_per_lookup
+from apps.parcels.services.threads import in_worker
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_WORKERS = 8
+# ISRIC's fair-use limit for the SoilGrids REST API is 5 calls per minute.
+DEFAULT_SOILGRIDS_RATE = 5 / 60
+DEFAULT_MACROSTRAT_RATE = 2.0
+
+UPDATE_FIELDS = [
+    "climate_zone",
+    "climate_approximate",
+    "climate_trajectory",
+    "climate_zone_shares",
+    "soil_ph",
+    "soil_drainage",
+    "soil_source",
+    "soil_approximate",
+    "analysis_fingerprint",
+    "updated_at",
+]
+
+
+def _lookup_soil(parcel: Parcel, deadline_seconds: float) -> tuple[SoilData, str] | None:
+    # Only located parcels are selected.
+    try:
+        return fetch_soil(
+            cast(float, parcel.latitude), cast(float, parcel.longitude), deadline_seconds=deadline_seconds,
+        )
+    except MacrostratError:
+        return None
+
+
+def _soil_deadline_seconds(workers: int, soilgrids_rate: float) -> float:
+    """Long enough for a lookup queued behind every other worker's SoilGrids requests."""
+    queued = workers * max_requests_per_lookup() / soilgrids_rate
+    return queued + settings.SOIL_LOOKUP_DEADLINE_SECONDS
+
+
+class Command(BaseCommand):
+    help = "Recompute climate and soil for every located parcel, e.g. after a dataset update."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent soil lookups.")
+        parser.add_argument(
+            "--soilgrids-rate", type=float, default=DEFAULT_SOILGRIDS_RATE,
+            help="Max SoilGrids requests per second, shared by all processes.",
+        )
+        parser.add_argument(
+            "--macrostrat-rate", type=float, default=DEFAULT_MACROSTRAT_RATE,
+            help="Max Macrostrat requests per second, shared by all processes.",
+        )
+        parser.add_argument("--skip-soil", action="store_true", help="Only refresh climate zones.")
+        parser.add_argument(
+            "--checkpoint", type=Path,
+            help="File holding the last finished parcel id; an existing one resumes the run.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        checkpoint: Path | None = options["checkpoint"]
+        last_pk = int(checkpoint.read_text()) if checkpoint and checkpoint.exists() else 0
+        if last_pk:
+            self.stdout.write(f"Resuming after parcel {last_pk}.")
+
+        processed = climate_errors = soil_errors = 0
+        started = time.monotonic()
+        set_rate_limit("soilgrids", options["soilgrids_rate"])
+        set_rate_limit("macrostrat", options["macrostrat_rate"])
+        workers = max(options["workers"], 1)
+        soil_deadline = _soil_deadline_seconds(workers, options["soilgrids_rate"])
+        lookup_soil = partial(_lookup_soil, deadline_seconds=soil_deadline)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            while True:
+                # Keyset pagination: each chunk starts after the last id, so
+                # the cost per chunk stays flat however far the run has got.
+                chunk = list(
+                    Parcel.objects.filter(pk__gt=last_pk, latitude__isnull=False, longitude__isnull=False)
+                    .order_by("pk")[:options["chunk_size"]]
+                )
+                if not chunk:
+                    break
+
+                failed = {parcel.pk for parcel in apply_climate_batch(chunk)}
+                climate_errors += len(failed)
+                if not options["skip_soil"]:
+                    soil_results = executor.map(partial(in_worker, lookup_soil), chunk)
+                    for parcel, soil in zip(chunk, soil_results):
+                        if soil is None:
+                            soil_errors += 1
+                            failed.add(parcel.pk)
+                        else:
+                            apply_soil(parcel, *soil)
+
+                now = timezone.now()
+                for parcel in chunk:
+                    if parcel.pk in failed:
+                        parcel.analysis_fingerprint = ""
+                    else:
+                        record_fingerprint(parcel)
+                    parcel.updated_at = now
+                Parcel.objects.bulk_update(chunk, UPDATE_FIELDS)
+
+                last_pk = chunk[-1].pk
+                if checkpoint:
+                    checkpoint.write_text(str(last_pk))
+                processed += len(chunk)
+                self._report(processed, started, climate_errors, soil_errors)
+        finally:
+            executor.shutdown()
+            set_rate_limit("soilgrids", None)
+            set_rate_limit("macrostrat", None)
+
+        if checkpoint:
+            checkpoint.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    def _report(self, processed: int, started: float, climate_errors: int, soil_errors: int) -> None:
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(
+            f"{processed} parcels ({processed / elapsed:.1f}/s), "
+            f"{climate_errors} without climate data, {soil_errors} soil lookups failed"
+        )
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import threading
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.parcels.services.jobs import process_jobs
+from apps.parcels.services.threads import in_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued parcel analyses until interrupted."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.ANALYSIS_WORKER_CONCURRENCY,
+            help="Number of jobs to run at once.",
+        )
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        concurrency = max(options["concurrency"], 1)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        futures = [executor.submit(in_worker, process_jobs, stop, options["once"]) for _ in range(concurrency)]
+        try:
+            processed = sum(future.result() for future in futures)
+        except KeyboardInterrupt:
+            # Let every thread finish its current job before exiting.
+            stop.set()
+            processed = sum(future.result() for future in futures)
+        finally:
+            executor.shutdown()
+        self.stdout.write(f"Processed {processed} analysis jobs.")
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parcels", "0004_parcel_soil_source"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parcel",
+            name="climate_zone_shares",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
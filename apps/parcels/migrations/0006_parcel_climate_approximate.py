@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parcels", "0005_parcel_climate_zone_shares"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parcel",
+            name="climate_approximate",
+            field=models.BooleanField(default=False),
+        ),
+    ]
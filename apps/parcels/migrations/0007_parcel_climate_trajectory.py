@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parcels", "0006_parcel_climate_approximate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parcel",
+            name="climate_trajectory",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parcels", "0007_parcel_climate_trajectory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SoilCell",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("lat_index", models.IntegerField()),
+                ("lon_index", models.IntegerField()),
+                ("ph", models.FloatField(blank=True, null=True)),
+                ("clay", models.FloatField(blank=True, null=True)),
+                ("sand", models.FloatField(blank=True, null=True)),
+                ("fetched_at", models.DateTimeField()),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("lat_index", "lon_index"), name="unique_soil_cell")],
+            },
+        ),
+    ]
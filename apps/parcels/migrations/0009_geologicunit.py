@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parcels", "0008_soilcell"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeologicUnit",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("map_id", models.IntegerField(unique=True)),
+                ("lith", models.TextField()),
+                ("geometry", models.JSONField()),
+                ("min_lat", models.FloatField()),
+                ("max_lat", models.FloatField()),
+                ("min_lon", models.FloatField()),
+                ("max_lon", models.FloatField()),
+                ("fetched_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["min_lat", "max_lat", "min_lon", "max_lon"], name="geologic_unit_bbox")],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parcels", "0010_geocodedaddress_ratelimitbucket"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalysisJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("latitude", models.FloatField()),
+                ("longitude", models.FloatField()),
+                ("status", models.CharField(choices=[("pending", "Pending"), ("running", "Running"), ("done", "Done"), ("failed", "Failed")], default="pending", max_length=10)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("run_after", models.DateTimeField(default=django.utils.timezone.now)),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("parcel", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="analysis_jobs", to="parcels.parcel")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["status", "run_after"], name="analysis_job_due")],
+                "constraints": [models.UniqueConstraint(condition=models.Q(("status__in", ["pending", "running"])), fields=("parcel", "latitude", "longitude"), name="unique_active_analysis_job")],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parcels", "0011_analysisjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parcel",
+            name="analysis_fingerprint",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parcels", "0012_parcel_analysis_fingerprint"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="parcel",
+            index=models.Index(fields=["user", "-created_at", "-id"], name="parcel_user_created"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parcels", "0013_parcel_user_created_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parcel",
+            name="soil_approximate",
+            field=models.BooleanField(default=False),
+        ),
+    ]
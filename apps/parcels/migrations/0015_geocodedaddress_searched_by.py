@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parcels", "0014_parcel_soil_approximate"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="geocodedaddress",
+            name="searched_by",
+            field=models.ManyToManyField(blank=True, related_name="geocoded_addresses", to=settings.AUTH_USER_MODEL),
+        ),
+    ]
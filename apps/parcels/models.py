@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class Parcel(models.Model):
@@ -16,12 +17,24 @@ class Parcel(models.Model):
     polygon = models.JSONField(null=True, blank=True)
     area_m2 = models.FloatField(null=True, blank=True)
     climate_zone = models.CharField(max_length=100, blank=True)
+    climate_zone_shares = models.JSONField(default=dict, blank=True)
+    climate_approximate = models.BooleanField(default=False)
+    climate_trajectory = models.JSONField(default=dict, blank=True)
     soil_ph = models.FloatField(null=True, blank=True)
     soil_drainage = models.CharField(max_length=50, blank=True)
     soil_source = models.CharField(max_length=20, blank=True)
+    soil_approximate = models.BooleanField(default=False)
+    # Location and dataset versions the stored profile was computed for.
+    analysis_fingerprint = models.CharField(max_length=64, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Serves the per-user list, newest first, with id as tie-breaker for keyset pages.
+            models.Index(fields=["user", "-created_at", "-id"], name="parcel_user_created"),
+        ]
+
     @property
     def has_complete_profile(self) -> bool:
         return bool(self.climate_zone) and self.soil_ph is not None and bool(self.soil_drainage)
@@ -32,3 +45,108 @@ class Parcel(models.Model):
 
     def __str__(self) -> str:
         return self.name or f"Parcel {self.pk}"
+
+
+class SoilCell(models.Model):
+    """Cached raw SoilGrids values for one quantized grid cell; null values mark nodata."""
+
+    lat_index = models.IntegerField()
+    lon_index = models.IntegerField()
+    ph = models.FloatField(null=True, blank=True)
+    clay = models.FloatField(null=True, blank=True)
+    sand = models.FloatField(null=True, blank=True)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["lat_index", "lon_index"], name="unique_soil_cell"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Soil cell ({self.lat_index}, {self.lon_index})"
+
+
+class GeologicUnit(models.Model):
+    """Macrostrat map unit with its GeoJSON footprint; bbox columns narrow point lookups."""
+
+    map_id = models.IntegerField(unique=True)
+    lith = models.TextField()
+    geometry = models.JSONField()
+    min_lat = models.FloatField()
+    max_lat = models.FloatField()
+    min_lon = models.FloatField()
+    max_lon = models.FloatField()
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["min_lat", "max_lat", "min_lon", "max_lon"], name="geologic_unit_bbox"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Map unit {self.map_id}"
+
+
+class GeocodedAddress(models.Model):
+    """Cached Nominatim answer for a normalized address; null coordinates mark "not found"."""
+
+    normalized_address = models.CharField(max_length=500, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    display_name = models.TextField(blank=True)
+    fetched_at = models.DateTimeField(auto_now=True)
+    # Users who searched this address; type-ahead only offers users their own searches.
+    searched_by = models.ManyToManyField(
+        settings.AUTH_USER_MODEL, related_name="geocoded_addresses", blank=True,
+    )
+
+    def __str__(self) -> str:
+        return self.normalized_address
+
+
+class RateLimitBucket(models.Model):
+    """Token bucket shared by every worker; ``updated_at`` is a Unix timestamp."""
+
+    name = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.FloatField()
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class AnalysisJob(models.Model):
+    """Queued climate and soil analysis of a parcel at the location it had when enqueued."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    parcel = models.ForeignKey(Parcel, on_delete=models.CASCADE, related_name="analysis_jobs")
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Pending: earliest start (retry backoff). Running: lease expiry, after
+    # which another worker may take the job over.
+    run_after = models.DateTimeField(default=timezone.now)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["parcel", "latitude", "longitude"],
+                condition=models.Q(status__in=["pending", "running"]),
+                name="unique_active_analysis_job",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="analysis_job_due"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Analysis of {self.parcel} ({self.status})"
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import NamedTuple
+
+from django.conf import settings
+
+QUEUE_POLL_SECONDS = 0.05
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; ``status`` is 429 for a per-user limit, 503 for overload."""
+
+    def __init__(self, status: int, retry_after: int) -> None:
+        super().__init__(f"Analysis capacity exceeded (HTTP {status})")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionStats(NamedTuple):
+    running: int
+    queued: int
+    rejected: int
+
+
+# Process-wide, shared by every event loop and thread (under WSGI each async
+# view runs on its own loop), so plain counters behind a lock.
+_lock = threading.Lock()
+_running = 0
+_queued = 0
+_rejected = 0
+_per_user: Counter[int] = Counter()
+
+
+def admission_stats() -> AdmissionStats:
+    with _lock:
+        return AdmissionStats(_running, _queued, _rejected)
+
+
+def reset_admission() -> None:
+    global _running, _queued, _rejected
+    with _lock:
+        _running = _queued = _rejected = 0
+        _per_user.clear()
+
+
+def _reject(status: int) -> AdmissionRejected:
+    global _rejected
+    _rejected += 1
+    return AdmissionRejected(status, settings.ANALYSIS_RETRY_AFTER_SECONDS)
+
+
+@asynccontextmanager
+async def admit(user_id: int) -> AsyncIterator[None]:
+    """Hold one of ANALYSIS_MAX_CONCURRENT slots for the duration of an expensive request.
+
+    When all slots are taken, up to ANALYSIS_MAX_QUEUED requests wait for up to
+    ANALYSIS_QUEUE_TIMEOUT_SECONDS; anything beyond that, or beyond
+    ANALYSIS_MAX_PER_USER for one user, is rejected at once so the worker is
+    free for cheap pages. Waiting polls on the event loop and holds no thread.
+    """
+    global _running, _queued
+    with _lock:
+        if _per_user[user_id] >= settings.ANALYSIS_MAX_PER_USER:
+            raise _reject(429)
+        if _running < settings.ANALYSIS_MAX_CONCURRENT:
+            _running += 1
+            state = "running"
+        elif _queued < settings.ANALYSIS_MAX_QUEUED:
+            _queued += 1
+            state = "queued"
+        else:
+            raise _reject(503)
+        _per_user[user_id] += 1
+
+    try:
+        deadline = time.monotonic() + settings.ANALYSIS_QUEUE_TIMEOUT_SECONDS
+        while state == "queued":
+            with _lock:
+                if _running < settings.ANALYSIS_MAX_CONCURRENT:
+                    _queued -= 1
+                    _running += 1
+                    state = "running"
+                elif time.monotonic() >= deadline:
+                    _queued -= 1
+                    state = "rejected"
+                    raise _reject(503)
+            if state == "queued":
+                await asyncio.sleep(QUEUE_POLL_SECONDS)
+        yield
+    finally:
+        with _lock:
+            if state == "running":
+                _running -= 1
+            elif state == "queued":
+                _queued -= 1
+            _per_user[user_id] -= 1
+            if not _per_user[user_id]:
+                del _per_user[user_id]
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+from typing import cast
+
+from django.conf import settings
+
+from apps.parcels.models import Parcel
+from apps.parcels.services.koppen import (
+    KoppenError,
+    KoppenZone,
+    get_koppen_zone,
+    get_koppen_zone_shares,
+    get_koppen_zones,
+    koppen_dataset_version,
+)
+from apps.parcels.services.macrostrat import MacrostratError, get_geology_soil_data
+from apps.parcels.services.soilgrids import SoilData, SoilGridsError, get_soil_data
+from apps.parcels.services.threads import in_worker
+
+# Bump an entry when that dataset is replaced or results are derived from it differently.
+# The Köppen version comes from the grid in use; see koppen_dataset_version().
+DATASET_VERSIONS = {"soilgrids": "2.0", "macrostrat": "2"}
+# ~1 m; GPS jitter on an unchanged location doesn't count as a move.
+FINGERPRINT_DECIMALS = 5
+
+
+def location_fingerprint(parcel: Parcel) -> str:
+    """Hash of everything a stored profile depends on: location, polygon and datasets."""
+    lat = round(parcel.latitude, FINGERPRINT_DECIMALS) if parcel.latitude is not None else None
+    lon = round(parcel.longitude, FINGERPRINT_DECIMALS) if parcel.longitude is not None else None
+    versions = {**DATASET_VERSIONS, "koppen": koppen_dataset_version()}
+    payload = json.dumps([lat, lon, parcel.polygon, versions], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def record_fingerprint(parcel: Parcel) -> None:
+    """Mark a complete profile as current; partial ones stay eligible for a retry."""
+    parcel.analysis_fingerprint = location_fingerprint(parcel) if parcel.has_complete_profile else ""
+
+
+def is_analysis_current(parcel: Parcel) -> bool:
+    return bool(parcel.analysis_fingerprint) and parcel.analysis_fingerprint == location_fingerprint(parcel)
+
+
+def _climate_zone_shares(parcel: Parcel) -> dict[str, float]:
+    if not parcel.polygon:
+        return {}
+    try:
+        return get_koppen_zone_shares(parcel.polygon)
+    except KoppenError:
+        return {}
+
+
+def _set_climate(parcel: Parcel, climate_zone: KoppenZone) -> None:
+    parcel.climate_zone = climate_zone.label
+    parcel.climate_approximate = climate_zone.approximate
+    parcel.climate_trajectory = dict(climate_zone.trajectory)
+    parcel.climate_zone_shares = _climate_zone_shares(parcel)
+
+
+def apply_climate(parcel: Parcel, lat: float, lon: float) -> None:
+    _set_climate(parcel, get_koppen_zone(lat, lon))
+
+
+def apply_climate_batch(parcels: Sequence[Parcel]) -> list[Parcel]:
+    """Set climate on many located parcels from one vectorized raster lookup.
+
+    Returns the parcels without climate data; their fields are left as they were.
+    """
+    lats = [cast(float, parcel.latitude) for parcel in parcels]
+    lons = [cast(float, parcel.longitude) for parcel in parcels]
+    lookup = get_koppen_zones(lats, lons)
+    missing = []
+    for index, parcel in enumerate(parcels):
+        climate_zone = lookup.zone(index)
+        if climate_zone is None:
+            missing.append(parcel)
+        else:
+            _set_climate(parcel, climate_zone)
+    return missing
+
+
+def apply_soil(parcel: Parcel, soil_data: SoilData, source: str) -> None:
+    parcel.soil_ph = soil_data.ph
+    parcel.soil_drainage = soil_data.drainage
+    parcel.soil_source = source
+    parcel.soil_approximate = soil_data.approximate
+
+
+def _remaining(deadline: float) -> float:
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def fetch_soil(
+    lat: float, lon: float, on_fallback: Callable[[], None] | None = None,
+    deadline_seconds: float | None = None,
+) -> tuple[SoilData, str]:
+    """SoilGrids, then Macrostrat, under one shared deadline. Returns (data, source).
+
+    With SOIL_HEDGE_AFTER_SECONDS set, Macrostrat is started alongside once
+    SoilGrids has been pending that long (its p95). The measured result still
+    wins whenever it arrives before the deadline. ``on_fallback`` is called
+    when the Macrostrat lookup starts.
+
+    Bulk runs whose requests queue behind a rate limit pass ``deadline_seconds``
+    sized to that queue instead of SOIL_LOOKUP_DEADLINE_SECONDS. Hedging is
+    then off, so waiting for a slot never trades measured soil for inferred.
+    """
+    notify = on_fallback or (lambda: None)
+    if deadline_seconds is None:
+        deadline = time.monotonic() + settings.SOIL_LOOKUP_DEADLINE_SECONDS
+        hedge_after = settings.SOIL_HEDGE_AFTER_SECONDS
+    else:
+        deadline = time.monotonic() + deadline_seconds
+        hedge_after = None
+    # A sized deadline also lifts SoilGrids' own DEADLINE_SECONDS cap.
+    measure = partial(get_soil_data, lat, lon, deadline=deadline, max_seconds=deadline_seconds)
+    if hedge_after is None:
+        try:
+            return measure(), "measured"
+        except SoilGridsError:
+            notify()
+            return get_geology_soil_data(lat, lon, deadline=deadline), "inferred"
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        measured: Future[SoilData] = executor.submit(in_worker, measure)
+        try:
+            return measured.result(timeout=min(hedge_after, _remaining(deadline))), "measured"
+        except SoilGridsError:
+            notify()
+            return get_geology_soil_data(lat, lon, deadline=deadline), "inferred"
+        except FutureTimeoutError:
+            pass
+
+        notify()
+        inferred: Future[SoilData] = executor.submit(
+            in_worker, get_geology_soil_data, lat, lon, deadline=deadline,
+        )
+        try:
+            return measured.result(timeout=_remaining(deadline)), "measured"
+        except (SoilGridsError, FutureTimeoutError):
+            pass
+        try:
+            return inferred.result(timeout=_remaining(deadline)), "inferred"
+        except FutureTimeoutError as exc:
+            raise MacrostratError("Macrostrat API timed out") from exc
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def analyze_parcel(parcel: Parcel, lat: float, lon: float) -> bool:
+    """Store climate and soil for a location on the parcel; False if soil was unavailable.
+
+    Raises KoppenError when the climate zone cannot be determined.
+    """
+    apply_climate(parcel, lat, lon)
+    try:
+        apply_soil(parcel, *fetch_soil(lat, lon))
+    except MacrostratError:
+        soil_ok = False
+    else:
+        soil_ok = True
+    record_fingerprint(parcel)
+    parcel.save()
+    return soil_ok
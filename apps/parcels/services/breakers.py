@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker for one upstream, shared by every thread in the process.
+
+    While closed, call outcomes are kept for ``window_seconds``. Once at least
+    ``min_calls`` calls in the window failed at ``failure_rate`` or more, the
+    breaker opens and rejects calls for ``cooldown_seconds`` plus a random
+    ``jitter`` share of it, so workers do not retry in lockstep. After that a
+    single trial call is let through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60.0,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        cooldown_seconds: float = 30.0,
+        jitter: float = 0.5,
+    ) -> None:
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._open_until: float | None = None
+        self._trial_started: float | None = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._open_until is None:
+                return "closed"
+            if time.monotonic() < self._open_until:
+                return "open"
+            return "half-open"
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._open_until is None:
+                return True
+            if now < self._open_until:
+                return False
+            # A trial that never reported back is replaced after one cooldown.
+            if self._trial_started is not None and now - self._trial_started < self.cooldown_seconds:
+                return False
+            self._trial_started = now
+            return True
+
+    def record_success(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._open_until is not None:
+                self._open_until = None
+                self._trial_started = None
+                self._outcomes.clear()
+                return
+            self._record(now, True)
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._open_until is not None:
+                self._open(now)
+                return
+            self._record(now, False)
+            failures = sum(not ok for _, ok in self._outcomes)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._open(now)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._open_until = None
+            self._trial_started = None
+            self._outcomes.clear()
+
+    def _record(self, now: float, ok: bool) -> None:
+        self._outcomes.append((now, ok))
+        while self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self, now: float) -> None:
+        self._open_until = now + self.cooldown_seconds * (1 + random.uniform(0, self.jitter))
+        self._trial_started = None
+        self._outcomes.clear()
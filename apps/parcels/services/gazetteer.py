@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import bisect
+import math
+import re
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+from django.conf import settings
+
+EARTH_RADIUS_KM = 6371.0
+LEAF_SIZE = 16
+# Minimum trigram similarity (Jaccard) for a fuzzy match.
+MIN_SIMILARITY = 0.3
+
+# GeoNames dump columns (https://download.geonames.org/export/dump/readme.txt)
+_NAME, _ASCII_NAME, _LAT, _LON, _COUNTRY, _POPULATION = 1, 2, 4, 5, 8, 14
+
+
+class Place(NamedTuple):
+    name: str
+    country: str
+    lat: float
+    lon: float
+    population: int
+
+    @property
+    def display_name(self) -> str:
+        return f"{self.name}, {self.country}" if self.country else self.name
+
+
+def normalize_name(text: str) -> str:
+    """Fold case, punctuation and whitespace so spelling variants compare equal."""
+    folded = re.sub(r"[^\w\s]", " ", text.casefold())
+    return " ".join(folded.split())
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _to_unit_vectors(lats: npt.NDArray[np.float64], lons: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    lat_rad, lon_rad = np.radians(lats), np.radians(lons)
+    return np.column_stack([
+        np.cos(lat_rad) * np.cos(lon_rad),
+        np.cos(lat_rad) * np.sin(lon_rad),
+        np.sin(lat_rad),
+    ])
+
+
+def _join_column(values: Iterable[str]) -> npt.NDArray[np.str_]:
+    # One string per column, each value tab-terminated, instead of a fixed-width slot per row.
+    return np.array("".join(f"{value}\t" for value in values))
+
+
+def _split_column(column: npt.NDArray[np.str_]) -> list[str]:
+    return str(column).split("\t")[:-1]
+
+
+class _KDTree:
+    """Static 3-d tree stored as one permutation array; node of [lo, hi) is its middle index."""
+
+    def __init__(self, points: npt.NDArray[np.float64], order: npt.NDArray[np.int64] | None = None) -> None:
+        self.points = points
+        if order is not None:
+            self.order = order
+            return
+        self.order = np.arange(len(points))
+        stack = [(0, len(points), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                continue
+            mid = (lo + hi) // 2
+            segment = self.order[lo:hi]
+            partition = np.argpartition(points[segment, depth % 3], mid - lo)
+            self.order[lo:hi] = segment[partition]
+            stack.append((lo, mid, depth + 1))
+            stack.append((mid + 1, hi, depth + 1))
+
+    def nearest(self, target: npt.NDArray[np.float64]) -> tuple[int, float]:
+        """Return (index, squared chord distance) of the point closest to ``target``."""
+        best_index, best_distance = -1, math.inf
+        stack: list[tuple[int, int, int, float]] = [(0, len(self.points), 0, 0.0)]
+        while stack:
+            lo, hi, depth, bound = stack.pop()
+            if bound >= best_distance:
+                continue
+            if hi - lo <= LEAF_SIZE:
+                candidates = self.order[lo:hi]
+                distances = ((self.points[candidates] - target) ** 2).sum(axis=1)
+                closest = int(np.argmin(distances))
+                if distances[closest] < best_distance:
+                    best_index, best_distance = int(candidates[closest]), float(distances[closest])
+                continue
+            mid = (lo + hi) // 2
+            node = int(self.order[mid])
+            distance = float(((self.points[node] - target) ** 2).sum())
+            if distance < best_distance:
+                best_index, best_distance = node, distance
+            diff = float(target[depth % 3] - self.points[node, depth % 3])
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            stack.append((*far, depth + 1, diff * diff))
+            stack.append((*near, depth + 1, bound))
+        return best_index, best_distance
+
+
+class Gazetteer:
+    """Array-backed place index: sorted name keys for exact and prefix search,
+    a trigram index for fuzzy search and a k-d tree for reverse lookup."""
+
+    def __init__(
+        self,
+        names: list[str],
+        countries: list[str],
+        lats: npt.NDArray[np.float64],
+        lons: npt.NDArray[np.float64],
+        populations: npt.NDArray[np.int64],
+        aliases: list[str] | None = None,
+    ) -> None:
+        self.names = names
+        self.countries = countries
+        self.lats = lats
+        self.lons = lons
+        self.populations = populations
+
+        normalized = [normalize_name(name) for name in names + (aliases or [])]
+        # An alias that normalizes like its name (most ASCII names) adds no key.
+        pairs = sorted({(key, index % len(names)) for index, key in enumerate(normalized) if key})
+        self.keys = [key for key, _ in pairs]
+        self.key_places = np.array([place for _, place in pairs], dtype=np.int64)
+
+        # Trigram postings as one array sorted by trigram id, sliced per trigram
+        # through ``trigram_starts``; far cheaper to build than a list per trigram.
+        key_trigrams = [_trigrams(key) for key in self.keys]
+        self.key_trigram_counts = np.fromiter(map(len, key_trigrams), dtype=np.int64, count=len(self.keys))
+        self.trigram_ids: dict[str, int] = {}
+        trigram_of_posting = np.fromiter(
+            (self.trigram_ids.setdefault(trigram, len(self.trigram_ids)) for trigrams in key_trigrams for trigram in trigrams),
+            dtype=np.int64, count=int(self.key_trigram_counts.sum()),
+        )
+        order = np.argsort(trigram_of_posting, kind="stable")
+        self.trigram_postings = np.repeat(np.arange(len(self.keys)), self.key_trigram_counts)[order]
+        self.trigram_starts = np.concatenate(
+            [[0], np.cumsum(np.bincount(trigram_of_posting, minlength=len(self.trigram_ids)))],
+        )
+
+        self.tree = _KDTree(_to_unit_vectors(lats, lons))
+
+    @classmethod
+    def from_tsv(cls, path: Path) -> Gazetteer:
+        """Load a GeoNames-style dump (e.g. cities500.txt): one tab-separated place per line."""
+        names: list[str] = []
+        aliases: list[str] = []
+        countries: list[str] = []
+        lats: list[float] = []
+        lons: list[float] = []
+        populations: list[int] = []
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) <= _POPULATION:
+                    continue
+                names.append(fields[_NAME])
+                aliases.append(fields[_ASCII_NAME])
+                countries.append(fields[_COUNTRY])
+                lats.append(float(fields[_LAT]))
+                lons.append(float(fields[_LON]))
+                populations.append(int(fields[_POPULATION] or 0))
+        return cls(
+            names, countries, np.array(lats), np.array(lons),
+            np.array(populations, dtype=np.int64), aliases=aliases,
+        )
+
+    def save(self, path: Path, source_mtime_ns: int) -> None:
+        """Write the built index as plain arrays; ``load`` restores it without rebuilding."""
+        np.savez(
+            path,
+            source_mtime_ns=np.int64(source_mtime_ns),
+            names=_join_column(self.names),
+            countries=_join_column(self.countries),
+            keys=_join_column(self.keys),
+            trigrams=_join_column(self.trigram_ids),
+            lats=self.lats, lons=self.lons, populations=self.populations,
+            key_places=self.key_places, key_trigram_counts=self.key_trigram_counts,
+            trigram_postings=self.trigram_postings, trigram_starts=self.trigram_starts,
+            tree_order=self.tree.order,
+        )
+
+    @classmethod
+    def load(cls, path: Path, source_mtime_ns: int) -> Gazetteer | None:
+        """Index written by ``save``; None if it is missing or built from another file version."""
+        try:
+            arrays = np.load(path, allow_pickle=False)
+        except FileNotFoundError:
+            return None
+        with arrays:
+            if int(arrays["source_mtime_ns"]) != source_mtime_ns:
+                return None
+            gazetteer = cls.__new__(cls)
+            gazetteer.names = _split_column(arrays["names"])
+            gazetteer.countries = _split_column(arrays["countries"])
+            gazetteer.keys = _split_column(arrays["keys"])
+            trigrams = _split_column(arrays["trigrams"])
+            gazetteer.trigram_ids = {trigram: index for index, trigram in enumerate(trigrams)}
+            gazetteer.lats, gazetteer.lons = arrays["lats"], arrays["lons"]
+            gazetteer.populations = arrays["populations"]
+            gazetteer.key_places = arrays["key_places"]
+            gazetteer.key_trigram_counts = arrays["key_trigram_counts"]
+            gazetteer.trigram_postings = arrays["trigram_postings"]
+            gazetteer.trigram_starts = arrays["trigram_starts"]
+            gazetteer.tree = _KDTree(_to_unit_vectors(gazetteer.lats, gazetteer.lons), arrays["tree_order"])
+        return gazetteer
+
+    def _place(self, index: int) -> Place:
+        return Place(
+            self.names[index], self.countries[index],
+            float(self.lats[index]), float(self.lons[index]), int(self.populations[index]),
+        )
+
+    def _ranked(self, places: npt.NDArray[np.int64], limit: int) -> list[Place]:
+        unique = np.unique(places)
+        order = np.argsort(-self.populations[unique], kind="stable")
+        return [self._place(int(index)) for index in unique[order][:limit]]
+
+    def exact(self, query: str) -> Place | None:
+        """Most populous place whose name matches ``query`` after normalization."""
+        key = normalize_name(query)
+        start, stop = bisect.bisect_left(self.keys, key), bisect.bisect_right(self.keys, key)
+        matches = self._ranked(self.key_places[start:stop], limit=1)
+        return matches[0] if key and matches else None
+
+    def prefix(self, query: str, limit: int = 10) -> list[Place]:
+        """Places whose name starts with ``query``, most populous first."""
+        key = normalize_name(query)
+        if not key:
+            return []
+        start = bisect.bisect_left(self.keys, key)
+        stop = bisect.bisect_left(self.keys, key + "\uffff")
+        return self._ranked(self.key_places[start:stop], limit)
+
+    def fuzzy(self, query: str, limit: int = 10) -> list[Place]:
+        """Places whose name shares enough trigrams with ``query``, best match first."""
+        query_trigrams = _trigrams(normalize_name(query))
+        postings = [
+            self.trigram_postings[self.trigram_starts[trigram_id]:self.trigram_starts[trigram_id + 1]]
+            for trigram_id in (self.trigram_ids.get(trigram) for trigram in query_trigrams)
+            if trigram_id is not None
+        ]
+        if not postings:
+            return []
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.keys))
+        candidates = np.flatnonzero(shared)
+        similarity = shared[candidates] / (
+            len(query_trigrams) + self.key_trigram_counts[candidates] - shared[candidates]
+        )
+        keep = similarity >= MIN_SIMILARITY
+        candidates, similarity = candidates[keep], similarity[keep]
+        places = self.key_places[candidates]
+        order = np.lexsort((-self.populations[places], -similarity))
+        seen: dict[int, None] = {}
+        for place in places[order]:
+            seen.setdefault(int(place))
+            if len(seen) == limit:
+                break
+        return [self._place(index) for index in seen]
+
+    def nearest(self, lat: float, lon: float) -> tuple[Place, float]:
+        """Closest place to a point and its great-circle distance in km."""
+        target = _to_unit_vectors(np.array([lat]), np.array([lon]))[0]
+        index, chord_squared = self.tree.nearest(target)
+        distance_km = 2 * math.asin(min(math.sqrt(chord_squared) / 2, 1.0)) * EARTH_RADIUS_KM
+        return self._place(index), distance_km
+
+
+_gazetteer: Gazetteer | None = None
+_gazetteer_mtime_ns: int | None = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer | None:
+    """Load settings.GAZETTEER_PATH once per process; None if the file is absent.
+
+    Uses the prebuilt settings.GAZETTEER_INDEX_PATH when it matches the file
+    (see scripts/build_gazetteer_index.py); building from the file takes seconds.
+    """
+    global _gazetteer, _gazetteer_mtime_ns
+    path = Path(settings.GAZETTEER_PATH)
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _gazetteer_lock:
+        if _gazetteer is None or _gazetteer_mtime_ns != mtime_ns:
+            _gazetteer = Gazetteer.load(Path(settings.GAZETTEER_INDEX_PATH), mtime_ns)
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.from_tsv(path)
+            _gazetteer_mtime_ns = mtime_ns
+        return _gazetteer if _gazetteer.names else None
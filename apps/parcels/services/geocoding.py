@@ -1,23 +1,45 @@
 from __future__ import annotations
 
+from datetime import timedelta
+
 import httpx
+from django.conf import settings
+from django.utils import timezone
+
+from apps.parcels.models import GeocodedAddress
+from apps.parcels.services import rate_limit
+from apps.parcels.services.gazetteer import get_gazetteer, normalize_name
+from apps.parcels.services.http_clients import get_client
 
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
-USER_AGENT = "TreeManagerApp/1.0"
 TIMEOUT_SECONDS = 10
+# Nominatim usage policy: at most one request per second, no bursts.
+NOMINATIM_REQUESTS_PER_SECOND = 1.0
 
 
 class GeocodingError(Exception):
     """Raised when the Nominatim API call fails."""
 
 
-def geocode_address(address: str) -> dict[str, float | str] | None:
-    """Geocode an address using Nominatim. Returns lat/lon/display_name or None."""
+def normalize_address(address: str) -> str:
+    """Fold case, punctuation and whitespace so spelling variants share a cache entry."""
+    return normalize_name(address)[:500]
+
+
+def _search(address: str) -> dict[str, float | str] | None:
     try:
-        response = httpx.get(
+        rate_limit.acquire(
+            "nominatim",
+            rate=NOMINATIM_REQUESTS_PER_SECOND,
+            capacity=1.0,
+            max_wait=settings.NOMINATIM_MAX_WAIT_SECONDS,
+        )
+    except rate_limit.RateLimitExceeded as exc:
+        raise GeocodingError(str(exc)) from exc
+    try:
+        response = get_client("nominatim").get(
             NOMINATIM_URL,
             params={"q": address, "format": "json", "limit": 1},
-            headers={"User-Agent": USER_AGENT},
             timeout=TIMEOUT_SECONDS,
         )
         response.raise_for_status()
@@ -32,3 +54,56 @@ def geocode_address(address: str) -> dict[str, float | str] | None:
         "lon": float(hit["lon"]),
         "display_name": hit["display_name"],
     }
+
+
+def geocode_address(address: str, user_id: int | None = None) -> dict[str, float | str] | None:
+    """Geocode an address using Nominatim. Returns lat/lon/display_name or None.
+
+    A place name found in the local gazetteer is answered without Nominatim,
+    which is only needed for street-level queries. Nominatim answers, "not
+    found" included, are cached by normalized address and shared by all users;
+    ``user_id`` records who searched it, for that user's suggestions only.
+    """
+    gazetteer = get_gazetteer()
+    place = gazetteer.exact(address) if gazetteer is not None else None
+    if place is not None:
+        return {"lat": place.lat, "lon": place.lon, "display_name": place.display_name}
+
+    key = normalize_address(address)
+    cutoff = timezone.now() - timedelta(seconds=settings.GEOCODE_CACHE_TTL_SECONDS)
+    cached = GeocodedAddress.objects.filter(normalized_address=key, fetched_at__gte=cutoff).first()
+    if cached is not None:
+        if user_id is not None:
+            cached.searched_by.add(user_id)
+        if cached.latitude is None or cached.longitude is None:
+            return None
+        return {"lat": cached.latitude, "lon": cached.longitude, "display_name": cached.display_name}
+
+    result = _search(address)
+    stored, _ = GeocodedAddress.objects.update_or_create(
+        normalized_address=key,
+        defaults={
+            "latitude": result["lat"] if result else None,
+            "longitude": result["lon"] if result else None,
+            "display_name": result["display_name"] if result else "",
+        },
+    )
+    if user_id is not None:
+        stored.searched_by.add(user_id)
+    return result
+
+
+def reverse_geocode(lat: float, lon: float) -> dict[str, float | str] | None:
+    """Nearest gazetteer place within GAZETTEER_REVERSE_MAX_KM, or None."""
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return None
+    place, distance_km = gazetteer.nearest(lat, lon)
+    if distance_km > settings.GAZETTEER_REVERSE_MAX_KM:
+        return None
+    return {
+        "lat": place.lat,
+        "lon": place.lon,
+        "display_name": place.display_name,
+        "distance_km": round(distance_km, 1),
+    }
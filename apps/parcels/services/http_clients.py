@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import importlib.util
+import threading
+
+import httpx
+from django.conf import settings
+
+from apps.parcels.services.rate_limit import acquire
+
+DEFAULT_TIMEOUT_SECONDS = 10.0
+KEEPALIVE_EXPIRY_SECONDS = 30.0
+
+_clients: dict[str, httpx.Client] = {}
+_clients_lock = threading.Lock()
+# Requests per second per upstream, for bulk jobs that must stay under fair-use limits.
+_rate_limits: dict[str, float] = {}
+
+
+def set_rate_limit(upstream: str, requests_per_second: float | None) -> None:
+    """Throttle this process's requests to an upstream through the shared token bucket; None lifts it."""
+    if requests_per_second is None:
+        _rate_limits.pop(upstream, None)
+    else:
+        _rate_limits[upstream] = requests_per_second
+
+
+def throttle(upstream: str, max_wait: float) -> None:
+    """Wait for the next request slot when the upstream is rate limited.
+
+    Call it before a request's own timeout starts, so queueing never eats
+    into it. Raises RateLimitExceeded, without taking the slot, when it is
+    more than ``max_wait`` seconds away.
+    """
+    rate = _rate_limits.get(upstream)
+    if rate is not None:
+        acquire(f"http:{upstream}", rate=rate, capacity=1.0, max_wait=max_wait)
+
+
+def get_client(upstream: str) -> httpx.Client:
+    """Return the process-wide pooled client for an upstream, creating it on first use.
+
+    Connections are kept alive between requests, so repeat calls skip the
+    TCP+TLS handshake. HTTP/2 is used when the optional ``h2`` package is
+    installed.
+    """
+    with _clients_lock:
+        client = _clients.get(upstream)
+        if client is None:
+            client = httpx.Client(
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS_PER_UPSTREAM,
+                    max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS_PER_UPSTREAM,
+                    keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                timeout=DEFAULT_TIMEOUT_SECONDS,
+                headers={"User-Agent": settings.HTTP_USER_AGENT},
+            )
+            _clients[upstream] = client
+        return client
+
+
+def close_clients() -> None:
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.parcels.models import AnalysisJob, Parcel
+from apps.parcels.services.analysis import analyze_parcel
+from apps.parcels.services.koppen import KoppenError
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (AnalysisJob.Status.PENDING, AnalysisJob.Status.RUNNING)
+SOIL_UNAVAILABLE = "Soil data unavailable"
+CLIMATE_UNKNOWN = "Climate zone unknown"
+
+
+def enqueue_analysis(parcel: Parcel) -> AnalysisJob:
+    """Queue an analysis of the parcel's current location, or return the one already queued."""
+    if parcel.latitude is None or parcel.longitude is None:
+        raise ValueError("Parcel has no location to analyze")
+    active = AnalysisJob.objects.filter(
+        parcel=parcel, latitude=parcel.latitude, longitude=parcel.longitude, status__in=ACTIVE_STATUSES,
+    )
+    job = active.first()
+    if job is not None:
+        return job
+    try:
+        with transaction.atomic():
+            return AnalysisJob.objects.create(parcel=parcel, latitude=parcel.latitude, longitude=parcel.longitude)
+    except IntegrityError:
+        # Lost the race against a concurrent request for the same location.
+        return active.get()
+
+
+def is_retrying_soil(job: AnalysisJob) -> bool:
+    """True while a job is queued again only because soil was unavailable.
+
+    Its climate part is already saved on the parcel, so there is a profile to show.
+    """
+    return job.status in ACTIVE_STATUSES and job.error == SOIL_UNAVAILABLE
+
+
+def failed_on_climate(job: AnalysisJob) -> bool:
+    """True if a job failed because the location has no climate zone, not on an unexpected error."""
+    return job.status == AnalysisJob.Status.FAILED and job.error.startswith(CLIMATE_UNKNOWN)
+
+
+def claim_next_job() -> AnalysisJob | None:
+    """Take the oldest due job, or a running one whose lease expired; None if there is none.
+
+    Rows locked by other workers are skipped, so workers never claim the same job.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            AnalysisJob.objects.select_for_update(skip_locked=True)
+            .filter(status__in=ACTIVE_STATUSES, run_after__lte=now)
+            .order_by("run_after")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = AnalysisJob.Status.RUNNING
+        job.attempts += 1
+        job.run_after = now + timedelta(seconds=settings.ANALYSIS_JOB_LEASE_SECONDS)
+        job.save(update_fields=["status", "attempts", "run_after", "updated_at"])
+    return job
+
+
+def _finish(job: AnalysisJob, status: str, error: str = "") -> None:
+    job.status = status
+    job.error = error
+    job.save(update_fields=["status", "error", "updated_at"])
+
+
+def _retry_or_fail(job: AnalysisJob, error: str, exhausted_status: str) -> None:
+    if job.attempts >= settings.ANALYSIS_JOB_MAX_ATTEMPTS:
+        _finish(job, exhausted_status, error)
+        return
+    # Exponential backoff with jitter so failed jobs don't retry in lockstep.
+    delay = settings.ANALYSIS_JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1) * random.uniform(1.0, 1.5)
+    job.status = AnalysisJob.Status.PENDING
+    job.error = error
+    job.run_after = timezone.now() + timedelta(seconds=delay)
+    job.save(update_fields=["status", "error", "run_after", "updated_at"])
+
+
+def run_job(job: AnalysisJob) -> None:
+    """Run a claimed job and record the outcome.
+
+    A missing climate zone fails the job for good. Soil outages and unexpected
+    errors (which are logged) are retried with backoff; once attempts run out a job without soil
+    data still counts as done, since the climate part was saved. Meanwhile
+    is_retrying_soil() lets pages show that saved part instead of a spinner.
+    """
+    parcel = Parcel.objects.filter(pk=job.parcel_id).first()
+    if parcel is None or (parcel.latitude, parcel.longitude) != (job.latitude, job.longitude):
+        _finish(job, AnalysisJob.Status.DONE, "Parcel moved or deleted")
+        return
+    try:
+        soil_ok = analyze_parcel(parcel, job.latitude, job.longitude)
+    except KoppenError as exc:
+        _finish(job, AnalysisJob.Status.FAILED, f"{CLIMATE_UNKNOWN}: {exc}")
+        return
+    except Exception as exc:
+        logger.exception("Analysis job %s failed on attempt %s", job.pk, job.attempts)
+        _retry_or_fail(job, repr(exc), AnalysisJob.Status.FAILED)
+        return
+    if soil_ok:
+        _finish(job, AnalysisJob.Status.DONE)
+    else:
+        _retry_or_fail(job, SOIL_UNAVAILABLE, AnalysisJob.Status.DONE)
+
+
+def process_jobs(stop: threading.Event, stop_when_idle: bool = False) -> int:
+    """Claim and run jobs until ``stop`` is set; returns how many were run."""
+    processed = 0
+    while not stop.is_set():
+        job = claim_next_job()
+        if job is None:
+            if stop_when_idle:
+                break
+            stop.wait(settings.ANALYSIS_WORKER_POLL_SECONDS)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
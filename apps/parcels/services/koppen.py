@@ -1,10 +1,19 @@
 from __future__ import annotations
 
-import rasterio
+import json
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, NamedTuple
+
+import numpy as np
+import numpy.typing as npt
 import rasterio.errors
 import rasterio.windows
+from affine import Affine
 from django.conf import settings
 
+from apps.parcels.services.rasters import RasterPool, RasterPoolStats
+
 
 class KoppenError(Exception):
     """Raised when Köppen climate zone lookup fails."""
@@ -43,29 +52,358 @@ KOPPEN_ZONES: dict[int, str] = {
     30: "EF - Ice cap",
 }
 
-_raster: rasterio.DatasetReader | None = None
+# Indexed by raw pixel value; an empty label marks nodata or unknown codes.
+_LABEL_TABLE: npt.NDArray[np.str_] = np.array(
+    [KOPPEN_ZONES.get(code, "") for code in range(256)]
+)
+
+
+BASELINE_PERIOD = "1991-2020"
+
+
+class KoppenZone(NamedTuple):
+    label: str
+    approximate: bool = False
+    trajectory: Mapping[str, str] = MappingProxyType({})
+
+
+class KoppenLookup(NamedTuple):
+    codes: npt.NDArray[np.uint8]
+    labels: npt.NDArray[np.str_]
+    nodata: npt.NDArray[np.bool_]
+    approximate: npt.NDArray[np.bool_]
+    periods: tuple[str, ...]
+    period_codes: npt.NDArray[np.uint8]
+
+    def zone(self, index: int) -> KoppenZone | None:
+        """The zone of the point at ``index``, or None on nodata."""
+        if self.nodata[index]:
+            return None
+        period_labels = _LABEL_TABLE[self.period_codes[index]]
+        return KoppenZone(
+            label=str(self.labels[index]),
+            approximate=bool(self.approximate[index]),
+            trajectory={
+                period: str(label)
+                for period, label in zip(self.periods, period_labels) if label
+            },
+        )
+
+
+class _KoppenGrid(NamedTuple):
+    codes: np.memmap[Any, np.dtype[np.uint8]]
+    transform: Affine
+    periods: tuple[str, ...]
+    mtime_ns: int
+    version: str
+    nearest_pixels: npt.NDArray[np.int64] | None
+    nearest_offsets: npt.NDArray[np.int8] | None
+
+
+_raster_pool: RasterPool | None = None
+_grid: _KoppenGrid | None = None
+
+
+def _get_raster_pool() -> RasterPool:
+    global _raster_pool  # noqa: PLW0603
+    geotiff_path = settings.KOPPEN_GEOTIFF_PATH
+    if not geotiff_path.exists():
+        raise KoppenError(
+            "Köppen GeoTIFF not found. Run scripts/download_koppen.py first."
+        )
+    if _raster_pool is None or _raster_pool.path != geotiff_path:
+        _raster_pool = RasterPool(geotiff_path, settings.KOPPEN_RASTER_POOL_SIZE)
+    return _raster_pool
+
+
+def raster_pool_stats() -> RasterPoolStats | None:
+    """Return handle counters for the GeoTIFF pool, or None if it was never used."""
+    return _raster_pool.stats() if _raster_pool is not None else None
+
+
+def _load_grid() -> _KoppenGrid | None:
+    """Memory-map the compact grid built by scripts/build_koppen_grid.py, if present.
+
+    The grid is (rows, cols, periods) so all periods of a pixel sit side by side.
+    The mapping is read-only, so every worker process shares the same page-cache
+    copy of the grid. A rebuilt grid is picked up on the next lookup.
+    """
+    global _grid  # noqa: PLW0603
+    grid_path = settings.KOPPEN_GRID_PATH
+    try:
+        mtime_ns = grid_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _grid is None or _grid.mtime_ns != mtime_ns:
+        sidecar = json.loads(grid_path.with_suffix(".json").read_text())
+        if sidecar.get("grid_mtime_ns", mtime_ns) != mtime_ns:
+            # Caught between a rebuild's sidecar and grid swaps; the next lookup reloads.
+            return _grid
+        has_nearest_index = "nearest_pixels" in sidecar
+        _grid = _KoppenGrid(
+            codes=np.load(grid_path, mmap_mode="r"),
+            transform=Affine(*sidecar["transform"]),
+            periods=tuple(sidecar["periods"]),
+            mtime_ns=mtime_ns,
+            # Grids built before the sidecar recorded a version change with every build.
+            version=sidecar.get("version", f"grid:{mtime_ns}"),
+            nearest_pixels=(
+                np.load(grid_path.with_name(sidecar["nearest_pixels"]), mmap_mode="r")
+                if has_nearest_index else None
+            ),
+            nearest_offsets=(
+                np.load(grid_path.with_name(sidecar["nearest_offsets"]), mmap_mode="r")
+                if has_nearest_index else None
+            ),
+        )
+    return _grid
+
+
+def koppen_dataset_version() -> str:
+    """Identify the Köppen data lookups currently read: the built grid, else the GeoTIFF.
+
+    Changes whenever the grid is rebuilt from other GeoTIFFs or periods.
+    """
+    grid = _load_grid()
+    if grid is not None:
+        return grid.version
+    geotiff_path = settings.KOPPEN_GEOTIFF_PATH
+    try:
+        stat = geotiff_path.stat()
+    except FileNotFoundError:
+        return ""
+    return f"{geotiff_path.name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _to_pixels(
+    transform: Any, lats: npt.NDArray[np.float64], lons: npt.NDArray[np.float64]
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    # The Köppen grid is north-up, so the affine inverse reduces to two divisions.
+    rows = np.floor((lats - transform.f) / transform.e).astype(np.int64)
+    cols = np.floor((lons - transform.c) / transform.a).astype(np.int64)
+    return rows, cols
+
+
+def _bounding_window(
+    transform: Affine,
+    shape: tuple[int, int],
+    lats: npt.NDArray[np.float64],
+    lons: npt.NDArray[np.float64],
+) -> rasterio.windows.Window:
+    row_edges = (np.array([lats.max(), lats.min()]) - transform.f) / transform.e
+    col_edges = (np.array([lons.min(), lons.max()]) - transform.c) / transform.a
+    row_start, col_start = int(np.floor(row_edges[0])), int(np.floor(col_edges[0]))
+    row_stop = max(int(np.ceil(row_edges[1])), row_start + 1)
+    col_stop = max(int(np.ceil(col_edges[1])), col_start + 1)
+
+    height, width = shape
+    row_start, row_stop = max(row_start, 0), min(row_stop, height)
+    col_start, col_stop = max(col_start, 0), min(col_stop, width)
+    if row_start >= row_stop or col_start >= col_stop:
+        raise KoppenError("Parcel lies outside the Köppen climate grid")
+    return rasterio.windows.Window(
+        col_start, row_start, col_stop - col_start, row_stop - row_start
+    )
+
 
+def _polygon_mask(
+    rings: list[npt.NDArray[np.float64]],
+    transform: Affine,
+    window: rasterio.windows.Window,
+) -> npt.NDArray[np.bool_]:
+    """Mark window pixels whose centres fall inside the polygon (even-odd rule).
 
-def get_koppen_zone(lat: float, lon: float) -> str:
-    """Look up Köppen climate zone from GeoTIFF for given coordinates."""
-    global _raster  # noqa: PLW0603
-    if _raster is None:
-        geotiff_path = settings.KOPPEN_GEOTIFF_PATH
-        if not geotiff_path.exists():
-            raise KoppenError(
-                "Köppen GeoTIFF not found. Run scripts/download_koppen.py first."
-            )
+    Scanline fill: every edge is intersected with every pixel-row centre line at
+    once, crossings are binned per column, and a reversed cumulative sum gives
+    the crossing parity to the right of each pixel centre.
+    """
+    height, width = int(window.height), int(window.width)
+    edges = np.concatenate([np.hstack([ring, np.roll(ring, -1, axis=0)]) for ring in rings])
+    edges = edges[edges[:, 1] != edges[:, 3]]
+    lon1, lat1, lon2, lat2 = edges.T
+
+    row_lats = transform.f + (np.arange(height) + window.row_off + 0.5) * transform.e
+    row_lats = row_lats[:, np.newaxis]
+    spans = (lat1 > row_lats) != (lat2 > row_lats)
+    crossing_lons = lon1 + (row_lats - lat1) * (lon2 - lon1) / (lat2 - lat1)
+    crossing_cols = (crossing_lons - transform.c) / transform.a - window.col_off
+    # Column k is the first pixel whose centre lies at or right of the crossing.
+    first_cols = np.clip(np.ceil(crossing_cols - 0.5), 0, width).astype(np.int64)
+
+    span_rows, span_edges = np.nonzero(spans)
+    bins = span_rows * (width + 1) + first_cols[span_rows, span_edges]
+    crossings = np.bincount(bins, minlength=height * (width + 1)).reshape(height, width + 1)
+    crossings_right = np.cumsum(crossings[:, ::-1], axis=1)[:, ::-1]
+    return np.asarray(crossings_right[:, 1:] % 2 == 1, dtype=np.bool_)
+
+
+def _index_grid(
+    codes: npt.NDArray[np.uint8],
+    rows: npt.NDArray[np.int64],
+    cols: npt.NDArray[np.int64],
+) -> npt.NDArray[np.uint8]:
+    height, width, period_count = codes.shape
+    inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+    values = np.zeros((len(rows), period_count), dtype=np.uint8)
+    values[inside] = codes[rows[inside], cols[inside]]
+    return values
+
+
+def _fill_from_nearest(
+    grid: _KoppenGrid,
+    rows: npt.NDArray[np.int64],
+    cols: npt.NDArray[np.int64],
+    codes: npt.NDArray[np.uint8],
+) -> npt.NDArray[np.bool_]:
+    """Replace nodata codes with the nearest valid pixel from the prebuilt index.
+
+    Updates every period of ``codes`` in place and returns which points were
+    substituted.
+    """
+    approximate = np.zeros(len(codes), dtype=np.bool_)
+    if grid.nearest_pixels is None or grid.nearest_offsets is None:
+        return approximate
+
+    height, width, _ = grid.codes.shape
+    missing = np.flatnonzero(
+        (codes[:, 0] == 0) & (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+    )
+    if missing.size == 0 or grid.nearest_pixels.size == 0:
+        return approximate
+
+    flat_pixels = rows[missing] * width + cols[missing]
+    positions = np.searchsorted(grid.nearest_pixels, flat_pixels)
+    positions = np.minimum(positions, grid.nearest_pixels.size - 1)
+    indexed = grid.nearest_pixels[positions] == flat_pixels
+    missing, positions = missing[indexed], positions[indexed]
+
+    offsets = np.asarray(grid.nearest_offsets[positions], dtype=np.int64)
+    codes[missing] = grid.codes[rows[missing] + offsets[:, 0], cols[missing] + offsets[:, 1]]
+    approximate[missing] = True
+    return approximate
+
+
+def _read_block_grouped(
+    raster: rasterio.DatasetReader,
+    rows: npt.NDArray[np.int64],
+    cols: npt.NDArray[np.int64],
+) -> npt.NDArray[np.uint8]:
+    """Read pixel values for many points, decoding each raster block only once."""
+    codes = np.zeros(len(rows), dtype=np.uint8)
+    inside = np.flatnonzero(
+        (rows >= 0) & (rows < raster.height) & (cols >= 0) & (cols < raster.width)
+    )
+    if inside.size == 0:
+        return codes
+
+    block_height, block_width = raster.block_shapes[0]
+    block_rows = rows[inside] // block_height
+    block_cols = cols[inside] // block_width
+    blocks_per_row = -(-raster.width // block_width)
+    block_ids = block_rows * blocks_per_row + block_cols
+
+    order = np.argsort(block_ids, kind="stable")
+    sorted_ids = block_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    for members in np.split(inside[order], starts[1:]):
+        window = raster.block_window(
+            1, int(rows[members[0]] // block_height), int(cols[members[0]] // block_width)
+        )
+        block = raster.read(1, window=window)
+        codes[members] = block[
+            rows[members] - int(window.row_off), cols[members] - int(window.col_off)
+        ]
+    return codes
+
+
+def get_koppen_zones(lats: npt.ArrayLike, lons: npt.ArrayLike) -> KoppenLookup:
+    """Look up Köppen climate zones for arrays of coordinates in one pass.
+
+    Uses the memory-mapped grid when it has been built and falls back to
+    block-grouped reads of the GeoTIFF otherwise.
+
+    ``codes``/``labels`` describe the baseline period; ``period_codes`` holds one
+    column per entry in ``periods`` (only the baseline without the grid).
+    Points outside the raster or on nodata pixels are flagged in ``nodata``
+    and carry code 0 with an empty label. With the grid's nearest-pixel index,
+    nodata points near land take the nearest valid zone and are flagged in
+    ``approximate`` instead.
+    """
+    lat_array = np.asarray(lats, dtype=np.float64)
+    lon_array = np.asarray(lons, dtype=np.float64)
+    grid = _load_grid()
+    if grid is not None:
+        rows, cols = _to_pixels(grid.transform, lat_array, lon_array)
+        period_codes = _index_grid(grid.codes, rows, cols)
+        approximate = _fill_from_nearest(grid, rows, cols, period_codes)
+        periods = grid.periods
+    else:
         try:
-            _raster = rasterio.open(geotiff_path)
+            with _get_raster_pool().dataset() as raster:
+                rows, cols = _to_pixels(raster.transform, lat_array, lon_array)
+                period_codes = _read_block_grouped(raster, rows, cols)[:, np.newaxis]
         except rasterio.errors.RasterioIOError as exc:
-            raise KoppenError(f"Failed to open Köppen GeoTIFF: {exc}") from exc
-
-    row, col = _raster.index(lon, lat)
-    pixel_value = int(
-        _raster.read(1, window=rasterio.windows.Window(col, row, 1, 1))[0, 0]
+            raise KoppenError(f"Failed to read Köppen GeoTIFF: {exc}") from exc
+        approximate = np.zeros(len(period_codes), dtype=np.bool_)
+        periods = (BASELINE_PERIOD,)
+    codes = period_codes[:, 0]
+    labels = _LABEL_TABLE[codes]
+    return KoppenLookup(
+        codes=codes,
+        labels=labels,
+        nodata=labels == "",
+        approximate=approximate,
+        periods=periods,
+        period_codes=period_codes,
     )
 
-    if pixel_value == 0 or pixel_value not in KOPPEN_ZONES:
+
+def get_koppen_zone(lat: float, lon: float) -> KoppenZone:
+    """Look up Köppen climate zone for given coordinates.
+
+    Coastal points on nodata pixels resolve to the nearest zone with
+    ``approximate=True`` when the grid's nearest-pixel index is available.
+    ``trajectory`` maps each period in the grid to its zone, from the same read.
+    """
+    zone = get_koppen_zones([lat], [lon]).zone(0)
+    if zone is None:
         raise KoppenError(f"No climate data available for coordinates ({lat}, {lon})")
+    return zone
+
+
+def get_koppen_zone_shares(polygon: dict[str, Any]) -> dict[str, float]:
+    """Return the share of each Köppen zone inside a GeoJSON polygon.
+
+    Only the polygon's bounding window is read. Polygons smaller than a pixel
+    fall back to the pixels their bounding box touches.
+    """
+    rings = [np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon["coordinates"]]
+    lats, lons = rings[0][:, 1], rings[0][:, 0]
+
+    grid = _load_grid()
+    if grid is not None:
+        transform = grid.transform
+        window = _bounding_window(transform, grid.codes.shape[:2], lats, lons)
+        window_codes = np.asarray(grid.codes[(*window.toslices(), 0)])
+    else:
+        try:
+            with _get_raster_pool().dataset() as raster:
+                transform = raster.transform
+                window = _bounding_window(transform, (raster.height, raster.width), lats, lons)
+                window_codes = raster.read(1, window=window)
+        except rasterio.errors.RasterioIOError as exc:
+            raise KoppenError(f"Failed to read Köppen GeoTIFF: {exc}") from exc
+
+    mask = _polygon_mask(rings, transform, window)
+    codes = window_codes[mask] if mask.any() else window_codes.ravel()
+    codes = codes[_LABEL_TABLE[codes] != ""]
+    if codes.size == 0:
+        raise KoppenError("No climate data available for this parcel")
 
-    return KOPPEN_ZONES[pixel_value]
+    counts = np.bincount(codes, minlength=len(_LABEL_TABLE))
+    zone_codes = np.flatnonzero(counts)
+    zone_codes = zone_codes[np.argsort(-counts[zone_codes], kind="stable")]
+    return {
+        str(_LABEL_TABLE[code]): round(float(counts[code]) / codes.size, 3)
+        for code in zone_codes
+    }
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import math
+import time
 from typing import Any
 
 import httpx
+import numpy as np
 
+from apps.parcels.models import GeologicUnit
+from apps.parcels.services.breakers import CircuitBreaker
+from apps.parcels.services.http_clients import get_client, throttle
+from apps.parcels.services.rate_limit import RateLimitExceeded
 from apps.parcels.services.soilgrids import SoilData
 
 MACROSTRAT_API_URL = "https://macrostrat.org/api/v2/geologic_units/map"
+REQUEST_TIMEOUT_SECONDS = 10.0
 
 LITHOLOGY_SOIL_MAP: dict[str, tuple[float, str]] = {
     "limestone": (7.5, "Well-drained"),
@@ -32,6 +40,8 @@ LITHOLOGY_SOIL_MAP: dict[str, tuple[float, str]] = {
 
 DEFAULT_SOIL = (6.5, "Moderately drained")
 
+_breaker = CircuitBreaker("Macrostrat")
+
 
 class MacrostratError(Exception):
     """Raised when Macrostrat API call fails."""
@@ -43,28 +53,114 @@ def _parse_dominant_lithology(lith_string: str) -> str:
     return name
 
 
-def get_geology_soil_data(lat: float, lon: float) -> SoilData:
-    """Infer soil properties from underlying geology via Macrostrat API."""
-    params: dict[str, Any] = {"lat": lat, "lng": lon, "response": "long"}
+def _contains(geometry: dict[str, Any], lat: float, lon: float) -> bool:
+    """Even-odd point-in-polygon test for a GeoJSON Polygon or MultiPolygon."""
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return False
+    for rings in polygons:
+        crossings = 0
+        for ring in rings:
+            points = np.asarray(ring, dtype=np.float64)
+            x0, y0 = points[:-1, 0], points[:-1, 1]
+            x1, y1 = points[1:, 0], points[1:, 1]
+            spans = (y0 > lat) != (y1 > lat)
+            x_at = x0[spans] + (lat - y0[spans]) * (x1[spans] - x0[spans]) / (y1[spans] - y0[spans])
+            crossings += int(np.count_nonzero(lon < x_at))
+        if crossings % 2:
+            return True
+    return False
+
+
+def _cached_lithology(lat: float, lon: float) -> str | None:
+    candidates = GeologicUnit.objects.filter(
+        min_lat__lte=lat, max_lat__gte=lat, min_lon__lte=lon, max_lon__gte=lon,
+    ).order_by("id")
+    for unit in candidates:
+        if _contains(unit.geometry, lat, lon):
+            return unit.lith
+    return None
+
+
+def _store_unit(feature: dict[str, Any], lith: str) -> None:
+    geometry = feature.get("geometry")
+    map_id = feature.get("properties", {}).get("map_id")
+    if not geometry or map_id is None or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+        return
+    rings = geometry["coordinates"] if geometry["type"] == "Polygon" else [
+        ring for polygon in geometry["coordinates"] for ring in polygon
+    ]
+    points = np.concatenate([np.asarray(ring, dtype=np.float64) for ring in rings])
+    GeologicUnit.objects.update_or_create(
+        map_id=map_id,
+        defaults={
+            "lith": lith,
+            "geometry": geometry,
+            "min_lat": float(points[:, 1].min()),
+            "max_lat": float(points[:, 1].max()),
+            "min_lon": float(points[:, 0].min()),
+            "max_lon": float(points[:, 0].max()),
+        },
+    )
+
+
+def _fetch_lithology(lat: float, lon: float, deadline: float | None) -> str:
+    try:
+        throttle("macrostrat", max_wait=math.inf if deadline is None else deadline - time.monotonic())
+    except RateLimitExceeded as exc:
+        raise MacrostratError("Macrostrat API timed out") from exc
+    timeout = REQUEST_TIMEOUT_SECONDS
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+    if timeout <= 0:
+        raise MacrostratError("Macrostrat API timed out")
+    if not _breaker.allow():
+        raise MacrostratError("Macrostrat API is temporarily unavailable")
+
+    params: dict[str, Any] = {"lat": lat, "lng": lon, "response": "long", "format": "geojson_bare"}
     try:
-        response = httpx.get(MACROSTRAT_API_URL, params=params, timeout=10.0)
+        response = get_client("macrostrat").get(MACROSTRAT_API_URL, params=params, timeout=timeout)
         response.raise_for_status()
     except httpx.TimeoutException as exc:
+        _breaker.record_failure()
         raise MacrostratError("Macrostrat API timed out") from exc
     except httpx.HTTPStatusError as exc:
+        if exc.response.status_code >= 500:
+            _breaker.record_failure()
+        else:
+            _breaker.record_success()
         raise MacrostratError(f"Macrostrat API returned {exc.response.status_code}") from exc
     except httpx.HTTPError as exc:
+        _breaker.record_failure()
         raise MacrostratError(f"Macrostrat API request failed: {exc}") from exc
+    _breaker.record_success()
 
-    data = response.json()
-    records = data.get("data", [])
-    if not records:
+    features = response.json().get("features", [])
+    if not features:
         raise MacrostratError("No geology data available for this location")
 
-    lith_string = records[0].get("lith", "")
-    if not lith_string:
+    lith_string = features[0].get("properties", {}).get("lith", "")
+    if not isinstance(lith_string, str) or not lith_string:
         raise MacrostratError("No lithology data in Macrostrat response")
 
+    _store_unit(features[0], lith_string)
+    return lith_string
+
+
+def get_geology_soil_data(lat: float, lon: float, deadline: float | None = None) -> SoilData:
+    """Infer soil properties from underlying geology via Macrostrat API.
+
+    Map units are kept with their footprint, so points inside a known unit
+    are answered without an API call. ``deadline`` is a time.monotonic()
+    value shared with the SoilGrids lookup.
+    """
+    lith_string = _cached_lithology(lat, lon)
+    if lith_string is None:
+        lith_string = _fetch_lithology(lat, lon, deadline)
+
     dominant = _parse_dominant_lithology(lith_string)
 
     for keyword, (ph, drainage) in LITHOLOGY_SOIL_MAP.items():
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+import rasterio
+
+
+class RasterPoolStats(NamedTuple):
+    open_handles: int
+    idle_handles: int
+    checkouts: int
+    waits: int
+    wait_seconds: float
+    reopens: int
+
+
+class RasterPool:
+    """Bounded pool of rasterio handles for one file, safe to share across threads.
+
+    GDAL dataset handles must not be read from two threads at once, so each
+    checkout gets exclusive use of a handle. Handles are opened lazily up to
+    ``max_handles``; further callers wait for one to be returned. When the file
+    changes on disk, idle handles are closed and busy ones are closed on return.
+    """
+
+    def __init__(self, path: Path, max_handles: int) -> None:
+        self.path = path
+        self.max_handles = max_handles
+        self._condition = threading.Condition()
+        self._idle: list[rasterio.DatasetReader] = []
+        self._open_handles = 0
+        self._mtime_ns: int | None = None
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._reopens = 0
+
+    @contextmanager
+    def dataset(self) -> Iterator[rasterio.DatasetReader]:
+        handle, mtime_ns = self._acquire()
+        try:
+            yield handle
+        finally:
+            self._release(handle, mtime_ns)
+
+    def stats(self) -> RasterPoolStats:
+        with self._condition:
+            return RasterPoolStats(
+                open_handles=self._open_handles,
+                idle_handles=len(self._idle),
+                checkouts=self._checkouts,
+                waits=self._waits,
+                wait_seconds=self._wait_seconds,
+                reopens=self._reopens,
+            )
+
+    def close(self) -> None:
+        with self._condition:
+            self._close_idle()
+
+    def _acquire(self) -> tuple[rasterio.DatasetReader, int]:
+        mtime_ns = self.path.stat().st_mtime_ns
+        with self._condition:
+            if self._mtime_ns is not None and self._mtime_ns != mtime_ns:
+                self._close_idle()
+                self._reopens += 1
+            self._mtime_ns = mtime_ns
+            self._checkouts += 1
+
+            if not self._idle and self._open_handles >= self.max_handles:
+                self._waits += 1
+                started = time.monotonic()
+                while not self._idle and self._open_handles >= self.max_handles:
+                    self._condition.wait()
+                self._wait_seconds += time.monotonic() - started
+
+            if self._idle:
+                return self._idle.pop(), mtime_ns
+            self._open_handles += 1
+
+        # Open outside the lock so a slow open does not block returning handles.
+        try:
+            return rasterio.open(self.path), mtime_ns
+        except Exception:
+            with self._condition:
+                self._open_handles -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, handle: rasterio.DatasetReader, mtime_ns: int) -> None:
+        with self._condition:
+            if mtime_ns == self._mtime_ns:
+                self._idle.append(handle)
+            else:
+                handle.close()
+                self._open_handles -= 1
+            self._condition.notify()
+
+    def _close_idle(self) -> None:
+        for handle in self._idle:
+            handle.close()
+        self._open_handles -= len(self._idle)
+        self._idle.clear()
+        self._condition.notify_all()
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import time
+
+from django.db import transaction
+
+from apps.parcels.models import RateLimitBucket
+
+
+class RateLimitExceeded(Exception):
+    """Raised when waiting for a token would take longer than allowed."""
+
+
+def acquire(name: str, rate: float, capacity: float, max_wait: float) -> None:
+    """Take one token from the named bucket, sleeping until it is due.
+
+    The bucket row is locked while its balance is updated, so every worker
+    shares one limit. Tokens are reserved up front (the balance may go
+    negative), which makes concurrent callers queue in order rather than poll.
+    """
+    with transaction.atomic():
+        now = time.time()
+        bucket, _ = RateLimitBucket.objects.select_for_update().get_or_create(
+            name=name, defaults={"tokens": capacity, "updated_at": now},
+        )
+        tokens = min(capacity, bucket.tokens + (now - bucket.updated_at) * rate)
+        wait = max(1.0 - tokens, 0.0) / rate
+        if wait > max_wait:
+            raise RateLimitExceeded(f"{name} rate limit: next slot in {wait:.1f}s")
+        bucket.tokens = tokens - 1.0
+        bucket.updated_at = now
+        bucket.save(update_fields=["tokens", "updated_at"])
+    if wait > 0:
+        time.sleep(wait)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+from collections.abc import AsyncIterator, Awaitable, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, TypeVar
+
+from django.db import connection, connections
+
+LOCK_POLL_SECONDS = 0.1
+
+_T = TypeVar("_T")
+
+# Thread-safe futures: under WSGI every async view runs on its own event loop.
+_in_flight: dict[str, Future[Any]] = {}
+_in_flight_lock = threading.Lock()
+
+
+def _lock_id(key: str) -> int:
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big", signed=True)
+
+
+def _try_advisory_lock(lock_id: int) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [lock_id])
+        return bool(cursor.fetchone()[0])
+
+
+def _advisory_unlock(lock_id: int) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
+
+
+@asynccontextmanager
+async def advisory_lock(key: str) -> AsyncIterator[bool]:
+    """Hold a PostgreSQL advisory lock on ``key``; yields whether another holder was waited for.
+
+    The lock is polled rather than blocked on, so waiting never ties up a
+    thread. Other databases have no cross-process lock and yield False at once.
+    """
+    if connection.vendor != "postgresql":
+        yield False
+        return
+    lock_id = _lock_id(key)
+    loop = asyncio.get_running_loop()
+    # Advisory locks belong to the session that took them, and Django opens one
+    # connection per thread: locking, polling and unlocking all run on this
+    # executor's single thread, whichever thread the caller resumes on.
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="advisory-lock")
+    try:
+        waited = False
+        while not await loop.run_in_executor(executor, _try_advisory_lock, lock_id):
+            waited = True
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+        try:
+            yield waited
+        finally:
+            await loop.run_in_executor(executor, _advisory_unlock, lock_id)
+    finally:
+        # Queued after the unlock; closing the session also frees a lock whose
+        # unlock never got submitted because the caller was torn down.
+        executor.submit(connections.close_all)
+        executor.shutdown(wait=False)
+
+
+async def single_flight(key: str, compute: Callable[[bool], Awaitable[_T]]) -> _T:
+    """Run ``compute`` once for concurrent callers with the same key; all get its result.
+
+    Callers in this process join the in-flight run. Across processes the run
+    holds ``advisory_lock(key)``; ``compute`` receives its ``waited`` flag so a
+    caller queued behind another process can reuse the stored result.
+    """
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if future is None:
+            future = _in_flight[key] = Future()
+    if not leader:
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    async def run() -> _T:
+        async with advisory_lock(key) as waited:
+            return await compute(waited)
+
+    def settle(task: asyncio.Task[_T]) -> None:
+        with _in_flight_lock:
+            del _in_flight[key]
+        if task.cancelled():
+            future.cancel()
+        elif (exc := task.exception()) is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(task.result())
+
+    # A leader whose client disconnects must not cancel the run its followers wait on.
+    task = asyncio.ensure_future(run())
+    task.add_done_callback(settle)
+    return await asyncio.shield(task)
+
+
+async def wait_for_flight(key: str) -> None:
+    """Wait until no run of ``key`` is in flight here or in another process; never runs one.
+
+    Another process's run is detected by briefly taking its advisory lock.
+    """
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+    if future is not None:
+        finished = asyncio.wrap_future(future)
+        await asyncio.wait([finished])
+        # The outcome reaches followers through the database; mark any error as seen.
+        if not finished.cancelled():
+            finished.exception()
+        return
+    async with advisory_lock(key):
+        pass
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import math
+import threading
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.parcels.models import SoilCell
+
+# SoilGrids is published at 250m; 1/400° (~280m of latitude) per cache cell.
+CELL_DEGREES = 0.0025
+
+RawSoil = tuple[float, float, float]
+CellKey = tuple[int, int]
+
+
+class SoilCacheStats(NamedTuple):
+    hits: int
+    misses: int
+
+
+_stats_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def cell_key(lat: float, lon: float) -> CellKey:
+    return math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES)
+
+
+def lookup(points: list[tuple[float, float]]) -> dict[CellKey, RawSoil | None]:
+    """Return fresh cached (ph, clay, sand) per cell covering ``points``, None for nodata.
+
+    Cells without a fresh entry are left out of the result.
+    """
+    global _hits, _misses
+    keys = [cell_key(lat, lon) for lat, lon in points]
+    query = Q()
+    for lat_index, lon_index in set(keys):
+        query |= Q(lat_index=lat_index, lon_index=lon_index)
+    cutoff = timezone.now() - timedelta(seconds=settings.SOILGRIDS_CACHE_TTL_SECONDS)
+    found: dict[CellKey, RawSoil | None] = {
+        (cell.lat_index, cell.lon_index): (
+            None if cell.ph is None or cell.clay is None or cell.sand is None
+            else (cell.ph, cell.clay, cell.sand)
+        )
+        for cell in SoilCell.objects.filter(query, fetched_at__gte=cutoff)
+    }
+    hits = sum(key in found for key in keys)
+    with _stats_lock:
+        _hits += hits
+        _misses += len(keys) - hits
+    return found
+
+
+def store(values: dict[CellKey, RawSoil | None]) -> None:
+    """Insert or refresh cells; None stores a nodata marker."""
+    if not values:
+        return
+    now = timezone.now()
+    cells = [
+        SoilCell(
+            lat_index=lat_index,
+            lon_index=lon_index,
+            ph=raw[0] if raw else None,
+            clay=raw[1] if raw else None,
+            sand=raw[2] if raw else None,
+            fetched_at=now,
+        )
+        for (lat_index, lon_index), raw in values.items()
+    ]
+    SoilCell.objects.bulk_create(
+        cells,
+        update_conflicts=True,
+        unique_fields=["lat_index", "lon_index"],
+        update_fields=["ph", "clay", "sand", "fetched_at"],
+    )
+
+
+def soil_cache_stats() -> SoilCacheStats:
+    with _stats_lock:
+        return SoilCacheStats(hits=_hits, misses=_misses)
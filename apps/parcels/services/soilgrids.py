@@ -1,10 +1,38 @@
 from __future__ import annotations
 
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
 from typing import Any, NamedTuple
 
 import httpx
+import numpy as np
+import numpy.typing as npt
+import rasterio.errors
+import rasterio.io
+import rasterio.windows
+from affine import Affine
+from django.conf import settings
+
+from apps.parcels.services import soil_cache
+from apps.parcels.services.breakers import CircuitBreaker
+from apps.parcels.services.http_clients import get_client, throttle
+from apps.parcels.services.rasters import RasterPool
+from apps.parcels.services.rate_limit import RateLimitExceeded
+from apps.parcels.services.threads import in_worker
 
 SOILGRIDS_API_URL = "https://rest.isric.org/soilgrids/v2.0/properties/query"
+SOILGRIDS_WCS_URL = "https://maps.isric.org/mapserv"
+SOIL_PROPERTIES = ("phh2o", "clay", "sand")
+EPSG_4326 = "http://www.opengis.net/def/crs/EPSG/0/4326"
+# Half-width of the coverage box; matches the farthest point offset (~25km).
+COVERAGE_RADIUS_DEGREES = 0.25
+REQUEST_TIMEOUT_SECONDS = 10.0
+# Upper bound for the whole lookup, including every nearby probe.
+DEADLINE_SECONDS = 15.0
+MAX_CONCURRENT_PROBES = 4
 
 # Nearby offsets in cardinal directions at ~5km, ~15km, ~25km (degrees)
 _NEARBY_OFFSETS: list[tuple[float, float]] = [
@@ -14,6 +42,11 @@ _NEARBY_OFFSETS: list[tuple[float, float]] = [
 ]
 
 
+_breaker = CircuitBreaker("SoilGrids")
+_raster_pools: dict[Path, RasterPool] = {}
+_raster_pools_lock = threading.Lock()
+
+
 class SoilGridsError(Exception):
     """Raised when SoilGrids API call fails."""
 
@@ -32,26 +65,50 @@ def _derive_drainage(clay_pct: float, sand_pct: float) -> str:
     return "Moderately drained"
 
 
-def _fetch_point(lat: float, lon: float) -> tuple[float, float, float] | None:
-    """Fetch raw soil values for a single point. Returns (ph, clay, sand) or None."""
-    params: dict[str, Any] = {
-        "lon": lon,
-        "lat": lat,
-        "property": ["phh2o", "clay", "sand"],
-        "depth": "0-5cm",
-        "value": "mean",
-    }
+def _get(url: str, params: dict[str, Any], deadline: float) -> httpx.Response:
+    try:
+        # A slot due after the deadline is left for other callers.
+        throttle("soilgrids", max_wait=deadline - time.monotonic())
+    except RateLimitExceeded as exc:
+        raise SoilGridsError("SoilGrids API timed out") from exc
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise SoilGridsError("SoilGrids API timed out")
+    if not _breaker.allow():
+        raise SoilGridsError("SoilGrids API is temporarily unavailable")
     try:
-        response = httpx.get(SOILGRIDS_API_URL, params=params, timeout=10.0)
+        response = get_client("soilgrids").get(
+            url, params=params, timeout=min(REQUEST_TIMEOUT_SECONDS, remaining),
+        )
         response.raise_for_status()
     except httpx.TimeoutException as exc:
+        _breaker.record_failure()
         raise SoilGridsError("SoilGrids API timed out") from exc
     except httpx.HTTPStatusError as exc:
+        if exc.response.status_code >= 500:
+            _breaker.record_failure()
+        else:
+            _breaker.record_success()
         raise SoilGridsError(f"SoilGrids API returned {exc.response.status_code}") from exc
     except httpx.HTTPError as exc:
+        _breaker.record_failure()
         raise SoilGridsError(f"SoilGrids API request failed: {exc}") from exc
+    _breaker.record_success()
+    return response
+
 
-    data = response.json()
+def _fetch_point(
+    lat: float, lon: float, deadline: float,
+) -> tuple[float, float, float] | None:
+    """Fetch raw soil values for a single point. Returns (ph, clay, sand) or None."""
+    params: dict[str, Any] = {
+        "lon": lon,
+        "lat": lat,
+        "property": list(SOIL_PROPERTIES),
+        "depth": "0-5cm",
+        "value": "mean",
+    }
+    data = _get(SOILGRIDS_API_URL, params, deadline).json()
     try:
         layers = {
             layer["name"]: layer["depths"][0]["values"]["mean"]
@@ -69,24 +126,261 @@ def _fetch_point(lat: float, lon: float) -> tuple[float, float, float] | None:
     return (float(raw_ph), float(raw_clay), float(raw_sand))
 
 
-def get_soil_data(lat: float, lon: float) -> SoilData:
-    """Fetch soil pH and texture from SoilGrids API, derive drainage.
+def _fetch_coverage(
+    property_name: str, lat: float, lon: float, deadline: float,
+) -> tuple[npt.NDArray[np.float64], Affine]:
+    """Fetch one property for the box around a point via WCS.
+
+    Returns the values (NaN for nodata) and their affine transform.
+    """
+    params: dict[str, Any] = {
+        "map": f"/map/{property_name}.map",
+        "SERVICE": "WCS",
+        "VERSION": "2.0.1",
+        "REQUEST": "GetCoverage",
+        "COVERAGEID": f"{property_name}_0-5cm_mean",
+        "FORMAT": "GEOTIFF_INT16",
+        "SUBSET": [
+            f"long({lon - COVERAGE_RADIUS_DEGREES},{lon + COVERAGE_RADIUS_DEGREES})",
+            f"lat({lat - COVERAGE_RADIUS_DEGREES},{lat + COVERAGE_RADIUS_DEGREES})",
+        ],
+        "SUBSETTINGCRS": EPSG_4326,
+        "OUTPUTCRS": EPSG_4326,
+    }
+    response = _get(SOILGRIDS_WCS_URL, params, deadline)
+    try:
+        with rasterio.io.MemoryFile(response.content) as memfile, memfile.open() as coverage:
+            values = coverage.read(1).astype(np.float64)
+            if coverage.nodata is not None:
+                values[values == coverage.nodata] = np.nan
+            transform = coverage.transform
+    except rasterio.errors.RasterioIOError as exc:
+        raise SoilGridsError("Unexpected SoilGrids coverage format") from exc
+    return values, transform
+
+
+def _nearest_from_coverage(
+    lat: float, lon: float, deadline: float,
+) -> tuple[tuple[float, float, float], bool] | None:
+    """Pick the nearest cell where every property has data from one box per property.
 
-    Falls back to nearby points (~2km, ~5km) if original location has no data.
+    Returns ((ph, clay, sand), approximate) or None when the whole box is empty.
     """
-    offsets = [(0.0, 0.0), *_NEARBY_OFFSETS]
-
-    for dlat, dlon in offsets:
-        raw = _fetch_point(lat + dlat, lon + dlon)
-        if raw is not None:
-            ph = raw[0] / 10
-            clay_pct = raw[1] * 0.1
-            sand_pct = raw[2] * 0.1
-            approximate = dlat != 0.0 or dlon != 0.0
-            return SoilData(
-                ph=round(ph, 1),
-                drainage=_derive_drainage(clay_pct, sand_pct),
-                approximate=approximate,
-            )
+    executor = ThreadPoolExecutor(max_workers=len(SOIL_PROPERTIES))
+    try:
+        futures = [
+            executor.submit(in_worker, _fetch_coverage, name, lat, lon, deadline)
+            for name in SOIL_PROPERTIES
+        ]
+        try:
+            coverages = [
+                future.result(timeout=max(deadline - time.monotonic(), 0.0))
+                for future in futures
+            ]
+        except FutureTimeoutError as exc:
+            raise SoilGridsError("SoilGrids API timed out") from exc
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    (ph, transform), (clay, _), (sand, _) = coverages
+    return _nearest_valid_cell(lat, lon, (ph, clay, sand), transform)
+
+
+def _nearest_valid_cell(
+    lat: float,
+    lon: float,
+    layers: tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]],
+    transform: Affine,
+) -> tuple[tuple[float, float, float], bool] | None:
+    """Pick the cell nearest to the point where ph, clay and sand all have data (not NaN)."""
+    ph, clay, sand = layers
+    if not ph.shape == clay.shape == sand.shape:
+        raise SoilGridsError("SoilGrids coverages are not aligned")
+
+    valid = ~(np.isnan(ph) | np.isnan(clay) | np.isnan(sand))
+    if not valid.any():
+        return None
+
+    rows, cols = np.indices(ph.shape)
+    center_lats = transform.f + (rows + 0.5) * transform.e
+    center_lons = transform.c + (cols + 0.5) * transform.a
+    # Equirectangular distance is accurate enough to rank cells a few km apart.
+    lon_scale = np.cos(np.radians(lat))
+    distances = (center_lats - lat) ** 2 + ((center_lons - lon) * lon_scale) ** 2
+    distances[~valid] = np.inf
+    nearest_index = np.unravel_index(np.argmin(distances), distances.shape)
+    nearest_row, nearest_col = int(nearest_index[0]), int(nearest_index[1])
+
+    point_row = int((lat - transform.f) // transform.e)
+    point_col = int((lon - transform.c) // transform.a)
+    approximate = (nearest_row, nearest_col) != (point_row, point_col)
+    nearest = (nearest_row, nearest_col)
+    return (float(ph[nearest]), float(clay[nearest]), float(sand[nearest])), approximate
+
+
+def _local_raster_paths() -> list[Path] | None:
+    """Resolve the local raster per property, preferring a VRT mosaic over a single GeoTIFF."""
+    paths = []
+    for name in SOIL_PROPERTIES:
+        candidates = [
+            settings.SOILGRIDS_RASTER_DIR / f"{name}_0-5cm_mean{suffix}" for suffix in (".vrt", ".tif")
+        ]
+        path = next((candidate for candidate in candidates if candidate.exists()), None)
+        if path is None:
+            return None
+        paths.append(path)
+    return paths
+
+
+def _get_raster_pool(path: Path) -> RasterPool:
+    with _raster_pools_lock:
+        if path not in _raster_pools:
+            _raster_pools[path] = RasterPool(path, settings.SOILGRIDS_RASTER_POOL_SIZE)
+        return _raster_pools[path]
+
+
+def _read_local_box(
+    path: Path, lat: float, lon: float,
+) -> tuple[npt.NDArray[np.float64], Affine] | None:
+    """Read the coverage box around a point from a local raster; None if it lies outside."""
+    with _get_raster_pool(path).dataset() as raster:
+        if raster.crs is None or raster.crs.to_epsg() != 4326:
+            raise SoilGridsError(f"{path.name} must be in EPSG:4326")
+        row, col = raster.index(lon, lat)
+        if not (0 <= row < raster.height and 0 <= col < raster.width):
+            return None
+        window = rasterio.windows.from_bounds(
+            lon - COVERAGE_RADIUS_DEGREES, lat - COVERAGE_RADIUS_DEGREES,
+            lon + COVERAGE_RADIUS_DEGREES, lat + COVERAGE_RADIUS_DEGREES,
+            transform=raster.transform,
+        )
+        window = window.round_offsets().round_lengths().intersection(
+            rasterio.windows.Window(0, 0, raster.width, raster.height),
+        )
+        values = raster.read(1, window=window).astype(np.float64)
+        if raster.nodata is not None:
+            values[values == raster.nodata] = np.nan
+        return values, raster.window_transform(window)
+
+
+def _local_soil_data(lat: float, lon: float) -> SoilData | None:
+    """Look a point up in local SoilGrids rasters.
+
+    Returns None when the rasters are not downloaded, do not cover the point,
+    or hold no data near it, so the caller can fall back to the API.
+    """
+    paths = _local_raster_paths()
+    if paths is None:
+        return None
+    try:
+        boxes = [_read_local_box(path, lat, lon) for path in paths]
+    except rasterio.errors.RasterioIOError as exc:
+        raise SoilGridsError("Failed to read local SoilGrids rasters") from exc
+    ph_box, clay_box, sand_box = boxes
+    if ph_box is None or clay_box is None or sand_box is None:
+        return None
+    nearest = _nearest_valid_cell(lat, lon, (ph_box[0], clay_box[0], sand_box[0]), ph_box[1])
+    return None if nearest is None else _to_soil_data(*nearest)
+
+
+def _to_soil_data(raw: tuple[float, float, float], approximate: bool) -> SoilData:
+    ph = raw[0] / 10
+    clay_pct = raw[1] * 0.1
+    sand_pct = raw[2] * 0.1
+    return SoilData(
+        ph=round(ph, 1),
+        drainage=_derive_drainage(clay_pct, sand_pct),
+        approximate=approximate,
+    )
+
+
+def _probe_offsets(lat: float, lon: float, deadline: float) -> SoilData:
+    points = [(lat + dlat, lon + dlon) for dlat, dlon in [(0.0, 0.0), *_NEARBY_OFFSETS]]
+    keys = [soil_cache.cell_key(*point) for point in points]
+    cached = soil_cache.lookup(points)
+    for index, key in enumerate(keys):
+        if key not in cached:
+            break
+        cached_raw = cached[key]
+        if cached_raw is not None:
+            return _to_soil_data(cached_raw, approximate=index > 0)
+
+    fetched: dict[soil_cache.CellKey, tuple[float, float, float] | None] = {}
+    executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PROBES)
+    try:
+        # Known-empty and known-good cells are never probed again.
+        probes: list[Future[tuple[float, float, float] | None] | None] = [
+            None if key in cached else executor.submit(in_worker, _fetch_point, point_lat, point_lon, deadline)
+            for (point_lat, point_lon), key in zip(points, keys)
+        ]
+        for index, (key, probe) in enumerate(zip(keys, probes)):
+            if probe is None:
+                raw = cached[key]
+            else:
+                try:
+                    raw = probe.result(timeout=max(deadline - time.monotonic(), 0.0))
+                except FutureTimeoutError as exc:
+                    raise SoilGridsError("SoilGrids API timed out") from exc
+                fetched[key] = raw
+            if raw is not None:
+                return _to_soil_data(raw, approximate=index > 0)
+    finally:
+        # Queued probes are dropped; in-flight ones finish in the background.
+        executor.shutdown(wait=False, cancel_futures=True)
+        soil_cache.store(fetched)
 
     raise SoilGridsError("SoilGrids returned no data for this location or nearby areas")
+
+
+def _cached_point(lat: float, lon: float, deadline: float) -> tuple[float, float, float] | None:
+    key = soil_cache.cell_key(lat, lon)
+    cached = soil_cache.lookup([(lat, lon)])
+    if key in cached:
+        return cached[key]
+    raw = _fetch_point(lat, lon, deadline)
+    soil_cache.store({key: raw})
+    return raw
+
+
+def max_requests_per_lookup() -> int:
+    """Most API requests one get_soil_data() call can make in the configured nearby mode."""
+    if settings.SOILGRIDS_NEARBY_MODE == "coverage":
+        return 1 + len(SOIL_PROPERTIES)
+    return 1 + len(_NEARBY_OFFSETS)
+
+
+def get_soil_data(
+    lat: float, lon: float, deadline: float | None = None, max_seconds: float | None = None,
+) -> SoilData:
+    """Fetch soil pH and texture from SoilGrids, derive drainage.
+
+    Local rasters under settings.SOILGRIDS_RASTER_DIR are read first when they
+    cover the point; the API is only called otherwise.
+
+    Falls back to nearby data if the original location has none. In the default
+    "coverage" mode the centre point is queried first, then one WCS box per
+    property is fetched and the nearest valid cell picked locally. The
+    "offsets" mode instead probes 12 fixed points (~5km, ~15km, ~25km)
+    concurrently, taking results in priority order. Either way the whole
+    lookup shares one deadline: ``deadline`` (a time.monotonic() value) when
+    given, capped at ``max_seconds`` (DEADLINE_SECONDS by default) from now.
+    Calls fail fast while the SoilGrids circuit breaker is open. Point
+    results, including cells with no data, are cached per grid cell so repeat
+    lookups skip the API.
+    """
+    local = _local_soil_data(lat, lon)
+    if local is not None:
+        return local
+
+    own_deadline = time.monotonic() + (DEADLINE_SECONDS if max_seconds is None else max_seconds)
+    deadline = own_deadline if deadline is None else min(deadline, own_deadline)
+    if settings.SOILGRIDS_NEARBY_MODE != "coverage":
+        return _probe_offsets(lat, lon, deadline)
+
+    raw = _cached_point(lat, lon, deadline)
+    if raw is not None:
+        return _to_soil_data(raw, approximate=False)
+    nearest = _nearest_from_coverage(lat, lon, deadline)
+    if nearest is None:
+        raise SoilGridsError("SoilGrids returned no data for this location or nearby areas")
+    return _to_soil_data(*nearest)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, cast
+
+from django.conf import settings
+
+from apps.parcels.models import GeocodedAddress
+from apps.parcels.services.gazetteer import get_gazetteer, normalize_name
+
+# Suggestions kept per trie node; lookups never walk below the prefix node.
+TOP_K = 8
+MAX_GEOCODED_ENTRIES = 500
+# Users whose tries stay in memory; the least recently used is dropped first.
+MAX_CACHED_TRIES = 1000
+
+
+class Suggestion(NamedTuple):
+    display_name: str
+    lat: float
+    lon: float
+
+
+class _TrieNode:
+    __slots__ = ("children", "suggestions")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.suggestions: list[Suggestion] = []
+
+
+class PrefixTrie:
+    """Character trie where every node holds the first TOP_K suggestions below it."""
+
+    def __init__(self) -> None:
+        self.root = _TrieNode()
+
+    def insert(self, key: str, suggestion: Suggestion) -> None:
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            if len(node.suggestions) < TOP_K and suggestion not in node.suggestions:
+                node.suggestions.append(suggestion)
+
+    def lookup(self, prefix: str) -> list[Suggestion]:
+        node = self.root
+        for char in prefix:
+            child = node.children.get(char)
+            if child is None:
+                return []
+            node = child
+        return list(node.suggestions)
+
+
+# user id -> (built at, trie)
+_tries: OrderedDict[int, tuple[float, PrefixTrie]] = OrderedDict()
+_trie_lock = threading.Lock()
+
+
+def _build_trie(user_id: int) -> PrefixTrie:
+    trie = PrefixTrie()
+    found = (
+        GeocodedAddress.objects.filter(searched_by=user_id, latitude__isnull=False, longitude__isnull=False)
+        .order_by("-fetched_at")
+        .values_list("normalized_address", "display_name", "latitude", "longitude")[:MAX_GEOCODED_ENTRIES]
+    )
+    for normalized_address, display_name, lat, lon in found:
+        # Both coordinates are non-null by the filter above.
+        suggestion = Suggestion(display_name, cast(float, lat), cast(float, lon))
+        trie.insert(normalized_address, suggestion)
+        trie.insert(normalize_name(display_name), suggestion)
+    return trie
+
+
+def _get_trie(user_id: int) -> PrefixTrie:
+    """Trie of the user's own successful geocodes, rebuilt every SUGGESTIONS_REFRESH_SECONDS."""
+    with _trie_lock:
+        cached = _tries.get(user_id)
+    if cached is None or time.monotonic() - cached[0] > settings.SUGGESTIONS_REFRESH_SECONDS:
+        cached = (time.monotonic(), _build_trie(user_id))
+    with _trie_lock:
+        _tries[user_id] = cached
+        _tries.move_to_end(user_id)
+        while len(_tries) > MAX_CACHED_TRIES:
+            _tries.popitem(last=False)
+    return cached[1]
+
+
+def suggest_addresses(query: str, user_id: int, limit: int = TOP_K) -> list[Suggestion]:
+    """Suggestions for a partly typed address: the user's earlier geocodes, then gazetteer places.
+
+    Geocodes are cached for everyone, but street addresses are private, so a
+    user is only ever offered the ones they searched themselves.
+
+    Gazetteer places match by name prefix, or by trigram similarity when no name
+    starts with the query (typos such as "Tolouse").
+
+    Never calls Nominatim; that only happens when the search form is submitted.
+    """
+    key = normalize_name(query)
+    if not key:
+        return []
+    suggestions = _get_trie(user_id).lookup(key)
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        places = gazetteer.prefix(key, limit) or gazetteer.fuzzy(key, limit)
+        suggestions += [Suggestion(place.display_name, place.lat, place.lon) for place in places]
+    seen: set[str] = set()
+    unique = []
+    for suggestion in suggestions:
+        if suggestion.display_name not in seen:
+            seen.add(suggestion.display_name)
+            unique.append(suggestion)
+    return unique[:limit]
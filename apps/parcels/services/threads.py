@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import TypeVar
+
+from django.db import connections
+
+_T = TypeVar("_T")
+
+
+def in_worker(func: Callable[..., _T], *args: object, **kwargs: object) -> _T:
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Worker threads get their own DB connections; don't leave them open.
+        connections.close_all()
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from apps.parcels.services.admission import AdmissionRejected, admission_stats, admit, reset_admission
+
+
+@pytest.fixture(autouse=True)
+def limits(settings):
+    settings.ANALYSIS_MAX_CONCURRENT = 1
+    settings.ANALYSIS_MAX_QUEUED = 1
+    settings.ANALYSIS_MAX_PER_USER = 2
+    settings.ANALYSIS_QUEUE_TIMEOUT_SECONDS = 1.0
+    settings.ANALYSIS_RETRY_AFTER_SECONDS = 7
+    reset_admission()
+    yield
+    reset_admission()
+
+
+def _run(coroutine_function):
+    return async_to_sync(coroutine_function)()
+
+
+async def _hold(user_id, seconds):
+    async with admit(user_id):
+        await asyncio.sleep(seconds)
+
+
+def test_admit_counts_running_request():
+    async def scenario():
+        async with admit(1):
+            return admission_stats().running
+
+    assert _run(scenario) == 1
+
+
+def test_admit_releases_slot_on_exit():
+    async def scenario():
+        await _hold(1, 0)
+
+    _run(scenario)
+    assert admission_stats() == (0, 0, 0)
+
+
+def test_admit_queues_request_while_slots_are_busy():
+    async def scenario():
+        holder = asyncio.ensure_future(_hold(1, 0.2))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.ensure_future(_hold(2, 0))
+        await asyncio.sleep(0.05)
+        queued = admission_stats().queued
+        await asyncio.gather(holder, waiter)
+        return queued
+
+    assert _run(scenario) == 1
+
+
+def test_admit_runs_queued_request_once_slot_frees():
+    async def scenario():
+        holder = asyncio.ensure_future(_hold(1, 0.1))
+        await asyncio.sleep(0.02)
+        await _hold(2, 0)
+        await holder
+        return admission_stats().rejected
+
+    assert _run(scenario) == 0
+
+
+def test_admit_sheds_request_when_queue_is_full():
+    async def scenario():
+        tasks = [asyncio.ensure_future(_hold(user_id, 0.2)) for user_id in (1, 2)]
+        await asyncio.sleep(0.05)
+        try:
+            await _hold(3, 0)
+        except AdmissionRejected as exc:
+            return exc.status
+        finally:
+            await asyncio.gather(*tasks)
+
+    assert _run(scenario) == 503
+
+
+def test_admit_sheds_request_queued_past_timeout(settings):
+    settings.ANALYSIS_QUEUE_TIMEOUT_SECONDS = 0.05
+
+    async def scenario():
+        holder = asyncio.ensure_future(_hold(1, 0.3))
+        await asyncio.sleep(0.02)
+        try:
+            await _hold(2, 0)
+        except AdmissionRejected as exc:
+            return exc.status
+        finally:
+            await holder
+
+    assert _run(scenario) == 503
+
+
+def test_admit_limits_requests_per_user(settings):
+    settings.ANALYSIS_MAX_PER_USER = 1
+
+    async def scenario():
+        async with admit(1):
+            try:
+                async with admit(1):
+                    pass
+            except AdmissionRejected as exc:
+                return exc.status
+
+    assert _run(scenario) == 429
+
+
+def test_admit_rejection_carries_retry_after(settings):
+    settings.ANALYSIS_MAX_PER_USER = 0
+
+    async def scenario():
+        try:
+            async with admit(1):
+                pass
+        except AdmissionRejected as exc:
+            return exc.retry_after
+
+    assert _run(scenario) == 7
+
+
+def test_admission_stats_count_rejections(settings):
+    settings.ANALYSIS_MAX_PER_USER = 0
+
+    async def scenario():
+        with pytest.raises(AdmissionRejected):
+            async with admit(1):
+                pass
+
+    _run(scenario)
+    assert admission_stats().rejected == 1
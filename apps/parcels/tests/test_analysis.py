@@ -0,0 +1,67 @@
+from unittest.mock import MagicMock, patch
+
+from apps.parcels.models import Parcel
+from apps.parcels.services.analysis import apply_climate_batch, is_analysis_current, location_fingerprint, record_fingerprint
+from apps.parcels.services.koppen import KoppenZone
+
+SAMPLE_POLYGON = {
+    "type": "Polygon",
+    "coordinates": [[[2.35, 48.85], [2.36, 48.85], [2.36, 48.86], [2.35, 48.85]]],
+}
+
+
+def _complete_parcel(**fields):
+    defaults = {
+        "latitude": 48.85, "longitude": 2.35, "polygon": SAMPLE_POLYGON,
+        "climate_zone": "Cfb - Oceanic", "soil_ph": 6.5, "soil_drainage": "Well-drained",
+    }
+    return Parcel(**{**defaults, **fields})
+
+
+def test_location_fingerprint_ignores_submeter_jitter():
+    assert location_fingerprint(_complete_parcel()) == location_fingerprint(_complete_parcel(latitude=48.850001))
+
+
+def test_location_fingerprint_changes_with_location():
+    assert location_fingerprint(_complete_parcel()) != location_fingerprint(_complete_parcel(latitude=48.86))
+
+
+def test_location_fingerprint_changes_with_polygon():
+    moved = {"type": "Polygon", "coordinates": [[[2.35, 48.85], [2.37, 48.85], [2.37, 48.86], [2.35, 48.85]]]}
+    assert location_fingerprint(_complete_parcel()) != location_fingerprint(_complete_parcel(polygon=moved))
+
+
+def test_location_fingerprint_changes_with_koppen_dataset_version():
+    with patch("apps.parcels.services.analysis.koppen_dataset_version", return_value="grid-a"):
+        before = location_fingerprint(_complete_parcel())
+    with patch("apps.parcels.services.analysis.koppen_dataset_version", return_value="grid-b"):
+        assert location_fingerprint(_complete_parcel()) != before
+
+
+def test_record_fingerprint_marks_complete_profile_current():
+    parcel = _complete_parcel()
+    record_fingerprint(parcel)
+    assert is_analysis_current(parcel)
+
+
+def test_record_fingerprint_leaves_partial_profile_stale():
+    parcel = _complete_parcel(soil_ph=None)
+    record_fingerprint(parcel)
+    assert not is_analysis_current(parcel)
+
+
+def test_is_analysis_current_false_after_move():
+    parcel = _complete_parcel()
+    record_fingerprint(parcel)
+    parcel.longitude = 2.5
+    assert not is_analysis_current(parcel)
+
+
+def test_apply_climate_batch_gives_each_parcel_its_own_trajectory(monkeypatch):
+    lookup = MagicMock()
+    lookup.zone.return_value = KoppenZone("Cfb - Oceanic")
+    monkeypatch.setattr("apps.parcels.services.analysis.get_koppen_zones", lambda lats, lons: lookup)
+    first, second = _complete_parcel(polygon=None), _complete_parcel(polygon=None)
+    apply_climate_batch([first, second])
+    first.climate_trajectory["2041-2070"] = "Csb - Warm-summer Mediterranean"
+    assert second.climate_trajectory == {}
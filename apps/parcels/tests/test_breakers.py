@@ -0,0 +1,91 @@
+from unittest.mock import patch
+
+from apps.parcels.services.breakers import CircuitBreaker
+
+
+def _breaker():
+    return CircuitBreaker("test", window_seconds=60.0, min_calls=4, failure_rate=0.5, cooldown_seconds=30.0, jitter=0.0)
+
+
+def _fail(breaker, times):
+    for _ in range(times):
+        breaker.record_failure()
+
+
+def test_breaker_allows_calls_when_closed():
+    assert _breaker().allow() is True
+
+
+def test_breaker_stays_closed_below_min_calls():
+    breaker = _breaker()
+    _fail(breaker, 3)
+    assert breaker.state == "closed"
+
+
+def test_breaker_opens_at_failure_rate():
+    breaker = _breaker()
+    breaker.record_success()
+    breaker.record_success()
+    _fail(breaker, 2)
+    assert breaker.state == "open"
+
+
+def test_breaker_stays_closed_below_failure_rate():
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_success()
+    _fail(breaker, 1)
+    assert breaker.state == "closed"
+
+
+def test_breaker_rejects_calls_when_open():
+    breaker = _breaker()
+    _fail(breaker, 4)
+    assert breaker.allow() is False
+
+
+def test_breaker_forgets_outcomes_outside_window():
+    breaker = _breaker()
+    with patch("apps.parcels.services.breakers.time.monotonic", return_value=0.0):
+        _fail(breaker, 3)
+    with patch("apps.parcels.services.breakers.time.monotonic", return_value=61.0):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def _opened_at_zero():
+    breaker = _breaker()
+    with patch("apps.parcels.services.breakers.time.monotonic", return_value=0.0):
+        _fail(breaker, 4)
+    return breaker
+
+
+def test_breaker_allows_one_trial_after_cooldown():
+    breaker = _opened_at_zero()
+    with patch("apps.parcels.services.breakers.time.monotonic", return_value=31.0):
+        assert [breaker.allow(), breaker.allow()] == [True, False]
+
+
+def test_breaker_closes_after_successful_trial():
+    breaker = _opened_at_zero()
+    with patch("apps.parcels.services.breakers.time.monotonic", return_value=31.0):
+        breaker.allow()
+        breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_breaker_reopens_after_failed_trial():
+    breaker = _opened_at_zero()
+    with patch("apps.parcels.services.breakers.time.monotonic", return_value=31.0):
+        breaker.allow()
+        breaker.record_failure()
+        assert breaker.allow() is False
+
+
+def test_breaker_jitters_cooldown():
+    breaker = CircuitBreaker("test", min_calls=1, cooldown_seconds=30.0, jitter=0.5)
+    with patch("apps.parcels.services.breakers.random.uniform", return_value=0.5), \
+         patch("apps.parcels.services.breakers.time.monotonic", return_value=0.0):
+        breaker.record_failure()
+    with patch("apps.parcels.services.breakers.time.monotonic", return_value=40.0):
+        assert breaker.allow() is False
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from apps.parcels.services.gazetteer import Gazetteer, get_gazetteer
+from scripts.build_gazetteer_index import build_index
+
+
+@pytest.fixture
+def gazetteer(gazetteer_file):
+    return Gazetteer.from_tsv(gazetteer_file)
+
+
+def test_exact_returns_most_populous_match(gazetteer):
+    assert gazetteer.exact("paris").country == "FR"
+
+
+def test_exact_ignores_case_and_punctuation(gazetteer):
+    assert gazetteer.exact("  LYON. ").name == "Lyon"
+
+
+def test_exact_matches_ascii_name(gazetteer):
+    assert gazetteer.exact("Zurich").name == "Zürich"
+
+
+def test_exact_returns_none_for_unknown_name(gazetteer):
+    assert gazetteer.exact("Atlantis") is None
+
+
+def test_prefix_returns_places_by_population(gazetteer):
+    assert [place.name for place in gazetteer.prefix("b")] == ["Berlin", "Bratislava"]
+
+
+def test_prefix_respects_limit(gazetteer):
+    assert len(gazetteer.prefix("paris", limit=1)) == 1
+
+
+def test_fuzzy_tolerates_typos(gazetteer):
+    assert gazetteer.fuzzy("Tolouse")[0].name == "Toulouse"
+
+
+def test_nearest_returns_closest_place(gazetteer):
+    place, _ = gazetteer.nearest(48.86, 2.35)
+    assert place.display_name == "Paris, FR"
+
+
+def test_nearest_returns_great_circle_distance(gazetteer):
+    _, distance_km = gazetteer.nearest(48.85341, 2.3488 + 1.0)
+    assert distance_km == pytest.approx(73.2, abs=0.5)
+
+
+def test_nearest_matches_brute_force_on_many_points():
+    rng = np.random.default_rng(0)
+    lats, lons = rng.uniform(-80, 80, 2000), rng.uniform(-180, 180, 2000)
+    gazetteer = Gazetteer([str(i) for i in range(2000)], [""] * 2000, lats, lons, np.zeros(2000, dtype=np.int64))
+    queries = rng.uniform(-80, 80, (50, 2)) * [1, 2.25]
+    found = [int(gazetteer.nearest(lat, lon)[0].name) for lat, lon in queries]
+    lat_rad, lon_rad = np.radians(lats), np.radians(lons)
+    expected = [
+        int(np.argmax(np.sin(np.radians(lat)) * np.sin(lat_rad) + np.cos(np.radians(lat)) * np.cos(lat_rad) * np.cos(lon_rad - np.radians(lon))))
+        for lat, lon in queries
+    ]
+    assert found == expected
+
+
+def test_saved_index_loads_with_same_lookups(gazetteer, tmp_path):
+    gazetteer.save(tmp_path / "index.npz", source_mtime_ns=1)
+    loaded = Gazetteer.load(tmp_path / "index.npz", source_mtime_ns=1)
+    assert (loaded.prefix("b"), loaded.fuzzy("Tolouse"), loaded.nearest(48.86, 2.35)) == (
+        gazetteer.prefix("b"), gazetteer.fuzzy("Tolouse"), gazetteer.nearest(48.86, 2.35),
+    )
+
+
+def test_saved_index_is_ignored_for_another_file_version(gazetteer, tmp_path):
+    gazetteer.save(tmp_path / "index.npz", source_mtime_ns=1)
+    assert Gazetteer.load(tmp_path / "index.npz", source_mtime_ns=2) is None
+
+
+def test_saved_index_keeps_empty_strings(tmp_path):
+    Gazetteer(["Nowhere"], [""], np.zeros(1), np.zeros(1), np.zeros(1, dtype=np.int64)).save(tmp_path / "index.npz", 1)
+    assert Gazetteer.load(tmp_path / "index.npz", 1).countries == [""]
+
+
+def test_get_gazetteer_uses_prebuilt_index(gazetteer_file, settings, monkeypatch):
+    build_index(gazetteer_file, settings.GAZETTEER_INDEX_PATH)
+    monkeypatch.setattr(Gazetteer, "from_tsv", None)
+    assert get_gazetteer().exact("Berlin").country == "DE"
+
+
+def test_get_gazetteer_returns_none_without_file(settings, tmp_path):
+    settings.GAZETTEER_PATH = tmp_path / "missing.txt"
+    assert get_gazetteer() is None
+
+
+def test_get_gazetteer_loads_configured_file(gazetteer_file):
+    assert get_gazetteer().exact("Berlin").country == "DE"
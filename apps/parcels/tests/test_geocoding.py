@@ -1,9 +1,10 @@
 import httpx
 import pytest
 from unittest.mock import patch, MagicMock
-from apps.parcels.services.geocoding import geocode_address, GeocodingError
+from apps.parcels.services.geocoding import geocode_address, normalize_address, reverse_geocode, GeocodingError
 
 
+@pytest.mark.django_db
 def test_geocode_address_returns_location():
     mock_response = MagicMock()
     mock_response.json.return_value = [
@@ -11,27 +12,127 @@ def test_geocode_address_returns_location():
     ]
     mock_response.raise_for_status = MagicMock()
 
-    with patch("apps.parcels.services.geocoding.httpx.get", return_value=mock_response):
+    with patch("apps.parcels.services.geocoding.httpx.Client.get", return_value=mock_response):
         result = geocode_address("Paris")
 
     assert result == {"lat": 48.8566, "lon": 2.3522, "display_name": "Paris, France"}
 
 
+@pytest.mark.django_db
 def test_geocode_address_returns_none_for_empty_results():
     mock_response = MagicMock()
     mock_response.json.return_value = []
     mock_response.raise_for_status = MagicMock()
 
-    with patch("apps.parcels.services.geocoding.httpx.get", return_value=mock_response):
+    with patch("apps.parcels.services.geocoding.httpx.Client.get", return_value=mock_response):
         result = geocode_address("nonexistent place xyz")
 
     assert result is None
 
 
+@pytest.mark.django_db
 def test_geocode_address_raises_geocoding_error_on_http_failure():
     with patch(
-        "apps.parcels.services.geocoding.httpx.get",
+        "apps.parcels.services.geocoding.httpx.Client.get",
         side_effect=httpx.TimeoutException("timed out"),
     ):
         with pytest.raises(GeocodingError):
             geocode_address("Paris")
+
+
+def _nominatim_response(results):
+    mock_response = MagicMock()
+    mock_response.json.return_value = results
+    mock_response.raise_for_status = MagicMock()
+    return mock_response
+
+
+PARIS = [{"lat": "48.8566", "lon": "2.3522", "display_name": "Paris, France"}]
+
+
+def test_normalize_address_folds_case_punctuation_and_whitespace():
+    assert normalize_address("  12, Rue de RIVOLI.  Paris ") == "12 rue de rivoli paris"
+
+
+@pytest.mark.django_db
+def test_geocode_address_records_who_searched_cached_address(user):
+    with patch("apps.parcels.services.geocoding.httpx.Client.get", return_value=_nominatim_response(PARIS)):
+        geocode_address("Paris, France")
+        geocode_address("paris france", user_id=user.pk)
+    assert list(user.geocoded_addresses.values_list("normalized_address", flat=True)) == ["paris france"]
+
+
+@pytest.mark.django_db
+def test_geocode_address_reuses_cached_result_for_equivalent_address():
+    with patch("apps.parcels.services.geocoding.httpx.Client.get", return_value=_nominatim_response(PARIS)) as mock_get:
+        geocode_address("Paris, France")
+        geocode_address("paris   france")
+    assert mock_get.call_count == 1
+
+
+@pytest.mark.django_db
+def test_geocode_address_returns_cached_location():
+    with patch("apps.parcels.services.geocoding.httpx.Client.get", return_value=_nominatim_response(PARIS)):
+        geocode_address("Paris")
+        result = geocode_address("PARIS")
+    assert result == {"lat": 48.8566, "lon": 2.3522, "display_name": "Paris, France"}
+
+
+@pytest.mark.django_db
+def test_geocode_address_caches_not_found():
+    with patch("apps.parcels.services.geocoding.httpx.Client.get", return_value=_nominatim_response([])) as mock_get:
+        geocode_address("nonexistent place xyz")
+        geocode_address("Nonexistent place, xyz")
+    assert mock_get.call_count == 1
+
+
+@pytest.mark.django_db
+def test_geocode_address_refetches_expired_entry(settings):
+    settings.GEOCODE_CACHE_TTL_SECONDS = 0
+    with patch("apps.parcels.services.geocoding.httpx.Client.get", return_value=_nominatim_response(PARIS)) as mock_get, \
+         patch("apps.parcels.services.rate_limit.time.sleep"):
+        geocode_address("Paris")
+        geocode_address("Paris")
+    assert mock_get.call_count == 2
+
+
+@pytest.mark.django_db
+def test_geocode_address_raises_error_when_rate_limit_wait_too_long(settings):
+    settings.NOMINATIM_MAX_WAIT_SECONDS = 0.0
+    with patch("apps.parcels.services.geocoding.httpx.Client.get", return_value=_nominatim_response(PARIS)):
+        geocode_address("Paris")
+        with pytest.raises(GeocodingError, match="rate limit"):
+            geocode_address("Lyon")
+
+
+@pytest.mark.django_db
+def test_geocode_address_answers_place_names_from_gazetteer(gazetteer_file):
+    with patch("apps.parcels.services.geocoding.httpx.Client.get") as mock_get:
+        geocode_address("Lyon")
+    assert mock_get.call_count == 0
+
+
+@pytest.mark.django_db
+def test_geocode_address_returns_gazetteer_location(gazetteer_file):
+    result = geocode_address("Lyon")
+    assert result == {"lat": 45.74846, "lon": 4.84671, "display_name": "Lyon, FR"}
+
+
+@pytest.mark.django_db
+def test_geocode_address_uses_nominatim_for_street_addresses(gazetteer_file):
+    with patch("apps.parcels.services.geocoding.httpx.Client.get", return_value=_nominatim_response(PARIS)) as mock_get:
+        geocode_address("12 rue de Rivoli, Paris")
+    assert mock_get.call_count == 1
+
+
+def test_reverse_geocode_returns_nearest_place(gazetteer_file):
+    assert reverse_geocode(45.75, 4.85)["display_name"] == "Lyon, FR"
+
+
+def test_reverse_geocode_returns_none_far_from_any_place(gazetteer_file):
+    assert reverse_geocode(0.0, -30.0) is None
+
+
+def test_reverse_geocode_returns_none_without_gazetteer(settings, tmp_path):
+    settings.GAZETTEER_PATH = tmp_path / "missing.txt"
+    assert reverse_geocode(45.75, 4.85) is None
@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+import pytest
+
+from apps.parcels.services.http_clients import close_clients, get_client, set_rate_limit, throttle
+
+
+@pytest.fixture(autouse=True)
+def clean_clients():
+    close_clients()
+    yield
+    close_clients()
+
+
+def test_get_client_reuses_client_per_upstream():
+    assert get_client("soilgrids") is get_client("soilgrids")
+
+
+def test_get_client_separates_upstreams():
+    assert get_client("soilgrids") is not get_client("macrostrat")
+
+
+def test_get_client_sends_configured_user_agent(settings):
+    settings.HTTP_USER_AGENT = "TreeManagerApp/test"
+    assert get_client("nominatim").headers["User-Agent"] == "TreeManagerApp/test"
+
+
+def test_rate_limited_upstream_takes_token_before_each_request():
+    set_rate_limit("soilgrids", 0.5)
+    try:
+        with patch("apps.parcels.services.http_clients.acquire") as mock_acquire:
+            throttle("soilgrids", max_wait=5.0)
+    finally:
+        set_rate_limit("soilgrids", None)
+    assert mock_acquire.call_args.args[0] == "http:soilgrids"
+
+
+def test_throttle_passes_max_wait_to_bucket():
+    set_rate_limit("soilgrids", 0.5)
+    try:
+        with patch("apps.parcels.services.http_clients.acquire") as mock_acquire:
+            throttle("soilgrids", max_wait=5.0)
+    finally:
+        set_rate_limit("soilgrids", None)
+    assert mock_acquire.call_args.kwargs["max_wait"] == 5.0
+
+
+def test_upstream_without_rate_limit_is_not_throttled():
+    with patch("apps.parcels.services.http_clients.acquire") as mock_acquire:
+        throttle("soilgrids", max_wait=5.0)
+    assert mock_acquire.call_count == 0
@@ -0,0 +1,189 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.parcels.models import AnalysisJob, Parcel
+from apps.parcels.services.jobs import (
+    claim_next_job, enqueue_analysis, failed_on_climate, is_retrying_soil, process_jobs, run_job,
+)
+from apps.parcels.services.koppen import KoppenError, KoppenZone
+from apps.parcels.services.macrostrat import MacrostratError
+from apps.parcels.services.soilgrids import SoilData
+
+
+@pytest.fixture
+def parcel(user):
+    return Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+
+
+@pytest.fixture
+def services():
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")) as koppen, \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=SoilData(6.5, "Well-drained")) as soil:
+        yield koppen, soil
+
+
+def test_enqueue_analysis_is_idempotent_per_location(parcel):
+    assert enqueue_analysis(parcel) == enqueue_analysis(parcel)
+
+
+def test_enqueue_analysis_queues_new_job_for_new_location(parcel):
+    first = enqueue_analysis(parcel)
+    parcel.latitude = 45.0
+    assert enqueue_analysis(parcel) != first
+
+
+def test_enqueue_analysis_queues_again_after_job_finished(parcel):
+    first = enqueue_analysis(parcel)
+    AnalysisJob.objects.filter(pk=first.pk).update(status=AnalysisJob.Status.DONE)
+    assert enqueue_analysis(parcel) != first
+
+
+def test_claim_next_job_marks_job_running(parcel):
+    enqueue_analysis(parcel)
+    assert claim_next_job().status == AnalysisJob.Status.RUNNING
+
+
+def test_claim_next_job_skips_claimed_job(parcel):
+    enqueue_analysis(parcel)
+    claim_next_job()
+    assert claim_next_job() is None
+
+
+def test_claim_next_job_takes_over_expired_lease(parcel):
+    job = enqueue_analysis(parcel)
+    claim_next_job()
+    AnalysisJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+    assert claim_next_job().attempts == 2
+
+
+def test_run_job_stores_analysis_on_parcel(parcel, services):
+    enqueue_analysis(parcel)
+    run_job(claim_next_job())
+    parcel.refresh_from_db()
+    assert parcel.soil_ph == 6.5
+
+
+def test_run_job_marks_job_done(parcel, services):
+    job = enqueue_analysis(parcel)
+    run_job(claim_next_job())
+    job.refresh_from_db()
+    assert job.status == AnalysisJob.Status.DONE
+
+
+def test_run_job_fails_job_without_climate_zone(parcel, services):
+    koppen, _ = services
+    koppen.side_effect = KoppenError("GeoTIFF missing")
+    job = enqueue_analysis(parcel)
+    run_job(claim_next_job())
+    job.refresh_from_db()
+    assert job.status == AnalysisJob.Status.FAILED
+
+
+def test_run_job_records_failure_without_climate_zone(parcel, services):
+    koppen, _ = services
+    koppen.side_effect = KoppenError("GeoTIFF missing")
+    job = enqueue_analysis(parcel)
+    run_job(claim_next_job())
+    job.refresh_from_db()
+    assert failed_on_climate(job)
+
+
+def test_failed_on_climate_is_false_for_unexpected_failure(parcel):
+    job = AnalysisJob.objects.create(
+        parcel=parcel, latitude=48.85, longitude=2.35, status=AnalysisJob.Status.FAILED, error="RuntimeError('boom')",
+    )
+    assert not failed_on_climate(job)
+
+
+def test_run_job_logs_unexpected_error(parcel, services, caplog):
+    _, soil = services
+    soil.side_effect = RuntimeError("boom")
+    enqueue_analysis(parcel)
+    with caplog.at_level("ERROR", logger="apps.parcels.services.jobs"):
+        run_job(claim_next_job())
+    assert "RuntimeError: boom" in caplog.text
+
+
+def test_run_job_retries_unexpected_error_later(parcel, services):
+    _, soil = services
+    soil.side_effect = RuntimeError("boom")
+    job = enqueue_analysis(parcel)
+    run_job(claim_next_job())
+    job.refresh_from_db()
+    assert job.run_after > timezone.now()
+
+
+def test_run_job_backs_off_exponentially(parcel, services, settings):
+    settings.ANALYSIS_JOB_RETRY_BASE_SECONDS = 10.0
+    _, soil = services
+    soil.side_effect = RuntimeError("boom")
+    job = enqueue_analysis(parcel)
+    AnalysisJob.objects.filter(pk=job.pk).update(attempts=2)
+    run_job(claim_next_job())
+    job.refresh_from_db()
+    assert (job.run_after - timezone.now()).total_seconds() > 35
+
+
+def test_run_job_retries_missing_soil_data(parcel, services):
+    _, soil = services
+    soil.side_effect = MacrostratError("down")
+    job = enqueue_analysis(parcel)
+    with patch("apps.parcels.services.analysis.get_geology_soil_data", side_effect=MacrostratError("down")):
+        run_job(claim_next_job())
+    job.refresh_from_db()
+    assert job.status == AnalysisJob.Status.PENDING
+
+
+def test_run_job_marks_soil_outage_as_soil_only_retry(parcel, services):
+    _, soil = services
+    soil.side_effect = MacrostratError("down")
+    job = enqueue_analysis(parcel)
+    with patch("apps.parcels.services.analysis.get_geology_soil_data", side_effect=MacrostratError("down")):
+        run_job(claim_next_job())
+    job.refresh_from_db()
+    assert is_retrying_soil(job)
+
+
+def test_run_job_does_not_mark_unexpected_error_as_soil_only_retry(parcel, services):
+    _, soil = services
+    soil.side_effect = RuntimeError("boom")
+    job = enqueue_analysis(parcel)
+    run_job(claim_next_job())
+    job.refresh_from_db()
+    assert not is_retrying_soil(job)
+
+
+def test_run_job_finishes_without_soil_after_last_attempt(parcel, services, settings):
+    settings.ANALYSIS_JOB_MAX_ATTEMPTS = 1
+    _, soil = services
+    soil.side_effect = MacrostratError("down")
+    job = enqueue_analysis(parcel)
+    with patch("apps.parcels.services.analysis.get_geology_soil_data", side_effect=MacrostratError("down")):
+        run_job(claim_next_job())
+    job.refresh_from_db()
+    assert job.status == AnalysisJob.Status.DONE
+
+
+def test_run_job_skips_parcel_that_moved(parcel, services):
+    koppen, _ = services
+    enqueue_analysis(parcel)
+    Parcel.objects.filter(pk=parcel.pk).update(latitude=45.0)
+    run_job(claim_next_job())
+    assert koppen.call_count == 0
+
+
+def test_process_jobs_runs_queue_until_empty(user, services):
+    for index in range(3):
+        enqueue_analysis(Parcel.objects.create(user=user, latitude=48.0 + index, longitude=2.0))
+    assert process_jobs(threading.Event(), stop_when_idle=True) == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_analysis_worker_command_drains_queue(parcel, services):
+    enqueue_analysis(parcel)
+    call_command("run_analysis_worker", "--once", "--concurrency", "1")
+    assert AnalysisJob.objects.get().status == AnalysisJob.Status.DONE
@@ -0,0 +1,80 @@
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.parcels.services.rasters import RasterPool
+
+
+@pytest.fixture
+def raster_file(tmp_path):
+    path = tmp_path / "raster.tif"
+    path.touch()
+    return path
+
+
+@pytest.fixture
+def mock_open():
+    with patch("apps.parcels.services.rasters.rasterio.open", side_effect=lambda path: MagicMock()) as mock:
+        yield mock
+
+
+def test_pool_reuses_idle_handle(raster_file, mock_open):
+    pool = RasterPool(raster_file, max_handles=2)
+    with pool.dataset():
+        pass
+    with pool.dataset():
+        pass
+    assert mock_open.call_count == 1
+
+
+def test_pool_gives_concurrent_callers_separate_handles(raster_file, mock_open):
+    pool = RasterPool(raster_file, max_handles=2)
+    with pool.dataset() as first, pool.dataset() as second:
+        assert first is not second
+
+
+def test_pool_waits_when_all_handles_are_busy(raster_file, mock_open):
+    pool = RasterPool(raster_file, max_handles=1)
+    acquired = threading.Event()
+    released = threading.Event()
+
+    def hold_handle():
+        with pool.dataset():
+            acquired.set()
+            released.wait()
+
+    def use_handle():
+        with pool.dataset():
+            pass
+
+    holder = threading.Thread(target=hold_handle)
+    holder.start()
+    acquired.wait()
+    waiter = threading.Thread(target=use_handle)
+    waiter.start()
+    while pool.stats().waits == 0:
+        pass
+    released.set()
+    holder.join()
+    waiter.join()
+    assert mock_open.call_count == 1
+
+
+def test_pool_reopens_handles_when_file_changes(raster_file, mock_open):
+    pool = RasterPool(raster_file, max_handles=2)
+    with pool.dataset() as old_handle:
+        pass
+    stat = raster_file.stat()
+    os.utime(raster_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    with pool.dataset():
+        pass
+    assert old_handle.close.called
+
+
+def test_pool_stats_count_open_handles(raster_file, mock_open):
+    pool = RasterPool(raster_file, max_handles=3)
+    with pool.dataset(), pool.dataset():
+        pass
+    assert pool.stats().open_handles == 2
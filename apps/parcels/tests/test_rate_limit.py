@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+import pytest
+
+from apps.parcels.services.rate_limit import RateLimitExceeded, acquire
+
+
+@pytest.fixture
+def clock():
+    with patch("apps.parcels.services.rate_limit.time.time", return_value=1000.0) as mock_time, \
+         patch("apps.parcels.services.rate_limit.time.sleep") as mock_sleep:
+        yield mock_time, mock_sleep
+
+
+@pytest.mark.django_db
+def test_acquire_does_not_wait_with_full_bucket(clock):
+    _, mock_sleep = clock
+    acquire("test", rate=1.0, capacity=1.0, max_wait=5.0)
+    assert mock_sleep.call_count == 0
+
+
+@pytest.mark.django_db
+def test_acquire_waits_for_next_token(clock):
+    _, mock_sleep = clock
+    acquire("test", rate=1.0, capacity=1.0, max_wait=5.0)
+    acquire("test", rate=1.0, capacity=1.0, max_wait=5.0)
+    mock_sleep.assert_called_once_with(1.0)
+
+
+@pytest.mark.django_db
+def test_acquire_queues_concurrent_callers_in_order(clock):
+    _, mock_sleep = clock
+    for _ in range(3):
+        acquire("test", rate=1.0, capacity=1.0, max_wait=5.0)
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [1.0, 2.0]
+
+
+@pytest.mark.django_db
+def test_acquire_refills_tokens_over_time(clock):
+    mock_time, mock_sleep = clock
+    acquire("test", rate=1.0, capacity=1.0, max_wait=5.0)
+    mock_time.return_value = 1001.0
+    acquire("test", rate=1.0, capacity=1.0, max_wait=5.0)
+    assert mock_sleep.call_count == 0
+
+
+@pytest.mark.django_db
+def test_acquire_raises_when_wait_exceeds_limit(clock):
+    acquire("test", rate=1.0, capacity=1.0, max_wait=0.5)
+    with pytest.raises(RateLimitExceeded):
+        acquire("test", rate=1.0, capacity=1.0, max_wait=0.5)
@@ -0,0 +1,129 @@
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from apps.parcels.models import Parcel
+from apps.parcels.services.koppen import KoppenLookup
+from apps.parcels.services.macrostrat import MacrostratError
+from apps.parcels.services.soilgrids import SoilData
+
+CFB = 15
+
+
+def _lookup(lats, lons):
+    count = len(lats)
+    codes = np.array([0 if lat > 80 else CFB for lat in lats], dtype=np.uint8)
+    return KoppenLookup(
+        codes=codes,
+        labels=np.array(["" if code == 0 else "Cfb - Oceanic" for code in codes]),
+        nodata=codes == 0,
+        approximate=np.zeros(count, dtype=np.bool_),
+        periods=("1991-2020",),
+        period_codes=codes[:, np.newaxis],
+    )
+
+
+@pytest.fixture
+def services():
+    with patch("apps.parcels.services.analysis.get_koppen_zones", side_effect=_lookup) as koppen, \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=SoilData(6.5, "Well-drained")) as soil:
+        yield koppen, soil
+
+
+@pytest.fixture
+def parcels(user):
+    return [Parcel.objects.create(user=user, latitude=48.0 + index, longitude=2.0) for index in range(5)]
+
+
+def test_reanalyze_updates_climate_zone(parcels, services):
+    call_command("reanalyze_parcels", "--workers", "1")
+    assert set(Parcel.objects.values_list("climate_zone", flat=True)) == {"Cfb - Oceanic"}
+
+
+def test_reanalyze_updates_soil(parcels, services):
+    call_command("reanalyze_parcels", "--workers", "1")
+    assert set(Parcel.objects.values_list("soil_ph", flat=True)) == {6.5}
+
+
+def test_reanalyze_stores_soil_approximate_flag(parcels, services):
+    _, soil = services
+    soil.return_value = SoilData(6.5, "Well-drained", approximate=True)
+    call_command("reanalyze_parcels", "--workers", "1")
+    assert set(Parcel.objects.values_list("soil_approximate", flat=True)) == {True}
+
+
+def test_reanalyze_reads_raster_once_per_chunk(parcels, services):
+    koppen, _ = services
+    call_command("reanalyze_parcels", "--workers", "1", "--chunk-size", "2")
+    assert koppen.call_count == 3
+
+
+def test_reanalyze_skips_parcels_without_location(user, services):
+    Parcel.objects.create(user=user)
+    call_command("reanalyze_parcels", "--workers", "1")
+    assert Parcel.objects.get().climate_zone == ""
+
+
+def test_reanalyze_skip_soil_makes_no_soil_lookups(parcels, services):
+    _, soil = services
+    call_command("reanalyze_parcels", "--skip-soil")
+    assert soil.call_count == 0
+
+
+def test_reanalyze_marks_complete_profiles_current(parcels, services):
+    call_command("reanalyze_parcels", "--workers", "1")
+    assert all(parcel.analysis_fingerprint for parcel in Parcel.objects.all())
+
+
+def test_reanalyze_counts_soil_errors(parcels, services, capsys):
+    _, soil = services
+    soil.side_effect = MacrostratError("down")
+    with patch("apps.parcels.services.analysis.get_geology_soil_data", side_effect=MacrostratError("down")):
+        call_command("reanalyze_parcels", "--workers", "1")
+    assert "5 soil lookups failed" in capsys.readouterr().out
+
+
+def test_reanalyze_keeps_measured_soil_when_soilgrids_is_throttled(parcels, services, settings):
+    settings.SOIL_HEDGE_AFTER_SECONDS = 0.01
+    settings.SOIL_LOOKUP_DEADLINE_SECONDS = 0.05
+    _, soil = services
+
+    def queued_behind_rate_limit(lat, lon, **kwargs):
+        time.sleep(0.1)
+        return SoilData(6.5, "Well-drained")
+
+    soil.side_effect = queued_behind_rate_limit
+    with patch("apps.parcels.services.analysis.get_geology_soil_data", return_value=SoilData(7.0, "Poorly drained")):
+        call_command("reanalyze_parcels", "--workers", "2", "--soilgrids-rate", "1000")
+    assert set(Parcel.objects.values_list("soil_source", flat=True)) == {"measured"}
+
+
+def test_reanalyze_sizes_soil_deadline_to_the_rate_limit(parcels, services):
+    _, soil = services
+    started = time.monotonic()
+    call_command("reanalyze_parcels", "--workers", "2", "--soilgrids-rate", "0.1")
+    assert soil.call_args.kwargs["deadline"] - started > 2 * 4 / 0.1
+
+
+def test_reanalyze_counts_parcels_without_climate_data(user, services, capsys):
+    Parcel.objects.create(user=user, latitude=85.0, longitude=0.0)
+    call_command("reanalyze_parcels", "--skip-soil")
+    assert "1 without climate data" in capsys.readouterr().out
+
+
+def test_reanalyze_resumes_after_checkpoint(parcels, services, tmp_path):
+    checkpoint = tmp_path / "reanalyze.checkpoint"
+    checkpoint.write_text(str(parcels[2].pk))
+    call_command("reanalyze_parcels", "--skip-soil", "--checkpoint", str(checkpoint))
+    assert list(Parcel.objects.exclude(climate_zone="").values_list("pk", flat=True).order_by("pk")) == [
+        parcels[3].pk, parcels[4].pk,
+    ]
+
+
+def test_reanalyze_removes_checkpoint_when_done(parcels, services, tmp_path):
+    checkpoint = tmp_path / "reanalyze.checkpoint"
+    call_command("reanalyze_parcels", "--skip-soil", "--checkpoint", str(checkpoint))
+    assert not checkpoint.exists()
@@ -1,59 +1,335 @@
+import json
+import os
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import httpx
 import numpy as np
 import pytest
-
-from apps.parcels.services.koppen import KoppenError, get_koppen_zone
+import rasterio
+from affine import Affine
+from rasterio.io import MemoryFile
+from rasterio.windows import Window
+
+from apps.parcels.services.koppen import (
+    KoppenError,
+    get_koppen_zone,
+    get_koppen_zone_shares,
+    get_koppen_zones,
+    koppen_dataset_version,
+)
+from apps.parcels.services import soil_cache
 from apps.parcels.services.macrostrat import MacrostratError, get_geology_soil_data
-from apps.parcels.services.soilgrids import SoilGridsError, get_soil_data
+from apps.parcels.services.rate_limit import RateLimitExceeded
+from apps.parcels.services.soilgrids import SOILGRIDS_API_URL, SoilData, SoilGridsError, get_soil_data
 import apps.parcels.services.koppen as koppen_module
+import apps.parcels.services.macrostrat as macrostrat_module
+import apps.parcels.services.soilgrids as soilgrids_module
+from scripts.build_koppen_grid import build_grid, build_nearest_index
 
 
 @pytest.fixture(autouse=True)
 def reset_singleton():
-    koppen_module._raster = None
+    koppen_module._raster_pool = None
+    koppen_module._grid = None
     yield
-    koppen_module._raster = None
+    koppen_module._raster_pool = None
+    koppen_module._grid = None
+    for pool in soilgrids_module._raster_pools.values():
+        pool.close()
+    soilgrids_module._raster_pools.clear()
+    soilgrids_module._breaker.reset()
+    macrostrat_module._breaker.reset()
+
+
+KOPPEN_GRID = np.array([
+    [15, 15, 26, 26],
+    [15, 15, 26, 0],
+    [8, 8, 0, 0],
+    [8, 8, 0, 0],
+], dtype=np.uint8)
+
+
+def _fake_raster(data, block_shape=(2, 2)):
+    block_height, block_width = block_shape
+    height, width = data.shape
+    raster = MagicMock()
+    raster.height = height
+    raster.width = width
+    raster.transform = Affine(1.0, 0.0, 0.0, 0.0, -1.0, float(height))
+    raster.block_shapes = [block_shape]
+    raster.block_window.side_effect = lambda band, block_row, block_col: Window(
+        block_col * block_width,
+        block_row * block_height,
+        min(block_width, width - block_col * block_width),
+        min(block_height, height - block_row * block_height),
+    )
+    raster.read.side_effect = lambda band, window: data[
+        window.row_off:window.row_off + window.height,
+        window.col_off:window.col_off + window.width,
+    ]
+    return raster
+
+
+def _pixel_center(row, col):
+    return KOPPEN_GRID.shape[0] - row - 0.5, col + 0.5
 
 
 @pytest.fixture
 def mock_raster():
-    raster = MagicMock()
-    raster.index.return_value = (1000, 2000)
-    raster.read.return_value = np.array([[15]])
-    return raster
+    return _fake_raster(KOPPEN_GRID)
 
 
-def test_get_koppen_zone_returns_formatted_zone_string(mock_raster):
-    with patch("apps.parcels.services.koppen.rasterio") as mock_rasterio:
-        mock_rasterio.open.return_value = mock_raster
-        mock_rasterio.windows.Window = MagicMock()
+@pytest.fixture
+def koppen_raster(mock_raster, tmp_path):
+    geotiff_path = tmp_path / "koppen.tif"
+    geotiff_path.touch()
+    with patch("apps.parcels.services.rasters.rasterio.open", return_value=mock_raster):
         with patch("apps.parcels.services.koppen.settings") as mock_settings:
-            mock_settings.KOPPEN_GEOTIFF_PATH = MagicMock()
-            mock_settings.KOPPEN_GEOTIFF_PATH.exists.return_value = True
-            result = get_koppen_zone(48.85, 2.35)
-    assert result == "Cfb - Oceanic"
+            mock_settings.KOPPEN_GEOTIFF_PATH = geotiff_path
+            mock_settings.KOPPEN_RASTER_POOL_SIZE = 2
+            mock_settings.KOPPEN_GRID_PATH = Path("/nonexistent/grid.npy")
+            yield mock_raster
+
+
+FUTURE_KOPPEN_GRID = np.where(KOPPEN_GRID == 15, 14, KOPPEN_GRID).astype(np.uint8)
+
+
+@pytest.fixture
+def koppen_grid(tmp_path):
+    grid_path = tmp_path / "koppen_grid.npy"
+    np.save(grid_path, np.stack([KOPPEN_GRID, FUTURE_KOPPEN_GRID], axis=-1))
+    sidecar = {
+        "transform": [1.0, 0.0, 0.0, 0.0, -1.0, float(KOPPEN_GRID.shape[0])],
+        "periods": ["1991-2020", "2071-2099 (SSP2-4.5)"],
+    }
+    grid_path.with_suffix(".json").write_text(json.dumps(sidecar))
+    with patch("apps.parcels.services.koppen.settings") as mock_settings:
+        mock_settings.KOPPEN_GRID_PATH = grid_path
+        mock_settings.KOPPEN_GEOTIFF_PATH = Path("/nonexistent/path.tif")
+        yield grid_path
+
+
+def test_get_koppen_zone_returns_formatted_zone_string(koppen_raster):
+    result = get_koppen_zone(*_pixel_center(0, 1))
+    assert result.label == "Cfb - Oceanic"
 
 
 def test_get_koppen_zone_raises_error_when_geotiff_not_found():
     with patch("apps.parcels.services.koppen.settings") as mock_settings:
         mock_settings.KOPPEN_GEOTIFF_PATH = Path("/nonexistent/path.tif")
+        mock_settings.KOPPEN_GRID_PATH = Path("/nonexistent/grid.npy")
         with pytest.raises(KoppenError, match="Köppen GeoTIFF not found"):
             get_koppen_zone(48.85, 2.35)
 
 
-def test_get_koppen_zone_raises_error_for_nodata_value(mock_raster):
-    mock_raster.read.return_value = np.array([[0]])
-    with patch("apps.parcels.services.koppen.rasterio") as mock_rasterio:
-        mock_rasterio.open.return_value = mock_raster
-        mock_rasterio.windows.Window = MagicMock()
-        with patch("apps.parcels.services.koppen.settings") as mock_settings:
-            mock_settings.KOPPEN_GEOTIFF_PATH = MagicMock()
-            mock_settings.KOPPEN_GEOTIFF_PATH.exists.return_value = True
-            with pytest.raises(KoppenError, match="No climate data available"):
-                get_koppen_zone(48.85, 2.35)
+def test_get_koppen_zone_raises_error_for_nodata_value(koppen_raster):
+    with pytest.raises(KoppenError, match="No climate data available"):
+        get_koppen_zone(*_pixel_center(3, 3))
+
+
+def test_get_koppen_zones_returns_labels_for_each_point(koppen_raster):
+    points = [_pixel_center(0, 0), _pixel_center(0, 3), _pixel_center(3, 0)]
+    lats, lons = zip(*points)
+    result = get_koppen_zones(np.array(lats), np.array(lons))
+    assert list(result.labels) == [
+        "Cfb - Oceanic", "Dfb - Warm-summer humid continental", "Csa - Hot-summer Mediterranean",
+    ]
+
+
+def test_get_koppen_zones_flags_nodata_and_out_of_bounds_points(koppen_raster):
+    points = [_pixel_center(0, 0), _pixel_center(1, 3), (50.0, 2.0)]
+    lats, lons = zip(*points)
+    result = get_koppen_zones(np.array(lats), np.array(lons))
+    assert list(result.nodata) == [False, True, True]
+
+
+def test_get_koppen_zones_reads_each_block_once(koppen_raster):
+    points = [_pixel_center(0, 0), _pixel_center(1, 1), _pixel_center(0, 1), _pixel_center(2, 2)]
+    lats, lons = zip(*points)
+    get_koppen_zones(np.array(lats), np.array(lons))
+    assert koppen_raster.read.call_count == 2
+
+
+def test_get_koppen_zone_reads_from_memory_mapped_grid(koppen_grid):
+    result = get_koppen_zone(*_pixel_center(2, 1))
+    assert result.label == "Csa - Hot-summer Mediterranean"
+
+
+def test_get_koppen_zones_flags_nodata_in_memory_mapped_grid(koppen_grid):
+    lats, lons = zip(_pixel_center(0, 2), _pixel_center(2, 3), (50.0, 2.0))
+    result = get_koppen_zones(np.array(lats), np.array(lons))
+    assert list(result.nodata) == [False, True, True]
+
+
+def test_get_koppen_zone_reloads_grid_after_rebuild(koppen_grid):
+    get_koppen_zone(*_pixel_center(0, 0))
+    rebuilt = np.stack([KOPPEN_GRID, FUTURE_KOPPEN_GRID], axis=-1)
+    rebuilt[0, 0, 0] = 14
+    np.save(koppen_grid, rebuilt)
+    os.utime(koppen_grid, ns=(0, koppen_module._grid.mtime_ns + 1))
+    result = get_koppen_zone(*_pixel_center(0, 0))
+    assert result.label == "Cfa - Humid subtropical"
+
+
+def test_get_koppen_zone_returns_trajectory_for_every_period(koppen_grid):
+    result = get_koppen_zone(*_pixel_center(0, 0))
+    assert result.trajectory == {
+        "1991-2020": "Cfb - Oceanic", "2071-2099 (SSP2-4.5)": "Cfa - Humid subtropical",
+    }
+
+
+def test_get_koppen_zone_returns_baseline_trajectory_without_grid(koppen_raster):
+    result = get_koppen_zone(*_pixel_center(0, 0))
+    assert result.trajectory == {"1991-2020": "Cfb - Oceanic"}
+
+
+def test_get_koppen_zones_returns_period_codes_in_one_lookup(koppen_grid):
+    lats, lons = zip(_pixel_center(0, 0), _pixel_center(2, 0))
+    result = get_koppen_zones(np.array(lats), np.array(lons))
+    assert result.period_codes.tolist() == [[15, 14], [8, 8]]
+
+
+@pytest.fixture
+def koppen_grid_with_nearest_index(koppen_grid):
+    pixels, offsets = build_nearest_index(KOPPEN_GRID, radius=1)
+    np.save(koppen_grid.with_name("nearest_pixels.npy"), pixels)
+    np.save(koppen_grid.with_name("nearest_offsets.npy"), offsets)
+    sidecar = json.loads(koppen_grid.with_suffix(".json").read_text())
+    sidecar.update(nearest_pixels="nearest_pixels.npy", nearest_offsets="nearest_offsets.npy")
+    koppen_grid.with_suffix(".json").write_text(json.dumps(sidecar))
+    return koppen_grid
+
+
+def test_get_koppen_zone_resolves_nodata_to_nearest_zone(koppen_grid_with_nearest_index):
+    result = get_koppen_zone(*_pixel_center(1, 3))
+    assert result.label == "Dfb - Warm-summer humid continental"
+
+
+def test_get_koppen_zone_resolves_nearest_zone_for_every_period(koppen_grid_with_nearest_index):
+    result = get_koppen_zone(*_pixel_center(1, 3))
+    assert len(result.trajectory) == 2
+
+
+def test_get_koppen_zone_flags_nearest_zone_as_approximate(koppen_grid_with_nearest_index):
+    result = get_koppen_zone(*_pixel_center(1, 3))
+    assert result.approximate is True
+
+
+def test_get_koppen_zone_is_not_approximate_on_valid_pixel(koppen_grid_with_nearest_index):
+    result = get_koppen_zone(*_pixel_center(0, 0))
+    assert result.approximate is False
+
+
+def test_get_koppen_zone_raises_error_beyond_nearest_index_radius(koppen_grid_with_nearest_index):
+    with pytest.raises(KoppenError, match="No climate data available"):
+        get_koppen_zone(*_pixel_center(3, 3))
+
+
+def test_get_koppen_zone_ignores_grid_its_sidecar_does_not_describe(koppen_grid):
+    sidecar = json.loads(koppen_grid.with_suffix(".json").read_text())
+    sidecar["grid_mtime_ns"] = koppen_grid.stat().st_mtime_ns + 1
+    koppen_grid.with_suffix(".json").write_text(json.dumps(sidecar))
+    with pytest.raises(KoppenError, match="GeoTIFF not found"):
+        get_koppen_zone(*_pixel_center(0, 0))
+
+
+@pytest.fixture
+def koppen_geotiffs(tmp_path):
+    paths = {}
+    for label, codes in [("1991-2020", KOPPEN_GRID), ("2071-2099 (SSP2-4.5)", FUTURE_KOPPEN_GRID)]:
+        path = tmp_path / f"{label[:4]}.tif"
+        with rasterio.open(
+            path, "w", driver="GTiff", height=codes.shape[0], width=codes.shape[1], count=1, dtype="uint8",
+            crs="EPSG:4326", transform=Affine(1.0, 0.0, 0.0, 0.0, -1.0, float(codes.shape[0])),
+        ) as dataset:
+            dataset.write(codes, 1)
+        paths[label] = path
+    return paths
+
+
+def test_build_grid_rebuild_writes_nearest_index_under_new_names(koppen_geotiffs, tmp_path):
+    grid_path = tmp_path / "koppen_grid.npy"
+    build_grid(koppen_geotiffs, grid_path)
+    first = json.loads(grid_path.with_suffix(".json").read_text())["nearest_pixels"]
+    build_grid(koppen_geotiffs, grid_path)
+    assert json.loads(grid_path.with_suffix(".json").read_text())["nearest_pixels"] != first
+
+
+def test_build_grid_rebuild_removes_previous_nearest_index(koppen_geotiffs, tmp_path):
+    grid_path = tmp_path / "koppen_grid.npy"
+    build_grid(koppen_geotiffs, grid_path)
+    first = json.loads(grid_path.with_suffix(".json").read_text())["nearest_pixels"]
+    build_grid(koppen_geotiffs, grid_path)
+    assert not grid_path.with_name(first).exists()
+
+
+def test_build_grid_sidecar_describes_built_grid(koppen_geotiffs, tmp_path):
+    grid_path = tmp_path / "koppen_grid.npy"
+    build_grid(koppen_geotiffs, grid_path)
+    sidecar = json.loads(grid_path.with_suffix(".json").read_text())
+    assert sidecar["grid_mtime_ns"] == grid_path.stat().st_mtime_ns
+
+
+def test_koppen_dataset_version_changes_when_grid_is_rebuilt_from_other_geotiffs(koppen_geotiffs, tmp_path):
+    grid_path = tmp_path / "koppen_grid.npy"
+    build_grid(koppen_geotiffs, grid_path)
+    with patch("apps.parcels.services.koppen.settings") as mock_settings:
+        mock_settings.KOPPEN_GRID_PATH = grid_path
+        before = koppen_dataset_version()
+        build_grid({"1991-2020": koppen_geotiffs["1991-2020"]}, grid_path)
+        assert koppen_dataset_version() != before
+
+
+def test_koppen_dataset_version_is_stable_across_identical_rebuilds(koppen_geotiffs, tmp_path):
+    grid_path = tmp_path / "koppen_grid.npy"
+    build_grid(koppen_geotiffs, grid_path)
+    first = json.loads(grid_path.with_suffix(".json").read_text())["version"]
+    build_grid(koppen_geotiffs, grid_path)
+    assert json.loads(grid_path.with_suffix(".json").read_text())["version"] == first
+
+
+def _box(min_lon, min_lat, max_lon, max_lat):
+    return {
+        "type": "Polygon",
+        "coordinates": [[
+            [min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat],
+            [min_lon, max_lat], [min_lon, min_lat],
+        ]],
+    }
+
+
+def test_get_koppen_zone_shares_splits_polygon_across_zones(koppen_grid):
+    result = get_koppen_zone_shares(_box(1.0, 2.0, 3.0, 4.0))
+    assert result == {"Cfb - Oceanic": 0.5, "Dfb - Warm-summer humid continental": 0.5}
+
+
+def test_get_koppen_zone_shares_ignores_nodata_pixels(koppen_grid):
+    result = get_koppen_zone_shares(_box(2.0, 2.0, 4.0, 4.0))
+    assert result == {"Dfb - Warm-summer humid continental": 1.0}
+
+
+def test_get_koppen_zone_shares_uses_containing_pixel_for_small_polygon(koppen_grid):
+    result = get_koppen_zone_shares(_box(0.2, 1.2, 0.4, 1.4))
+    assert result == {"Csa - Hot-summer Mediterranean": 1.0}
+
+
+def test_get_koppen_zone_shares_excludes_pixels_outside_triangle(koppen_grid):
+    triangle = {"type": "Polygon", "coordinates": [[[0.0, 4.0], [2.0, 4.0], [0.0, 0.0], [0.0, 4.0]]]}
+    result = get_koppen_zone_shares(triangle)
+    assert result == {"Cfb - Oceanic": 0.75, "Csa - Hot-summer Mediterranean": 0.25}
+
+
+def test_get_koppen_zone_shares_raises_error_when_only_nodata(koppen_grid):
+    with pytest.raises(KoppenError, match="No climate data available"):
+        get_koppen_zone_shares(_box(2.0, 0.0, 4.0, 2.0))
+
+
+def test_get_koppen_zone_shares_reads_only_bounding_window_from_geotiff(koppen_raster):
+    get_koppen_zone_shares(_box(1.0, 2.0, 3.0, 4.0))
+    window = koppen_raster.read.call_args.kwargs["window"]
+    assert (window.col_off, window.row_off, window.width, window.height) == (1, 0, 2, 2)
 
 
 # --- Story 2.5: SoilGrids service tests ---
@@ -89,18 +365,21 @@ def _mock_response(json_data, status_code=200):
     return mock_resp
 
 
+@pytest.mark.django_db
 def test_get_soil_data_returns_correct_ph():
-    with patch("apps.parcels.services.soilgrids.httpx.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)):
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)):
         result = get_soil_data(48.85, 2.35)
     assert result.ph == 6.5
 
 
+@pytest.mark.django_db
 def test_get_soil_data_derives_moderately_drained_when_neither_dominant():
-    with patch("apps.parcels.services.soilgrids.httpx.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)):
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)):
         result = get_soil_data(48.85, 2.35)
     assert result.drainage == "Moderately drained"
 
 
+@pytest.mark.django_db
 def test_get_soil_data_derives_well_drained_when_sand_high():
     response = {
         "properties": {
@@ -111,11 +390,12 @@ def test_get_soil_data_derives_well_drained_when_sand_high():
             ]
         }
     }
-    with patch("apps.parcels.services.soilgrids.httpx.get", return_value=_mock_response(response)):
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(response)):
         result = get_soil_data(48.85, 2.35)
     assert result.drainage == "Well-drained"
 
 
+@pytest.mark.django_db
 def test_get_soil_data_derives_poorly_drained_when_clay_high():
     response = {
         "properties": {
@@ -126,24 +406,26 @@ def test_get_soil_data_derives_poorly_drained_when_clay_high():
             ]
         }
     }
-    with patch("apps.parcels.services.soilgrids.httpx.get", return_value=_mock_response(response)):
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(response)):
         result = get_soil_data(48.85, 2.35)
     assert result.drainage == "Poorly drained"
 
 
+@pytest.mark.django_db
 def test_get_soil_data_raises_error_on_timeout():
-    with patch("apps.parcels.services.soilgrids.httpx.get", side_effect=httpx.TimeoutException("timed out")):
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", side_effect=httpx.TimeoutException("timed out")):
         with pytest.raises(SoilGridsError, match="timed out"):
             get_soil_data(48.85, 2.35)
 
 
+@pytest.mark.django_db
 def test_get_soil_data_raises_error_on_http_error():
     mock_resp = MagicMock()
     mock_resp.status_code = 500
     mock_resp.raise_for_status.side_effect = httpx.HTTPStatusError(
         "Server Error", request=MagicMock(), response=mock_resp,
     )
-    with patch("apps.parcels.services.soilgrids.httpx.get", return_value=mock_resp):
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=mock_resp):
         with pytest.raises(SoilGridsError, match="500"):
             get_soil_data(48.85, 2.35)
 
@@ -159,91 +441,443 @@ MOCK_NONE_RESPONSE = {
 }
 
 
-def test_get_soil_data_falls_back_to_nearby_when_original_has_no_data():
-    with patch("apps.parcels.services.soilgrids.httpx.get", side_effect=[
-        _mock_response(MOCK_NONE_RESPONSE),
-        _mock_response(MOCK_SOILGRIDS_RESPONSE),
-    ]):
+def _soilgrids_by_point(responses, default):
+    def respond(url, params, **kwargs):
+        return _mock_response(responses.get((params["lat"], params["lon"]), default))
+    return respond
+
+
+@pytest.fixture
+def offsets_mode(settings):
+    settings.SOILGRIDS_NEARBY_MODE = "offsets"
+
+
+@pytest.mark.django_db
+def test_get_soil_data_falls_back_to_nearby_when_original_has_no_data(offsets_mode):
+    respond = _soilgrids_by_point({(48.85, 2.35): MOCK_NONE_RESPONSE}, MOCK_SOILGRIDS_RESPONSE)
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", side_effect=respond):
         result = get_soil_data(48.85, 2.35)
     assert result.approximate is True
 
 
+@pytest.mark.django_db
+def test_get_soil_data_prefers_closest_ring_with_data(offsets_mode):
+    ring_one_data = {
+        "properties": {
+            "layers": [
+                {"name": "phh2o", "depths": [{"values": {"mean": 72}}]},
+                {"name": "clay", "depths": [{"values": {"mean": 100}}]},
+                {"name": "sand", "depths": [{"values": {"mean": 700}}]},
+            ]
+        }
+    }
+    respond = _soilgrids_by_point(
+        {(48.85, 2.35): MOCK_NONE_RESPONSE, (48.85, 2.35 - 0.05): ring_one_data},
+        MOCK_NONE_RESPONSE,
+    )
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", side_effect=respond):
+        result = get_soil_data(48.85, 2.35)
+    assert result.ph == 7.2
+
+
+@pytest.mark.django_db
+def test_get_soil_data_raises_error_when_deadline_exceeded(offsets_mode):
+    def slow_response(url, params, **kwargs):
+        time.sleep(0.2)
+        return _mock_response(MOCK_NONE_RESPONSE)
+
+    with patch("apps.parcels.services.soilgrids.DEADLINE_SECONDS", 0.05), \
+         patch("apps.parcels.services.soilgrids.httpx.Client.get", side_effect=slow_response):
+        with pytest.raises(SoilGridsError, match="timed out"):
+            get_soil_data(48.85, 2.35)
+
+
+@pytest.mark.django_db
 def test_get_soil_data_is_not_approximate_when_original_has_data():
-    with patch("apps.parcels.services.soilgrids.httpx.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)):
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)):
         result = get_soil_data(48.85, 2.35)
     assert result.approximate is False
 
 
-def test_get_soil_data_raises_error_when_no_nearby_data():
-    with patch("apps.parcels.services.soilgrids.httpx.get", return_value=_mock_response(MOCK_NONE_RESPONSE)):
+@pytest.mark.django_db
+def test_get_soil_data_raises_error_when_no_nearby_data(offsets_mode):
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(MOCK_NONE_RESPONSE)):
+        with pytest.raises(SoilGridsError, match="no data"):
+            get_soil_data(48.85, 2.35)
+
+
+def _geotiff_bytes(values):
+    # 0.1° cells centred on (48.85, 2.35), matching the 0.25° coverage box.
+    with MemoryFile() as memfile:
+        with memfile.open(
+            driver="GTiff", height=values.shape[0], width=values.shape[1], count=1, dtype="int16",
+            crs="EPSG:4326", transform=Affine(0.1, 0.0, 2.10, 0.0, -0.1, 49.10), nodata=-32768,
+        ) as dataset:
+            dataset.write(values.astype(np.int16), 1)
+        return memfile.read()
+
+
+def _coverage_responses(values_by_property):
+    def respond(url, params, **kwargs):
+        if url == SOILGRIDS_API_URL:
+            return _mock_response(MOCK_NONE_RESPONSE)
+        mock_resp = _mock_response(None)
+        mock_resp.content = _geotiff_bytes(values_by_property[params["COVERAGEID"].split("_")[0]])
+        return mock_resp
+    return respond
+
+
+def _coverage(value, cells):
+    values = np.full((5, 5), -32768)
+    for cell in cells:
+        values[cell] = value
+    return values
+
+
+COVERAGE_WITH_NEARBY_DATA = {
+    "phh2o": _coverage(70, [(2, 3), (0, 0)]),
+    "clay": _coverage(450, [(2, 3), (0, 0)]),
+    "sand": _coverage(200, [(2, 3), (0, 0)]),
+}
+
+
+@pytest.mark.django_db
+def test_get_soil_data_coverage_picks_nearest_valid_cell():
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", side_effect=_coverage_responses(COVERAGE_WITH_NEARBY_DATA)):
+        result = get_soil_data(48.85, 2.35)
+    assert result == SoilData(ph=7.0, drainage="Poorly drained", approximate=True)
+
+
+@pytest.mark.django_db
+def test_get_soil_data_coverage_skips_cells_missing_a_property():
+    ph = _coverage(70, [(2, 3)])
+    ph[0, 0] = 55
+    coverage = {**COVERAGE_WITH_NEARBY_DATA, "phh2o": ph, "sand": _coverage(200, [(0, 0)])}
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", side_effect=_coverage_responses(coverage)):
+        result = get_soil_data(48.85, 2.35)
+    assert result.ph == 5.5
+
+
+@pytest.mark.django_db
+def test_get_soil_data_coverage_raises_error_when_box_has_no_data():
+    coverage = {name: _coverage(0, []) for name in ("phh2o", "clay", "sand")}
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", side_effect=_coverage_responses(coverage)):
         with pytest.raises(SoilGridsError, match="no data"):
             get_soil_data(48.85, 2.35)
 
 
+@pytest.mark.django_db
+def test_get_soil_data_coverage_skips_box_when_point_has_data():
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)) as mock_get:
+        get_soil_data(48.85, 2.35)
+    assert mock_get.call_count == 1
+
+
+@pytest.mark.django_db
+def test_get_soil_data_uses_cached_cell_without_calling_api():
+    soil_cache.store({soil_cache.cell_key(48.85, 2.35): (65.0, 250.0, 350.0)})
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get") as mock_get:
+        get_soil_data(48.85, 2.35)
+    assert mock_get.call_count == 0
+
+
+@pytest.mark.django_db
+def test_get_soil_data_returns_cached_values():
+    soil_cache.store({soil_cache.cell_key(48.85, 2.35): (72.0, 100.0, 700.0)})
+    result = get_soil_data(48.85, 2.35)
+    assert result == SoilData(ph=7.2, drainage="Well-drained", approximate=False)
+
+
+@pytest.mark.django_db
+def test_get_soil_data_caches_api_result_for_neighbouring_point():
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)) as mock_get:
+        get_soil_data(48.85, 2.35)
+        get_soil_data(48.8501, 2.3501)
+    assert mock_get.call_count == 1
+
+
+@pytest.mark.django_db
+def test_get_soil_data_skips_cells_cached_as_nodata(offsets_mode):
+    soil_cache.store({soil_cache.cell_key(48.85, 2.35): None})
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)) as mock_get:
+        get_soil_data(48.85, 2.35)
+    assert (48.85, 2.35) not in [(c.kwargs["params"]["lat"], c.kwargs["params"]["lon"]) for c in mock_get.call_args_list]
+
+
+@pytest.mark.django_db
+def test_get_soil_data_caches_nodata_cells_found_while_probing(offsets_mode):
+    respond = _soilgrids_by_point({(48.85, 2.35): MOCK_NONE_RESPONSE}, MOCK_SOILGRIDS_RESPONSE)
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", side_effect=respond):
+        get_soil_data(48.85, 2.35)
+    assert soil_cache.lookup([(48.85, 2.35)]) == {soil_cache.cell_key(48.85, 2.35): None}
+
+
+@pytest.mark.django_db
+def test_get_soil_data_refetches_expired_cell(settings):
+    settings.SOILGRIDS_CACHE_TTL_SECONDS = 0
+    soil_cache.store({soil_cache.cell_key(48.85, 2.35): (65.0, 250.0, 350.0)})
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)) as mock_get:
+        get_soil_data(48.85, 2.35)
+    assert mock_get.call_count == 1
+
+
+@pytest.mark.django_db
+def test_soil_cache_stats_counts_hits_and_misses():
+    before = soil_cache.soil_cache_stats()
+    soil_cache.store({soil_cache.cell_key(48.85, 2.35): None})
+    soil_cache.lookup([(48.85, 2.35), (10.0, 10.0)])
+    after = soil_cache.soil_cache_stats()
+    assert (after.hits - before.hits, after.misses - before.misses) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_get_soil_data_fails_fast_when_breaker_is_open():
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", side_effect=httpx.ConnectError("down")):
+        for _ in range(5):
+            with pytest.raises(SoilGridsError):
+                get_soil_data(48.85, 2.35)
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get") as mock_get:
+        with pytest.raises(SoilGridsError, match="temporarily unavailable"):
+            get_soil_data(48.85, 2.35)
+    assert mock_get.call_count == 0
+
+
+@pytest.mark.django_db
+def test_get_soil_data_raises_timeout_when_deadline_already_passed():
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get") as mock_get:
+        with pytest.raises(SoilGridsError, match="timed out"):
+            get_soil_data(48.85, 2.35, deadline=time.monotonic())
+    assert mock_get.call_count == 0
+
+
+@pytest.mark.django_db
+def test_get_soil_data_skips_request_when_rate_limit_slot_is_past_deadline():
+    with patch("apps.parcels.services.soilgrids.throttle", side_effect=RateLimitExceeded("next slot in 12.0s")), \
+         patch("apps.parcels.services.soilgrids.httpx.Client.get") as mock_get:
+        with pytest.raises(SoilGridsError, match="timed out"):
+            get_soil_data(48.85, 2.35)
+    assert mock_get.call_count == 0
+
+
+@pytest.fixture
+def soilgrids_rasters(tmp_path, settings):
+    settings.SOILGRIDS_RASTER_DIR = tmp_path
+
+    def write(values_by_property):
+        for name, values in values_by_property.items():
+            (tmp_path / f"{name}_0-5cm_mean.tif").write_bytes(_geotiff_bytes(values))
+    return write
+
+
+LOCAL_WITH_POINT_DATA = {
+    "phh2o": _coverage(68, [(2, 2)]),
+    "clay": _coverage(100, [(2, 2)]),
+    "sand": _coverage(700, [(2, 2)]),
+}
+
+
+def test_get_soil_data_reads_local_rasters(soilgrids_rasters):
+    soilgrids_rasters(LOCAL_WITH_POINT_DATA)
+    result = get_soil_data(48.85, 2.35)
+    assert result == SoilData(ph=6.8, drainage="Well-drained", approximate=False)
+
+
+def test_get_soil_data_skips_api_when_local_rasters_cover_point(soilgrids_rasters):
+    soilgrids_rasters(LOCAL_WITH_POINT_DATA)
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get") as mock_get:
+        get_soil_data(48.85, 2.35)
+    assert mock_get.call_count == 0
+
+
+def test_get_soil_data_local_rasters_pick_nearest_valid_cell(soilgrids_rasters):
+    soilgrids_rasters(COVERAGE_WITH_NEARBY_DATA)
+    result = get_soil_data(48.85, 2.35)
+    assert result == SoilData(ph=7.0, drainage="Poorly drained", approximate=True)
+
+
+@pytest.mark.django_db
+def test_get_soil_data_falls_back_to_api_outside_local_rasters(soilgrids_rasters):
+    soilgrids_rasters(LOCAL_WITH_POINT_DATA)
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)):
+        result = get_soil_data(10.0, 10.0)
+    assert result.ph == 6.5
+
+
+@pytest.mark.django_db
+def test_get_soil_data_falls_back_to_api_when_a_local_raster_is_missing(soilgrids_rasters):
+    soilgrids_rasters({"phh2o": LOCAL_WITH_POINT_DATA["phh2o"]})
+    with patch("apps.parcels.services.soilgrids.httpx.Client.get", return_value=_mock_response(MOCK_SOILGRIDS_RESPONSE)):
+        result = get_soil_data(48.85, 2.35)
+    assert result.ph == 6.5
+
+
 # --- Story 2.5b: Macrostrat service tests ---
 
 
+PARIS_BASIN_GEOMETRY = {
+    "type": "Polygon",
+    "coordinates": [[[2.0, 48.5], [3.0, 48.5], [3.0, 49.0], [2.0, 49.0], [2.0, 48.5]]],
+}
+
 MOCK_MACROSTRAT_RESPONSE = {
-    "success": {"v": 2},
-    "data": [
+    "type": "FeatureCollection",
+    "features": [
         {
-            "map_id": 12345,
-            "name": "Paris Basin",
-            "lith": "limestone [60.0%..80.0%]; clay [20.0%..40.0%]",
-            "liths": [1, 2],
-            "best_int_name": "Cretaceous",
+            "type": "Feature",
+            "geometry": PARIS_BASIN_GEOMETRY,
+            "properties": {
+                "map_id": 12345,
+                "name": "Paris Basin",
+                "lith": "limestone [60.0%..80.0%]; clay [20.0%..40.0%]",
+                "liths": [1, 2],
+                "best_int_name": "Cretaceous",
+            },
         }
     ],
 }
 
 
+@pytest.mark.django_db
 def test_get_geology_soil_data_returns_correct_ph_for_limestone():
-    with patch("apps.parcels.services.macrostrat.httpx.get", return_value=_mock_response(MOCK_MACROSTRAT_RESPONSE)):
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(MOCK_MACROSTRAT_RESPONSE)):
         result = get_geology_soil_data(48.85, 2.35)
     assert result.ph == 7.5
 
 
+@pytest.mark.django_db
 def test_get_geology_soil_data_returns_correct_drainage_for_limestone():
-    with patch("apps.parcels.services.macrostrat.httpx.get", return_value=_mock_response(MOCK_MACROSTRAT_RESPONSE)):
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(MOCK_MACROSTRAT_RESPONSE)):
         result = get_geology_soil_data(48.85, 2.35)
     assert result.drainage == "Well-drained"
 
 
+@pytest.mark.django_db
 def test_get_geology_soil_data_raises_error_on_timeout():
-    with patch("apps.parcels.services.macrostrat.httpx.get", side_effect=httpx.TimeoutException("timed out")):
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", side_effect=httpx.TimeoutException("timed out")):
         with pytest.raises(MacrostratError, match="timed out"):
             get_geology_soil_data(48.85, 2.35)
 
 
+@pytest.mark.django_db
 def test_get_geology_soil_data_raises_error_on_empty_data():
-    empty_response = {"success": {"v": 2}, "data": []}
-    with patch("apps.parcels.services.macrostrat.httpx.get", return_value=_mock_response(empty_response)):
+    empty_response = {"type": "FeatureCollection", "features": []}
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(empty_response)):
         with pytest.raises(MacrostratError, match="No geology data"):
             get_geology_soil_data(48.85, 2.35)
 
 
+@pytest.mark.django_db
 def test_get_geology_soil_data_raises_error_on_http_error():
     mock_resp = MagicMock()
     mock_resp.status_code = 500
     mock_resp.raise_for_status.side_effect = httpx.HTTPStatusError(
         "Server Error", request=MagicMock(), response=mock_resp,
     )
-    with patch("apps.parcels.services.macrostrat.httpx.get", return_value=mock_resp):
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=mock_resp):
         with pytest.raises(MacrostratError, match="500"):
             get_geology_soil_data(48.85, 2.35)
 
 
+@pytest.mark.django_db
 def test_get_geology_soil_data_raises_error_on_empty_lith():
     response_data = {
-        "success": {"v": 2},
-        "data": [{"map_id": 1, "name": "Unit", "lith": "", "liths": []}],
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "geometry": None, "properties": {"map_id": 1, "name": "Unit", "lith": "", "liths": []}}],
     }
-    with patch("apps.parcels.services.macrostrat.httpx.get", return_value=_mock_response(response_data)):
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(response_data)):
         with pytest.raises(MacrostratError, match="No lithology data"):
             get_geology_soil_data(48.85, 2.35)
 
 
+@pytest.mark.django_db
+def test_get_geology_soil_data_raises_error_on_non_string_lith():
+    response_data = {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "geometry": None, "properties": {"map_id": 1, "name": "Unit", "lith": ["limestone"], "liths": []}}],
+    }
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(response_data)):
+        with pytest.raises(MacrostratError, match="No lithology data"):
+            get_geology_soil_data(48.85, 2.35)
+
+
+@pytest.mark.django_db
 def test_get_geology_soil_data_returns_approximate_true():
-    with patch("apps.parcels.services.macrostrat.httpx.get", return_value=_mock_response(MOCK_MACROSTRAT_RESPONSE)):
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(MOCK_MACROSTRAT_RESPONSE)):
         result = get_geology_soil_data(48.85, 2.35)
     assert result.approximate is True
+
+
+@pytest.mark.django_db
+def test_get_geology_soil_data_raises_timeout_when_deadline_already_passed():
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get") as mock_get:
+        with pytest.raises(MacrostratError, match="timed out"):
+            get_geology_soil_data(48.85, 2.35, deadline=time.monotonic())
+    assert mock_get.call_count == 0
+
+
+@pytest.mark.django_db
+def test_get_geology_soil_data_skips_request_when_rate_limit_slot_is_past_deadline():
+    with patch("apps.parcels.services.macrostrat.throttle", side_effect=RateLimitExceeded("next slot in 1.0s")), \
+         patch("apps.parcels.services.macrostrat.httpx.Client.get") as mock_get:
+        with pytest.raises(MacrostratError, match="timed out"):
+            get_geology_soil_data(48.85, 2.35, deadline=time.monotonic() + 0.5)
+    assert mock_get.call_count == 0
+
+
+@pytest.mark.django_db
+def test_get_geology_soil_data_caps_timeout_at_deadline():
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(MOCK_MACROSTRAT_RESPONSE)) as mock_get:
+        get_geology_soil_data(48.85, 2.35, deadline=time.monotonic() + 2.0)
+    assert mock_get.call_args.kwargs["timeout"] <= 2.0
+
+
+@pytest.mark.django_db
+def test_get_geology_soil_data_fails_fast_when_breaker_is_open():
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", side_effect=httpx.TimeoutException("timed out")):
+        for _ in range(5):
+            with pytest.raises(MacrostratError):
+                get_geology_soil_data(48.85, 2.35)
+    with pytest.raises(MacrostratError, match="temporarily unavailable"):
+        get_geology_soil_data(48.85, 2.35)
+
+
+@pytest.mark.django_db
+def test_get_geology_soil_data_answers_points_inside_known_unit_from_cache():
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(MOCK_MACROSTRAT_RESPONSE)) as mock_get:
+        get_geology_soil_data(48.85, 2.35)
+        get_geology_soil_data(48.6, 2.9)
+    assert mock_get.call_count == 1
+
+
+@pytest.mark.django_db
+def test_get_geology_soil_data_returns_cached_unit_lithology():
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(MOCK_MACROSTRAT_RESPONSE)):
+        get_geology_soil_data(48.85, 2.35)
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get"):
+        result = get_geology_soil_data(48.6, 2.9)
+    assert result == SoilData(ph=7.5, drainage="Well-drained", approximate=True)
+
+
+@pytest.mark.django_db
+def test_get_geology_soil_data_queries_api_outside_known_units():
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(MOCK_MACROSTRAT_RESPONSE)) as mock_get:
+        get_geology_soil_data(48.85, 2.35)
+        get_geology_soil_data(45.0, 2.35)
+    assert mock_get.call_count == 2
+
+
+@pytest.mark.django_db
+def test_get_geology_soil_data_respects_polygon_holes():
+    with_hole = {
+        "type": "MultiPolygon",
+        "coordinates": [[
+            PARIS_BASIN_GEOMETRY["coordinates"][0],
+            [[2.3, 48.8], [2.4, 48.8], [2.4, 48.9], [2.3, 48.9], [2.3, 48.8]],
+        ]],
+    }
+    feature = {**MOCK_MACROSTRAT_RESPONSE["features"][0], "geometry": with_hole}
+    response = {**MOCK_MACROSTRAT_RESPONSE, "features": [feature]}
+    with patch("apps.parcels.services.macrostrat.httpx.Client.get", return_value=_mock_response(response)) as mock_get:
+        get_geology_soil_data(48.6, 2.9)
+        get_geology_soil_data(48.85, 2.35)
+    assert mock_get.call_count == 2
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from apps.parcels.services import single_flight as single_flight_module
+from apps.parcels.services.single_flight import advisory_lock, single_flight
+
+
+def _counting_compute(calls, result="profile", error=None):
+    async def compute(waited):
+        calls.append(waited)
+        await asyncio.sleep(0.2)
+        if error is not None:
+            raise error
+        return result
+    return compute
+
+
+def _call_concurrently(key, compute, callers=3):
+    """Run ``callers`` requests on their own threads and event loops, as under WSGI."""
+    results = []
+
+    def call():
+        try:
+            results.append(async_to_sync(single_flight)(key, compute))
+        except Exception as exc:
+            results.append(exc)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    while key not in single_flight_module._in_flight:
+        time.sleep(0.01)
+    threads += [threading.Thread(target=call) for _ in range(callers - 1)]
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_single_flight_runs_concurrent_calls_once():
+    calls = []
+    _call_concurrently("parcel:1", _counting_compute(calls))
+    assert len(calls) == 1
+
+
+def test_single_flight_shares_result_with_waiting_callers():
+    results = _call_concurrently("parcel:1", _counting_compute([]))
+    assert results == ["profile", "profile", "profile"]
+
+
+def test_single_flight_shares_error_with_waiting_callers():
+    results = _call_concurrently("parcel:1", _counting_compute([], error=RuntimeError("upstream down")))
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_single_flight_runs_again_after_previous_call_finished():
+    calls = []
+    for _ in range(2):
+        async_to_sync(single_flight)("parcel:1", _counting_compute(calls))
+    assert len(calls) == 2
+
+
+def test_single_flight_keeps_different_keys_apart():
+    calls = []
+
+    async def both():
+        await asyncio.gather(
+            single_flight("parcel:1", _counting_compute(calls)),
+            single_flight("parcel:2", _counting_compute(calls)),
+        )
+
+    async_to_sync(both)()
+    assert len(calls) == 2
+
+
+@pytest.mark.django_db
+def test_advisory_lock_does_not_wait_without_postgres():
+    async def hold():
+        async with advisory_lock("parcel:1") as waited:
+            return waited
+
+    assert async_to_sync(hold)() is False
+
+
+def test_advisory_lock_unlocks_on_the_thread_that_locked():
+    threads = []
+
+    def record(result=None):
+        def call(lock_id):
+            threads.append(threading.get_ident())
+            return result
+        return call
+
+    async def hold():
+        async with advisory_lock("parcel:1"):
+            await asyncio.to_thread(time.sleep, 0.01)
+
+    with patch.object(single_flight_module, "connection", MagicMock(vendor="postgresql")), \
+         patch.object(single_flight_module, "_try_advisory_lock", side_effect=record(True)), \
+         patch.object(single_flight_module, "_advisory_unlock", side_effect=record()):
+        async_to_sync(hold)()
+    assert len(set(threads)) == 1
@@ -0,0 +1,86 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+import apps.parcels.services.suggestions as suggestions_module
+from apps.parcels.models import GeocodedAddress
+from apps.parcels.services.suggestions import PrefixTrie, Suggestion, suggest_addresses
+
+RIVOLI = Suggestion("12 Rue de Rivoli, Paris, France", 48.8556, 2.3601)
+
+
+@pytest.fixture(autouse=True)
+def reset_trie(settings, tmp_path):
+    settings.GAZETTEER_PATH = tmp_path / "missing.txt"
+    suggestions_module._tries.clear()
+    yield
+    suggestions_module._tries.clear()
+
+
+def test_trie_returns_suggestions_for_prefix():
+    trie = PrefixTrie()
+    trie.insert("12 rue de rivoli", RIVOLI)
+    assert trie.lookup("12 rue") == [RIVOLI]
+
+
+def test_trie_returns_nothing_for_unknown_prefix():
+    trie = PrefixTrie()
+    trie.insert("12 rue de rivoli", RIVOLI)
+    assert trie.lookup("13") == []
+
+
+def test_trie_keeps_top_k_per_node():
+    trie = PrefixTrie()
+    for number in range(20):
+        trie.insert(f"rue {number}", Suggestion(f"Rue {number}", 0.0, 0.0))
+    assert len(trie.lookup("rue")) == suggestions_module.TOP_K
+
+
+def _remember(user, query, display_name, lat=48.8556, lon=2.3601):
+    address = GeocodedAddress.objects.create(
+        normalized_address=query, display_name=display_name, latitude=lat, longitude=lon,
+    )
+    address.searched_by.add(user)
+
+
+@pytest.mark.django_db
+def test_suggest_addresses_uses_previous_geocodes(user):
+    _remember(user, "12 rue de rivoli paris", RIVOLI.display_name)
+    assert suggest_addresses("12 Rue de Ri", user.pk) == [RIVOLI]
+
+
+@pytest.mark.django_db
+def test_suggest_addresses_matches_display_name(user):
+    _remember(user, "rivoli 12", RIVOLI.display_name)
+    assert suggest_addresses("12 rue de", user.pk) == [RIVOLI]
+
+
+@pytest.mark.django_db
+def test_suggest_addresses_never_offers_other_users_geocodes(user):
+    other_user = get_user_model().objects.create_user(username="otheruser", password="SecurePass123!")
+    _remember(other_user, "12 rue de rivoli paris", RIVOLI.display_name)
+    assert suggest_addresses("12 rue de ri", user.pk) == []
+
+
+@pytest.mark.django_db
+def test_suggest_addresses_skips_not_found_geocodes(user):
+    address = GeocodedAddress.objects.create(normalized_address="nowhere street", latitude=None, longitude=None)
+    address.searched_by.add(user)
+    assert suggest_addresses("nowhere", user.pk) == []
+
+
+@pytest.mark.django_db
+def test_suggest_addresses_includes_gazetteer_places(user, gazetteer_file):
+    assert [suggestion.display_name for suggestion in suggest_addresses("Tou", user.pk)] == ["Toulouse, FR"]
+
+
+@pytest.mark.django_db
+def test_suggest_addresses_falls_back_to_fuzzy_gazetteer_match(user, gazetteer_file):
+    assert [suggestion.display_name for suggestion in suggest_addresses("Tolouse", user.pk)] == ["Toulouse, FR"]
+
+
+@pytest.mark.django_db
+def test_suggest_addresses_lists_previous_geocodes_first(user, gazetteer_file):
+    _remember(user, "lyon part dieu", "Lyon Part-Dieu, Lyon, France", 45.76, 4.86)
+    assert [suggestion.display_name for suggestion in suggest_addresses("lyon", user.pk)] == [
+        "Lyon Part-Dieu, Lyon, France", "Lyon, FR",
+    ]
@@ -1,14 +1,24 @@
+import asyncio
 import json
+import threading
+import time
+from contextlib import asynccontextmanager
 
 import pytest
 from unittest.mock import MagicMock, patch
-from django.test import Client
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
 
-from apps.parcels.models import Parcel
+import apps.parcels.views as parcel_views
+from apps.parcels.models import AnalysisJob, Parcel
+from apps.parcels.services.admission import reset_admission
+from apps.parcels.services.analysis import is_analysis_current, record_fingerprint
 from apps.parcels.services.geocoding import GeocodingError
-from apps.parcels.services.koppen import KoppenError
+from apps.parcels.services.jobs import SOIL_UNAVAILABLE
+from apps.parcels.services.koppen import KoppenError, KoppenZone
 from apps.parcels.services.macrostrat import MacrostratError
 from apps.parcels.services.soilgrids import SoilGridsError
+from apps.parcels.services.suggestions import Suggestion
 
 SAMPLE_POLYGON = {
     "type": "Polygon",
@@ -66,6 +76,78 @@ def test_geocode_view_empty_address_returns_error_partial(user):
     assert b"Address not found" in response.content
 
 
+@pytest.mark.django_db
+def test_geocode_suggest_view_returns_suggestions(user):
+    client = Client()
+    client.force_login(user)
+    suggestions = [Suggestion("Lyon, FR", 45.75, 4.85)]
+    with patch("apps.parcels.views.suggest_addresses", return_value=suggestions):
+        response = client.get("/parcels/geocode/suggest/", {"address": "Lyo"})
+    assert b"Lyon, FR" in response.content
+
+
+@pytest.mark.django_db
+def test_geocode_suggest_view_hides_addresses_other_users_searched(user):
+    from django.contrib.auth import get_user_model
+    other_user = get_user_model().objects.create_user(username="otheruser", password="SecurePass123!")
+    nominatim = MagicMock()
+    nominatim.json.return_value = [{"lat": "48.8556", "lon": "2.3601", "display_name": "12 Rue de Rivoli, Paris"}]
+    client = Client()
+    client.force_login(other_user)
+    with patch("apps.parcels.services.geocoding.httpx.Client.get", return_value=nominatim):
+        client.post("/parcels/geocode/", {"address": "12 Rue de Rivoli, Paris"})
+    client.force_login(user)
+    response = client.get("/parcels/geocode/suggest/", {"address": "12 rue de ri"})
+    assert b"Rivoli" not in response.content
+
+
+@pytest.mark.django_db
+def test_geocode_suggest_view_skips_short_queries(user):
+    client = Client()
+    client.force_login(user)
+    with patch("apps.parcels.views.suggest_addresses") as mock_suggest:
+        client.get("/parcels/geocode/suggest/", {"address": "Ly"})
+    assert mock_suggest.call_count == 0
+
+
+@pytest.mark.django_db
+def test_geocode_suggest_view_answers_repeated_query(user):
+    client = Client()
+    client.force_login(user)
+    suggestions = [Suggestion("Lyon, FR", 45.75, 4.85)]
+    with patch("apps.parcels.views.suggest_addresses", return_value=suggestions):
+        client.get("/parcels/geocode/suggest/", {"address": "Lyon"})
+        response = client.get("/parcels/geocode/suggest/", {"address": "lyon "})
+    assert b"Lyon, FR" in response.content
+
+
+@pytest.mark.django_db
+def test_geocode_suggest_view_never_calls_nominatim(user):
+    client = Client()
+    client.force_login(user)
+    with patch("apps.parcels.views.geocode_address") as mock_geocode:
+        client.get("/parcels/geocode/suggest/", {"address": "Lyon"})
+    assert mock_geocode.call_count == 0
+
+
+@pytest.mark.django_db
+def test_reverse_geocode_view_returns_nearby_place(user):
+    client = Client()
+    client.force_login(user)
+    result = {"lat": 48.85, "lon": 2.35, "display_name": "Paris, FR", "distance_km": 1.2}
+    with patch("apps.parcels.views.reverse_geocode", return_value=result):
+        response = client.get("/parcels/geocode/reverse/", {"lat": "48.86", "lon": "2.35"})
+    assert b"Near Paris, FR" in response.content
+
+
+@pytest.mark.django_db
+def test_reverse_geocode_view_ignores_invalid_coordinates(user):
+    client = Client()
+    client.force_login(user)
+    response = client.get("/parcels/geocode/reverse/", {"lat": "north"})
+    assert response.content == b""
+
+
 @pytest.mark.django_db
 def test_geocode_view_service_error_returns_error_partial(user):
     client = Client()
@@ -337,12 +419,56 @@ def test_parcel_analyze_stores_climate_zone(user):
     )
     client = Client()
     client.force_login(user)
-    with patch("apps.parcels.views.get_koppen_zone", return_value="Cfb - Oceanic"):
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")):
         client.post(f"/parcels/{parcel.pk}/analyze/")
     parcel.refresh_from_db()
     assert parcel.climate_zone == "Cfb - Oceanic"
 
 
+@pytest.mark.django_db
+def test_parcel_analyze_stores_climate_zone_shares(user):
+    parcel = Parcel.objects.create(
+        user=user, name="Test", polygon=SAMPLE_POLYGON, area_m2=100.0, latitude=48.85, longitude=2.35,
+    )
+    client = Client()
+    client.force_login(user)
+    shares = {"Cfb - Oceanic": 0.75, "Dfb - Warm-summer humid continental": 0.25}
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_koppen_zone_shares", return_value=shares):
+        client.post(f"/parcels/{parcel.pk}/analyze/")
+    parcel.refresh_from_db()
+    assert parcel.climate_zone_shares == shares
+
+
+@pytest.mark.django_db
+def test_parcel_analyze_stores_approximate_climate_flag(user):
+    parcel = Parcel.objects.create(
+        user=user, name="Shore", polygon=SAMPLE_POLYGON, area_m2=100.0, latitude=48.85, longitude=2.35,
+    )
+    client = Client()
+    client.force_login(user)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic", approximate=True)):
+        client.post(f"/parcels/{parcel.pk}/analyze/")
+    parcel.refresh_from_db()
+    assert parcel.climate_approximate is True
+
+
+@pytest.mark.django_db
+def test_full_analyze_stores_climate_trajectory(user):
+    parcel = Parcel.objects.create(
+        user=user, name="Test", polygon=SAMPLE_POLYGON, area_m2=100.0, latitude=48.85, longitude=2.35,
+    )
+    client = Client()
+    client.force_login(user)
+    trajectory = {"1991-2020": "Cfb - Oceanic", "2071-2099 (SSP2-4.5)": "Cfa - Humid subtropical"}
+    mock_soil = MagicMock(ph=6.5, drainage="Well-drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic", trajectory=trajectory)), \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        client.post(f"/parcels/{parcel.pk}/full-analyze/")
+    parcel.refresh_from_db()
+    assert parcel.climate_trajectory == trajectory
+
+
 @pytest.mark.django_db
 def test_parcel_analyze_returns_result_partial(user):
     parcel = Parcel.objects.create(
@@ -351,7 +477,7 @@ def test_parcel_analyze_returns_result_partial(user):
     )
     client = Client()
     client.force_login(user)
-    with patch("apps.parcels.views.get_koppen_zone", return_value="Cfb - Oceanic"):
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")):
         response = client.post(f"/parcels/{parcel.pk}/analyze/")
     assert b"Cfb - Oceanic" in response.content
 
@@ -375,7 +501,7 @@ def test_parcel_analyze_returns_error_partial_on_koppen_error(user):
     )
     client = Client()
     client.force_login(user)
-    with patch("apps.parcels.views.get_koppen_zone", side_effect=KoppenError("GeoTIFF missing")):
+    with patch("apps.parcels.services.analysis.get_koppen_zone", side_effect=KoppenError("GeoTIFF missing")):
         response = client.post(f"/parcels/{parcel.pk}/analyze/")
     assert b"GeoTIFF missing" in response.content
 
@@ -427,7 +553,7 @@ def test_soil_analyze_stores_soil_ph_on_parcel(user):
     client = Client()
     client.force_login(user)
     mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
-    with patch("apps.parcels.views.get_soil_data", return_value=mock_soil):
+    with patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
         client.post(f"/parcels/{parcel.pk}/soil-analyze/")
     parcel.refresh_from_db()
     assert parcel.soil_ph == 6.5
@@ -442,7 +568,7 @@ def test_soil_analyze_stores_soil_drainage_on_parcel(user):
     client = Client()
     client.force_login(user)
     mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
-    with patch("apps.parcels.views.get_soil_data", return_value=mock_soil):
+    with patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
         client.post(f"/parcels/{parcel.pk}/soil-analyze/")
     parcel.refresh_from_db()
     assert parcel.soil_drainage == "Moderately drained"
@@ -457,7 +583,7 @@ def test_soil_analyze_returns_result_partial(user):
     client = Client()
     client.force_login(user)
     mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
-    with patch("apps.parcels.views.get_soil_data", return_value=mock_soil):
+    with patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
         response = client.post(f"/parcels/{parcel.pk}/soil-analyze/")
     assert b"Moderately drained" in response.content
 
@@ -535,12 +661,27 @@ def test_soil_analyze_sets_source_measured_when_soilgrids_succeeds(user):
     client = Client()
     client.force_login(user)
     mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
-    with patch("apps.parcels.views.get_soil_data", return_value=mock_soil):
+    with patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
         client.post(f"/parcels/{parcel.pk}/soil-analyze/")
     parcel.refresh_from_db()
     assert parcel.soil_source == "measured"
 
 
+@pytest.mark.django_db
+def test_soil_analyze_stores_approximate_flag(user):
+    parcel = Parcel.objects.create(
+        user=user, name="Garden", polygon=SAMPLE_POLYGON, area_m2=100.0,
+        latitude=48.85, longitude=2.35,
+    )
+    client = Client()
+    client.force_login(user)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=True)
+    with patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        client.post(f"/parcels/{parcel.pk}/soil-analyze/")
+    parcel.refresh_from_db()
+    assert parcel.soil_approximate is True
+
+
 @pytest.mark.django_db
 def test_soil_analyze_falls_back_to_macrostrat_when_soilgrids_fails(user):
     parcel = Parcel.objects.create(
@@ -550,8 +691,8 @@ def test_soil_analyze_falls_back_to_macrostrat_when_soilgrids_fails(user):
     client = Client()
     client.force_login(user)
     mock_soil = MagicMock(ph=7.5, drainage="Well-drained", approximate=True)
-    with patch("apps.parcels.views.get_soil_data", side_effect=SoilGridsError("no data")), \
-         patch("apps.parcels.views.get_geology_soil_data", return_value=mock_soil):
+    with patch("apps.parcels.services.analysis.get_soil_data", side_effect=SoilGridsError("no data")), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", return_value=mock_soil):
         client.post(f"/parcels/{parcel.pk}/soil-analyze/")
     parcel.refresh_from_db()
     assert parcel.soil_ph == 7.5
@@ -566,8 +707,8 @@ def test_soil_analyze_sets_source_inferred_on_macrostrat_success(user):
     client = Client()
     client.force_login(user)
     mock_soil = MagicMock(ph=7.5, drainage="Well-drained", approximate=True)
-    with patch("apps.parcels.views.get_soil_data", side_effect=SoilGridsError("no data")), \
-         patch("apps.parcels.views.get_geology_soil_data", return_value=mock_soil):
+    with patch("apps.parcels.services.analysis.get_soil_data", side_effect=SoilGridsError("no data")), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", return_value=mock_soil):
         client.post(f"/parcels/{parcel.pk}/soil-analyze/")
     parcel.refresh_from_db()
     assert parcel.soil_source == "inferred"
@@ -581,12 +722,109 @@ def test_soil_analyze_returns_error_partial_when_both_sources_fail(user):
     )
     client = Client()
     client.force_login(user)
-    with patch("apps.parcels.views.get_soil_data", side_effect=SoilGridsError("no data")), \
-         patch("apps.parcels.views.get_geology_soil_data", side_effect=MacrostratError("API down")):
+    with patch("apps.parcels.services.analysis.get_soil_data", side_effect=SoilGridsError("no data")), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", side_effect=MacrostratError("API down")):
         response = client.post(f"/parcels/{parcel.pk}/soil-analyze/")
     assert b"We couldn&#x27;t reach our soil data source" in response.content
 
 
+@pytest.mark.django_db
+def test_soil_analyze_passes_one_deadline_to_both_sources(user):
+    parcel = Parcel.objects.create(
+        user=user, name="Garden", polygon=SAMPLE_POLYGON, area_m2=100.0,
+        latitude=48.85, longitude=2.35,
+    )
+    client = Client()
+    client.force_login(user)
+    mock_soil = MagicMock(ph=7.5, drainage="Well-drained", approximate=True)
+    with patch("apps.parcels.services.analysis.get_soil_data", side_effect=SoilGridsError("no data")) as mock_soilgrids, \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", return_value=mock_soil) as mock_macrostrat:
+        client.post(f"/parcels/{parcel.pk}/soil-analyze/")
+    assert mock_soilgrids.call_args.kwargs["deadline"] == mock_macrostrat.call_args.kwargs["deadline"]
+
+
+def _slow(result, seconds):
+    def respond(*args, **kwargs):
+        time.sleep(seconds)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return respond
+
+
+@pytest.fixture
+def hedged(settings):
+    settings.SOIL_HEDGE_AFTER_SECONDS = 0.01
+    settings.SOIL_LOOKUP_DEADLINE_SECONDS = 1.0
+
+
+@pytest.mark.django_db
+def test_hedged_soil_analyze_skips_macrostrat_when_soilgrids_is_fast(user, hedged):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data") as mock_macrostrat:
+        client.post(f"/parcels/{parcel.pk}/soil-analyze/")
+    assert mock_macrostrat.call_count == 0
+
+
+@pytest.mark.django_db
+def test_hedged_soil_analyze_prefers_slow_measured_result(user, hedged):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    measured = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    inferred = MagicMock(ph=7.5, drainage="Well-drained", approximate=True)
+    with patch("apps.parcels.services.analysis.get_soil_data", side_effect=_slow(measured, 0.1)), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", return_value=inferred):
+        client.post(f"/parcels/{parcel.pk}/soil-analyze/")
+    parcel.refresh_from_db()
+    assert parcel.soil_source == "measured"
+
+
+@pytest.mark.django_db
+def test_hedged_soil_analyze_starts_macrostrat_while_soilgrids_is_pending(user, hedged):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    measured = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    inferred = MagicMock(ph=7.5, drainage="Well-drained", approximate=True)
+    with patch("apps.parcels.services.analysis.get_soil_data", side_effect=_slow(measured, 0.1)), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", return_value=inferred) as mock_macrostrat:
+        client.post(f"/parcels/{parcel.pk}/soil-analyze/")
+    assert mock_macrostrat.call_count == 1
+
+
+@pytest.mark.django_db
+def test_hedged_soil_analyze_returns_inferred_when_soilgrids_misses_deadline(user, hedged, settings):
+    settings.SOIL_LOOKUP_DEADLINE_SECONDS = 0.1
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    measured = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    inferred = MagicMock(ph=7.5, drainage="Well-drained", approximate=True)
+    with patch("apps.parcels.services.analysis.get_soil_data", side_effect=_slow(measured, 0.5)), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", return_value=inferred):
+        client.post(f"/parcels/{parcel.pk}/soil-analyze/")
+    parcel.refresh_from_db()
+    assert parcel.soil_source == "inferred"
+
+
+@pytest.mark.django_db
+def test_hedged_soil_analyze_returns_inferred_when_slow_soilgrids_fails(user, hedged):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    inferred = MagicMock(ph=7.5, drainage="Well-drained", approximate=True)
+    with patch("apps.parcels.services.analysis.get_soil_data", side_effect=_slow(SoilGridsError("down"), 0.1)), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", return_value=inferred):
+        client.post(f"/parcels/{parcel.pk}/soil-analyze/")
+    parcel.refresh_from_db()
+    assert parcel.soil_ph == 7.5
+
+
 # --- Story 2.6: Full analyze view tests ---
 
 
@@ -645,8 +883,8 @@ def test_full_analyze_returns_profile_partial_on_success(user):
     client = Client()
     client.force_login(user)
     mock_soil = MagicMock(ph=6.5, drainage="Well-drained", approximate=False)
-    with patch("apps.parcels.views.get_koppen_zone", return_value="Cfb - Oceanic"), \
-         patch("apps.parcels.views.get_soil_data", return_value=mock_soil):
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
         response = client.post(f"/parcels/{parcel.pk}/full-analyze/")
     assert b"Your Garden Profile" in response.content
 
@@ -659,9 +897,9 @@ def test_full_analyze_returns_profile_with_soil_caveat_when_both_soil_sources_fa
     )
     client = Client()
     client.force_login(user)
-    with patch("apps.parcels.views.get_koppen_zone", return_value="Cfb - Oceanic"), \
-         patch("apps.parcels.views.get_soil_data", side_effect=SoilGridsError("no data")), \
-         patch("apps.parcels.views.get_geology_soil_data", side_effect=MacrostratError("API down")):
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_soil_data", side_effect=SoilGridsError("no data")), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", side_effect=MacrostratError("API down")):
         response = client.post(f"/parcels/{parcel.pk}/full-analyze/")
     assert b"Soil data unavailable" in response.content
 
@@ -674,7 +912,7 @@ def test_full_analyze_returns_error_partial_when_koppen_fails(user):
     )
     client = Client()
     client.force_login(user)
-    with patch("apps.parcels.views.get_koppen_zone", side_effect=KoppenError("GeoTIFF missing")):
+    with patch("apps.parcels.services.analysis.get_koppen_zone", side_effect=KoppenError("GeoTIFF missing")):
         response = client.post(f"/parcels/{parcel.pk}/full-analyze/")
     assert b"Could not determine climate zone" in response.content
 
@@ -688,8 +926,8 @@ def test_full_analyze_sets_soil_source_measured_on_soilgrids_success(user):
     client = Client()
     client.force_login(user)
     mock_soil = MagicMock(ph=6.5, drainage="Well-drained", approximate=False)
-    with patch("apps.parcels.views.get_koppen_zone", return_value="Cfb - Oceanic"), \
-         patch("apps.parcels.views.get_soil_data", return_value=mock_soil):
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
         client.post(f"/parcels/{parcel.pk}/full-analyze/")
     parcel.refresh_from_db()
     assert parcel.soil_source == "measured"
@@ -704,9 +942,660 @@ def test_full_analyze_sets_soil_source_inferred_on_macrostrat_fallback(user):
     client = Client()
     client.force_login(user)
     mock_soil = MagicMock(ph=7.5, drainage="Well-drained", approximate=True)
-    with patch("apps.parcels.views.get_koppen_zone", return_value="Cfb - Oceanic"), \
-         patch("apps.parcels.views.get_soil_data", side_effect=SoilGridsError("no data")), \
-         patch("apps.parcels.views.get_geology_soil_data", return_value=mock_soil):
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_soil_data", side_effect=SoilGridsError("no data")), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", return_value=mock_soil):
         client.post(f"/parcels/{parcel.pk}/full-analyze/")
     parcel.refresh_from_db()
     assert parcel.soil_source == "inferred"
+
+
+def _after(barrier, result):
+    def respond(*args, **kwargs):
+        barrier.wait()
+        return result
+    return respond
+
+
+@pytest.mark.django_db
+def test_full_analyze_runs_climate_and_soil_lookups_concurrently(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    both_started = threading.Barrier(2, timeout=2)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", side_effect=_after(both_started, KoppenZone("Cfb - Oceanic"))), \
+         patch("apps.parcels.services.analysis.get_soil_data", side_effect=_after(both_started, mock_soil)):
+        client.post(f"/parcels/{parcel.pk}/full-analyze/")
+    parcel.refresh_from_db()
+    assert (parcel.climate_zone, parcel.soil_ph) == ("Cfb - Oceanic", 6.5)
+
+
+# --- Background analysis jobs ---
+
+
+@pytest.mark.django_db
+def test_full_analyze_enqueues_job_in_background_mode(user, settings):
+    settings.ANALYSIS_BACKGROUND = True
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    client.post(f"/parcels/{parcel.pk}/full-analyze/")
+    assert AnalysisJob.objects.filter(parcel=parcel).count() == 1
+
+
+@pytest.mark.django_db
+def test_full_analyze_returns_polling_partial_in_background_mode(user, settings):
+    settings.ANALYSIS_BACKGROUND = True
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    response = client.post(f"/parcels/{parcel.pk}/full-analyze/")
+    assert f"/parcels/{parcel.pk}/analysis-status/".encode() in response.content
+
+
+@pytest.mark.django_db
+def test_parcel_save_enqueues_job_in_background_mode(user, settings):
+    settings.ANALYSIS_BACKGROUND = True
+    client = Client()
+    client.force_login(user)
+    client.post("/parcels/save/", {
+        "polygon": json.dumps(SAMPLE_POLYGON),
+        "area_m2": "450.50",
+        "latitude": "48.85",
+        "longitude": "2.35",
+    })
+    assert AnalysisJob.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_parcel_detail_polls_while_analysis_is_queued(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    AnalysisJob.objects.create(parcel=parcel, latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    response = client.get(f"/parcels/{parcel.pk}/")
+    assert f"/parcels/{parcel.pk}/analysis-status/".encode() in response.content
+
+
+@pytest.mark.django_db
+def test_analysis_status_keeps_polling_while_job_is_running(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    AnalysisJob.objects.create(parcel=parcel, latitude=48.85, longitude=2.35, status=AnalysisJob.Status.RUNNING)
+    client = Client()
+    client.force_login(user)
+    response = client.get(f"/parcels/{parcel.pk}/analysis-status/")
+    assert b'hx-trigger="every 2s"' in response.content
+
+
+def _soil_retry(user):
+    parcel = Parcel.objects.create(
+        user=user, name="Garden", latitude=48.85, longitude=2.35, climate_zone="Cfb - Oceanic",
+    )
+    AnalysisJob.objects.create(
+        parcel=parcel, latitude=48.85, longitude=2.35, attempts=1, error=SOIL_UNAVAILABLE,
+    )
+    return parcel
+
+
+@pytest.mark.django_db
+def test_parcel_detail_shows_saved_profile_while_soil_is_retried(user):
+    parcel = _soil_retry(user)
+    client = Client()
+    client.force_login(user)
+    response = client.get(f"/parcels/{parcel.pk}/")
+    assert b"Cfb - Oceanic" in response.content
+
+
+@pytest.mark.django_db
+def test_analysis_status_shows_saved_profile_while_soil_is_retried(user):
+    parcel = _soil_retry(user)
+    client = Client()
+    client.force_login(user)
+    response = client.get(f"/parcels/{parcel.pk}/analysis-status/")
+    assert b"Cfb - Oceanic" in response.content
+
+
+@pytest.mark.django_db
+def test_analysis_status_keeps_polling_while_soil_is_retried(user):
+    parcel = _soil_retry(user)
+    client = Client()
+    client.force_login(user)
+    response = client.get(f"/parcels/{parcel.pk}/analysis-status/")
+    assert b'hx-trigger="every 10s"' in response.content
+
+
+@pytest.mark.django_db
+def test_analysis_status_returns_profile_when_job_is_done(user):
+    parcel = Parcel.objects.create(
+        user=user, name="Garden", latitude=48.85, longitude=2.35, climate_zone="Cfb - Oceanic",
+    )
+    AnalysisJob.objects.create(parcel=parcel, latitude=48.85, longitude=2.35, status=AnalysisJob.Status.DONE)
+    client = Client()
+    client.force_login(user)
+    response = client.get(f"/parcels/{parcel.pk}/analysis-status/")
+    assert b"Cfb - Oceanic" in response.content
+
+
+@pytest.mark.django_db
+def test_analysis_status_returns_error_when_job_failed(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    AnalysisJob.objects.create(
+        parcel=parcel, latitude=48.85, longitude=2.35, status=AnalysisJob.Status.FAILED,
+        error="Climate zone unknown: GeoTIFF missing",
+    )
+    client = Client()
+    client.force_login(user)
+    response = client.get(f"/parcels/{parcel.pk}/analysis-status/")
+    assert b"Could not determine climate zone" in response.content
+
+
+@pytest.mark.django_db
+def test_analysis_status_returns_generic_error_when_job_failed_unexpectedly(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    AnalysisJob.objects.create(
+        parcel=parcel, latitude=48.85, longitude=2.35, status=AnalysisJob.Status.FAILED,
+        error="RuntimeError('boom')",
+    )
+    client = Client()
+    client.force_login(user)
+    response = client.get(f"/parcels/{parcel.pk}/analysis-status/")
+    assert b"The analysis could not be completed" in response.content
+
+
+@pytest.mark.django_db
+def test_analysis_status_returns_404_for_other_users_parcel(user):
+    from django.contrib.auth import get_user_model
+    other_user = get_user_model().objects.create_user(
+        username="otheruser", email="other@example.com", password="SecurePass123!",
+    )
+    parcel = Parcel.objects.create(user=other_user, name="Secret", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    response = client.get(f"/parcels/{parcel.pk}/analysis-status/")
+    assert response.status_code == 404
+
+
+# --- Streamed analysis ---
+
+
+@pytest.fixture(autouse=True)
+def forget_streamed_runs():
+    yield
+    parcel_views._streamed_runs.clear()
+
+
+def _read_stream(response):
+    async def collect():
+        return b"".join([chunk async for chunk in response.streaming_content])
+    return async_to_sync(collect)().decode()
+
+
+async def _collect(response):
+    return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+
+def _analyze_streamed(user, parcel, posts=1, data=None):
+    """POST streamed analyses over ASGI, then read one SSE stream per POST; returns the bodies."""
+    client = AsyncClient()
+    client.force_login(user)
+
+    async def run():
+        for _ in range(posts):
+            await client.post(f"/parcels/{parcel.pk}/full-analyze/", {"stream": "1", **(data or {})})
+        streams = [await client.get(f"/parcels/{parcel.pk}/analysis-stream/") for _ in range(posts)]
+        return await asyncio.gather(*(_collect(stream) for stream in streams))
+    return async_to_sync(run)()
+
+
+def _event_names(body):
+    return [block.split("\n", 1)[0].removeprefix("event: ") for block in body.strip().split("\n\n")]
+
+
+@pytest.mark.django_db
+def test_full_analyze_returns_stream_partial_when_streaming_under_asgi(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = AsyncClient()
+    client.force_login(user)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+
+    async def post_and_finish():
+        response = await client.post(f"/parcels/{parcel.pk}/full-analyze/", {"stream": "1"})
+        await _collect(await client.get(f"/parcels/{parcel.pk}/analysis-stream/"))
+        return response
+
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        response = async_to_sync(post_and_finish)()
+    assert f"/parcels/{parcel.pk}/analysis-stream/".encode() in response.content
+
+
+@pytest.mark.django_db
+def test_full_analyze_returns_finished_profile_when_streaming_under_wsgi(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        response = client.post(f"/parcels/{parcel.pk}/full-analyze/", {"stream": "1"})
+    assert b"Cfb - Oceanic" in response.content
+
+
+@pytest.mark.django_db
+def test_analysis_stream_sends_climate_before_slow_soil(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_soil_data", side_effect=_slow(mock_soil, 0.2)):
+        [body] = _analyze_streamed(user, parcel)
+    assert _event_names(body) == ["climate", "soil", "done"]
+
+
+@pytest.mark.django_db
+def test_analysis_stream_sends_fallback_notice(user, settings):
+    settings.SOIL_HEDGE_AFTER_SECONDS = None
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    inferred = MagicMock(ph=6.5, drainage="Moderately drained", approximate=True)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", side_effect=_slow(KoppenZone("Cfb - Oceanic"), 0.2)), \
+         patch("apps.parcels.services.analysis.get_soil_data", side_effect=SoilGridsError("no data")), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", return_value=inferred):
+        [body] = _analyze_streamed(user, parcel)
+    assert _event_names(body) == ["notice", "soil", "climate", "done"]
+
+
+@pytest.mark.django_db
+def test_analysis_stream_saves_profile(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        _analyze_streamed(user, parcel)
+    parcel.refresh_from_db()
+    assert (parcel.climate_zone, parcel.soil_ph) == ("Cfb - Oceanic", 6.5)
+
+
+@pytest.mark.django_db
+def test_analysis_stream_reports_unavailable_soil(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_soil_data", side_effect=SoilGridsError("no data")), \
+         patch("apps.parcels.services.analysis.get_geology_soil_data", side_effect=MacrostratError("down")):
+        [body] = _analyze_streamed(user, parcel)
+    assert "Soil data unavailable" in body
+
+
+@pytest.mark.django_db
+def test_analysis_stream_ends_with_error_on_koppen_error(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", side_effect=KoppenError("GeoTIFF missing")), \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        [body] = _analyze_streamed(user, parcel)
+    assert "Could not determine climate zone" in body.rsplit("event: done", 1)[1]
+
+
+@pytest.mark.django_db
+def test_analysis_stream_returns_404_for_other_users_parcel(user):
+    from django.contrib.auth import get_user_model
+    other_user = get_user_model().objects.create_user(
+        username="otheruser", email="other@example.com", password="SecurePass123!",
+    )
+    parcel = Parcel.objects.create(user=other_user, name="Secret", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    response = client.get(f"/parcels/{parcel.pk}/analysis-stream/")
+    assert response.status_code == 404
+
+
+# --- Analysis fingerprint ---
+
+
+def _analyzed_parcel(user):
+    parcel = Parcel(
+        user=user, name="Garden", polygon=SAMPLE_POLYGON, area_m2=100.0, latitude=48.85, longitude=2.35,
+        climate_zone="Cfb - Oceanic", soil_ph=6.5, soil_drainage="Well-drained", soil_source="measured",
+    )
+    record_fingerprint(parcel)
+    parcel.save()
+    return parcel
+
+
+@pytest.mark.django_db
+def test_full_analyze_records_fingerprint_for_complete_profile(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")), \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        client.post(f"/parcels/{parcel.pk}/full-analyze/")
+    parcel.refresh_from_db()
+    assert parcel.analysis_fingerprint
+
+
+@pytest.mark.django_db
+def test_full_analyze_skips_lookups_when_fingerprint_matches(user):
+    parcel = _analyzed_parcel(user)
+    client = Client()
+    client.force_login(user)
+    with patch("apps.parcels.services.analysis.get_koppen_zone") as mock_koppen:
+        client.post(f"/parcels/{parcel.pk}/full-analyze/")
+    assert mock_koppen.call_count == 0
+
+
+@pytest.mark.django_db
+def test_full_analyze_returns_stored_profile_when_fingerprint_matches(user):
+    parcel = _analyzed_parcel(user)
+    client = Client()
+    client.force_login(user)
+    response = client.post(f"/parcels/{parcel.pk}/full-analyze/")
+    assert b"Profile complete" in response.content
+
+
+@pytest.mark.django_db
+def test_full_analyze_reruns_lookups_when_forced(user):
+    parcel = _analyzed_parcel(user)
+    client = Client()
+    client.force_login(user)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")) as mock_koppen, \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        client.post(f"/parcels/{parcel.pk}/full-analyze/", {"force": "1"})
+    assert mock_koppen.call_count == 1
+
+
+@pytest.mark.django_db
+def test_parcel_analyze_skips_lookup_when_fingerprint_matches(user):
+    parcel = _analyzed_parcel(user)
+    client = Client()
+    client.force_login(user)
+    with patch("apps.parcels.services.analysis.get_koppen_zone") as mock_koppen:
+        client.post(f"/parcels/{parcel.pk}/analyze/")
+    assert mock_koppen.call_count == 0
+
+
+@pytest.mark.django_db
+def test_soil_analyze_skips_lookup_when_fingerprint_matches(user):
+    parcel = _analyzed_parcel(user)
+    client = Client()
+    client.force_login(user)
+    with patch("apps.parcels.services.analysis.get_soil_data") as mock_soilgrids:
+        client.post(f"/parcels/{parcel.pk}/soil-analyze/")
+    assert mock_soilgrids.call_count == 0
+
+
+@pytest.mark.django_db
+def test_soil_analyze_keeps_approximate_flag_when_fingerprint_matches(user):
+    parcel = _analyzed_parcel(user)
+    Parcel.objects.filter(pk=parcel.pk).update(soil_approximate=True)
+    client = Client()
+    client.force_login(user)
+    response = client.post(f"/parcels/{parcel.pk}/soil-analyze/")
+    assert b"soil analysis accuracy may be reduced" in response.content
+
+
+@pytest.mark.django_db
+def test_parcel_update_clears_fingerprint_when_polygon_changes(user):
+    parcel = _analyzed_parcel(user)
+    client = Client()
+    client.force_login(user)
+    moved = {"type": "Polygon", "coordinates": [[[2.35, 48.85], [2.37, 48.85], [2.37, 48.86], [2.35, 48.85]]]}
+    client.post(f"/parcels/{parcel.pk}/update/", {"polygon": json.dumps(moved), "area_m2": "200"})
+    parcel.refresh_from_db()
+    assert parcel.analysis_fingerprint == ""
+
+
+@pytest.mark.django_db
+def test_parcel_update_keeps_fingerprint_when_only_name_changes(user):
+    parcel = _analyzed_parcel(user)
+    client = Client()
+    client.force_login(user)
+    client.post(f"/parcels/{parcel.pk}/update/", {
+        "name": "Renamed", "polygon": json.dumps(SAMPLE_POLYGON), "area_m2": "100",
+        "latitude": "48.85", "longitude": "2.35",
+    })
+    parcel.refresh_from_db()
+    assert is_analysis_current(parcel)
+
+
+@asynccontextmanager
+async def _lock_held_by_other_process(key):
+    yield True
+
+
+@pytest.mark.django_db
+def test_full_analyze_reuses_result_stored_by_other_process(user):
+    parcel = Parcel.objects.create(
+        user=user, name="Garden", latitude=48.85, longitude=2.35, climate_zone="Cfb - Oceanic",
+    )
+    client = Client()
+    client.force_login(user)
+    with patch("apps.parcels.services.single_flight.advisory_lock", _lock_held_by_other_process), \
+         patch("apps.parcels.services.analysis.get_koppen_zone") as mock_koppen:
+        client.post(f"/parcels/{parcel.pk}/full-analyze/")
+    assert mock_koppen.call_count == 0
+
+
+@pytest.mark.django_db
+def test_streamed_analysis_reuses_result_stored_by_other_process(user):
+    parcel = Parcel.objects.create(
+        user=user, name="Garden", latitude=48.85, longitude=2.35, climate_zone="Cfb - Oceanic",
+    )
+    with patch("apps.parcels.services.single_flight.advisory_lock", _lock_held_by_other_process), \
+         patch("apps.parcels.services.analysis.get_koppen_zone") as mock_koppen:
+        _analyze_streamed(user, parcel)
+    assert mock_koppen.call_count == 0
+
+
+@pytest.mark.django_db
+def test_concurrent_streamed_analyses_share_one_run(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", side_effect=_slow(KoppenZone("Cfb - Oceanic"), 0.2)) as mock_koppen, \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        _analyze_streamed(user, parcel, posts=2)
+    assert mock_koppen.call_count == 1
+
+
+@pytest.mark.django_db
+def test_joined_analysis_stream_gets_final_profile(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", side_effect=_slow(KoppenZone("Cfb - Oceanic"), 0.2)), \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        _, joined = _analyze_streamed(user, parcel, posts=2)
+    assert "Cfb - Oceanic" in joined.rsplit("event: done", 1)[1]
+
+
+@pytest.mark.django_db
+def test_analysis_stream_never_starts_an_analysis(user):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    with patch("apps.parcels.services.analysis.get_koppen_zone") as mock_koppen:
+        _read_stream(client.get(f"/parcels/{parcel.pk}/analysis-stream/?force=1"))
+    assert mock_koppen.call_count == 0
+
+
+@pytest.mark.django_db
+def test_analysis_stream_without_run_sends_stored_profile(user):
+    parcel = _analyzed_parcel(user)
+    client = Client()
+    client.force_login(user)
+    body = _read_stream(client.get(f"/parcels/{parcel.pk}/analysis-stream/"))
+    assert "Cfb - Oceanic" in body.rsplit("event: done", 1)[1]
+
+
+@pytest.mark.django_db
+def test_forced_streamed_analysis_reruns_lookups(user):
+    parcel = _analyzed_parcel(user)
+    mock_soil = MagicMock(ph=6.5, drainage="Moderately drained", approximate=False)
+    with patch("apps.parcels.services.analysis.get_koppen_zone", return_value=KoppenZone("Cfb - Oceanic")) as mock_koppen, \
+         patch("apps.parcels.services.analysis.get_soil_data", return_value=mock_soil):
+        _analyze_streamed(user, parcel, data={"force": "1"})
+    assert mock_koppen.call_count == 1
+
+
+
+# --- Admission control ---
+
+
+@pytest.fixture
+def no_capacity(settings):
+    settings.ANALYSIS_MAX_CONCURRENT = 0
+    settings.ANALYSIS_MAX_QUEUED = 0
+    reset_admission()
+    yield
+    reset_admission()
+
+
+@pytest.mark.django_db
+def test_full_analyze_sheds_load_with_service_unavailable(user, no_capacity):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    response = client.post(f"/parcels/{parcel.pk}/full-analyze/")
+    assert response.status_code == 503
+
+
+@pytest.mark.django_db
+def test_full_analyze_sets_retry_after_when_shedding(user, no_capacity, settings):
+    settings.ANALYSIS_RETRY_AFTER_SECONDS = 7
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    response = client.post(f"/parcels/{parcel.pk}/full-analyze/")
+    assert response["Retry-After"] == "7"
+
+
+@pytest.mark.django_db
+def test_parcel_analyze_returns_retry_partial_when_shedding(user, no_capacity):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    response = client.post(f"/parcels/{parcel.pk}/analyze/")
+    assert f'hx-post="/parcels/{parcel.pk}/analyze/"'.encode() in response.content
+
+
+@pytest.mark.django_db
+def test_soil_analyze_rejects_user_over_limit(user, settings):
+    settings.ANALYSIS_MAX_PER_USER = 0
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = Client()
+    client.force_login(user)
+    response = client.post(f"/parcels/{parcel.pk}/soil-analyze/")
+    assert response.status_code == 429
+
+
+@pytest.mark.django_db
+def test_streamed_full_analyze_sheds_load_with_service_unavailable(user, no_capacity):
+    parcel = Parcel.objects.create(user=user, name="Garden", latitude=48.85, longitude=2.35)
+    client = AsyncClient()
+    client.force_login(user)
+    response = async_to_sync(client.post)(f"/parcels/{parcel.pk}/full-analyze/", {"stream": "1"})
+    assert response.status_code == 503
+
+
+@pytest.mark.django_db
+def test_cheap_views_are_not_shed(user, no_capacity):
+    client = Client()
+    client.force_login(user)
+    response = client.get("/parcels/")
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_analysis_metrics_reports_queue_depth(user):
+    user.is_staff = True
+    user.save()
+    client = Client()
+    client.force_login(user)
+    response = client.get("/parcels/analysis-metrics/")
+    assert set(response.json()["admission"]) == {"running", "queued", "rejected"}
+
+
+@pytest.mark.django_db
+def test_analysis_metrics_requires_staff(user):
+    client = Client()
+    client.force_login(user)
+    response = client.get("/parcels/analysis-metrics/")
+    assert response.status_code == 302
+
+
+# --- Parcel list pagination ---
+
+
+@pytest.fixture
+def many_parcels(user, monkeypatch):
+    monkeypatch.setattr("apps.parcels.views.PARCEL_PAGE_SIZE", 2)
+    return [Parcel.objects.create(user=user, name=f"Parcel {index}", polygon=SAMPLE_POLYGON) for index in range(5)]
+
+
+@pytest.mark.django_db
+def test_parcel_list_shows_first_page_newest_first(user, many_parcels):
+    client = Client()
+    client.force_login(user)
+    response = client.get("/parcels/")
+    assert [parcel.name for parcel in response.context["parcels"]] == ["Parcel 4", "Parcel 3"]
+
+
+@pytest.mark.django_db
+def test_parcel_list_links_next_page_for_infinite_scroll(user, many_parcels):
+    client = Client()
+    client.force_login(user)
+    response = client.get("/parcels/")
+    assert b'hx-trigger="revealed"' in response.content
+
+
+@pytest.mark.django_db
+def test_parcel_list_next_page_continues_after_cursor(user, many_parcels):
+    client = Client()
+    client.force_login(user)
+    first = client.get("/parcels/")
+    response = client.get(first.context["next_url"], HTTP_HX_REQUEST="true")
+    assert [parcel.name for parcel in response.context["parcels"]] == ["Parcel 2", "Parcel 1"]
+
+
+@pytest.mark.django_db
+def test_parcel_list_breaks_created_at_ties_by_id(user, many_parcels):
+    Parcel.objects.filter(user=user).update(created_at=many_parcels[0].created_at)
+    client = Client()
+    client.force_login(user)
+    first = client.get("/parcels/")
+    response = client.get(first.context["next_url"], HTTP_HX_REQUEST="true")
+    assert [parcel.name for parcel in response.context["parcels"]] == ["Parcel 2", "Parcel 1"]
+
+
+@pytest.mark.django_db
+def test_parcel_list_htmx_request_returns_page_partial(user, many_parcels):
+    client = Client()
+    client.force_login(user)
+    response = client.get("/parcels/", HTTP_HX_REQUEST="true")
+    assert b"My Parcels" not in response.content
+
+
+@pytest.mark.django_db
+def test_parcel_list_last_page_has_no_next_link(user, many_parcels):
+    client = Client()
+    client.force_login(user)
+    response = client.get("/parcels/")
+    while response.context["next_url"]:
+        response = client.get(response.context["next_url"], HTTP_HX_REQUEST="true")
+    assert [parcel.name for parcel in response.context["parcels"]] == ["Parcel 0"]
+
+
+@pytest.mark.django_db
+def test_parcel_list_defers_polygon(user, many_parcels):
+    client = Client()
+    client.force_login(user)
+    response = client.get("/parcels/")
+    assert "polygon" in response.context["parcels"][0].get_deferred_fields()
+
+
+@pytest.mark.django_db
+def test_parcel_list_ignores_malformed_cursor(user, many_parcels):
+    client = Client()
+    client.force_login(user)
+    response = client.get("/parcels/?created_before=2024-13-45T99:00:00&id_before=1")
+    assert response.status_code == 200
@@ -1,36 +1,96 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import cast
+from collections.abc import AsyncIterator, Callable, Coroutine
+from functools import wraps
+from typing import Any, Concatenate, ParamSpec, cast
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse
-from django.views.decorators.http import require_POST
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+from django.views.decorators.http import require_GET, require_POST
+
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+
+from apps.parcels.models import AnalysisJob, Parcel
+from apps.parcels.services.admission import AdmissionRejected, admission_stats, admit
+from apps.parcels.services.analysis import (
+    apply_climate,
+    apply_soil,
+    fetch_soil,
+    is_analysis_current,
+    location_fingerprint,
+    record_fingerprint,
+)
+from apps.parcels.services.geocoding import GeocodingError, geocode_address, normalize_address, reverse_geocode
+from apps.parcels.services.jobs import ACTIVE_STATUSES, enqueue_analysis, failed_on_climate, is_retrying_soil
+from apps.parcels.services.koppen import KoppenError
+from apps.parcels.services.macrostrat import MacrostratError
+from apps.parcels.services.single_flight import single_flight, wait_for_flight
+from apps.parcels.services.suggestions import suggest_addresses
+from apps.parcels.services.threads import in_worker
+from apps.users.models import CustomUser
 
-from django.shortcuts import get_object_or_404, render
+_P = ParamSpec("_P")
 
-from apps.parcels.models import Parcel
-from apps.parcels.services.geocoding import GeocodingError, geocode_address
-from apps.parcels.services.koppen import KoppenError, get_koppen_zone
-from apps.parcels.services.macrostrat import MacrostratError, get_geology_soil_data
-from apps.parcels.services.soilgrids import SoilGridsError, get_soil_data
-from apps.users.models import CustomUser
+PARCEL_PAGE_SIZE = 24
+STREAM_POLL_SECONDS = 0.1
+STREAM_REPLAY_SECONDS = 30.0
+ANALYSIS_FAILED = "The analysis could not be completed. Please try again."
 
 
 @login_required
 def parcel_list(request: HttpRequest) -> HttpResponse:
     user = cast(CustomUser, request.user)
-    parcels = Parcel.objects.filter(user=user).order_by("-created_at")
-    return render(request, "parcels/list.html", {"parcels": parcels})
+    # The list never shows geometry or climate detail, so the JSON blobs stay in the DB.
+    parcels = (
+        Parcel.objects.filter(user=user)
+        .defer("polygon", "climate_zone_shares", "climate_trajectory")
+        .order_by("-created_at", "-id")
+    )
+    try:
+        created_before = parse_datetime(request.GET.get("created_before", ""))
+    except ValueError:
+        created_before = None
+    id_before = request.GET.get("id_before", "")
+    if created_before is not None and id_before.isdigit():
+        # Keyset page: rows strictly after the cursor in (-created_at, -id) order.
+        parcels = parcels.filter(
+            Q(created_at__lt=created_before) | Q(created_at=created_before, id__lt=int(id_before)),
+        )
+    page = list(parcels[:PARCEL_PAGE_SIZE + 1])
+    next_url = None
+    if len(page) > PARCEL_PAGE_SIZE:
+        page = page[:PARCEL_PAGE_SIZE]
+        cursor = {"created_before": page[-1].created_at.isoformat(), "id_before": str(page[-1].pk)}
+        next_url = f"{reverse('parcels:list')}?{urlencode(cursor)}"
+
+    context = {"parcels": page, "next_url": next_url}
+    if request.headers.get("HX-Request"):
+        return render(request, "parcels/partials/parcel_page.html", context)
+    return render(request, "parcels/list.html", context)
 
 
 @login_required
 def parcel_detail(request: HttpRequest, pk: int) -> HttpResponse:
     parcel = get_object_or_404(Parcel, pk=pk, user=request.user)
     polygon_json = json.dumps(parcel.polygon) if parcel.polygon else "null"
+    job = parcel.analysis_jobs.filter(status__in=ACTIVE_STATUSES).order_by("-created_at").first()
     return render(request, "parcels/detail.html", {
         "parcel": parcel,
         "polygon_json": polygon_json,
+        "analysis_pending": job is not None,
+        "soil_retrying": job is not None and is_retrying_soil(job),
     })
 
 
@@ -74,12 +134,15 @@ def parcel_update(request: HttpRequest, pk: int) -> HttpResponse:
     name = request.POST.get("name", "").strip()
     if name:
         parcel.name = name
+    geometry = (parcel.latitude, parcel.longitude, parcel.polygon)
     parcel.polygon = polygon
     parcel.area_m2 = area_m2
     if parsed_lat is not None:
         parcel.latitude = parsed_lat
     if parsed_lon is not None:
         parcel.longitude = parsed_lon
+    if (parcel.latitude, parcel.longitude, parcel.polygon) != geometry:
+        parcel.analysis_fingerprint = ""
     parcel.save()
     return render(request, "parcels/partials/update_success.html", {"parcel": parcel})
 
@@ -97,7 +160,7 @@ def geocode_address_view(request: HttpRequest) -> HttpResponse:
         return render(request, "parcels/partials/geocode_error.html")
 
     try:
-        result = geocode_address(address)
+        result = geocode_address(address, user_id=request.user.pk)
     except GeocodingError:
         return render(request, "parcels/partials/geocode_error.html")
 
@@ -107,6 +170,32 @@ def geocode_address_view(request: HttpRequest) -> HttpResponse:
     return render(request, "parcels/partials/geocode_result.html", {"result": result})
 
 
+@require_GET
+@login_required
+def geocode_suggest_view(request: HttpRequest) -> HttpResponse:
+    # Debounced in the browser: the input's "delay:" trigger waits for a typing
+    # pause and hx-sync="this:replace" aborts a superseded in-flight request.
+    query = normalize_address(request.GET.get("address", ""))
+    if len(query) < settings.SUGGESTIONS_MIN_CHARS:
+        suggestions = []
+    else:
+        # login_required guarantees an authenticated user.
+        suggestions = suggest_addresses(query, cast(int, request.user.pk))
+    return render(request, "parcels/partials/geocode_suggestions.html", {"suggestions": suggestions})
+
+
+@require_GET
+@login_required
+def reverse_geocode_view(request: HttpRequest) -> HttpResponse:
+    try:
+        lat = float(request.GET["lat"])
+        lon = float(request.GET["lon"])
+    except (KeyError, ValueError):
+        return HttpResponse("")
+    result = reverse_geocode(lat, lon)
+    return render(request, "parcels/partials/reverse_geocode_result.html", {"result": result})
+
+
 @require_POST
 @login_required
 def parcel_save(request: HttpRequest) -> HttpResponse:
@@ -145,13 +234,51 @@ def parcel_save(request: HttpRequest) -> HttpResponse:
         latitude=parsed_lat,
         longitude=parsed_lon,
     )
+    if settings.ANALYSIS_BACKGROUND and parcel.latitude is not None and parcel.longitude is not None:
+        enqueue_analysis(parcel)
     return render(request, "parcels/partials/save_success.html", {"parcel": parcel})
 
 
+def _busy_html(exc: AdmissionRejected, retry_url: str, retry_vals: dict[str, str]) -> str:
+    return render_to_string("parcels/partials/analysis_busy.html", {
+        "retry_after": exc.retry_after,
+        "retry_url": retry_url,
+        "retry_vals": json.dumps(retry_vals),
+    })
+
+
+def _admission_controlled(
+    view: Callable[Concatenate[HttpRequest, _P], Coroutine[Any, Any, HttpResponse]],
+) -> Callable[Concatenate[HttpRequest, _P], Coroutine[Any, Any, HttpResponse]]:
+    """Run an expensive view under admission control; shed requests get a retry partial."""
+    @wraps(view)
+    async def wrapper(request: HttpRequest, /, *args: _P.args, **kwargs: _P.kwargs) -> HttpResponse:
+        user = await request.auser()
+        try:
+            async with admit(cast(int, user.pk)):
+                return await view(request, *args, **kwargs)
+        except AdmissionRejected as exc:
+            return _busy_response(request, exc)
+    return wrapper
+
+
+def _busy_response(request: HttpRequest, exc: AdmissionRejected) -> HttpResponse:
+    retry_vals = request.POST.dict()
+    retry_vals.pop("csrfmiddlewaretoken", None)
+    response = HttpResponse(_busy_html(exc, request.path, retry_vals), status=exc.status)
+    response["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+def _forced(request: HttpRequest) -> bool:
+    return request.POST.get("force") == "1"
+
+
 @require_POST
 @login_required
-def parcel_analyze(request: HttpRequest, pk: int) -> HttpResponse:
-    parcel = get_object_or_404(Parcel, pk=pk, user=request.user)
+@_admission_controlled
+async def parcel_analyze(request: HttpRequest, pk: int) -> HttpResponse:
+    parcel = await aget_object_or_404(Parcel, pk=pk, user=await request.auser())
 
     if parcel.latitude is None or parcel.longitude is None:
         return render(request, "parcels/partials/analysis_error.html", {
@@ -159,23 +286,26 @@ def parcel_analyze(request: HttpRequest, pk: int) -> HttpResponse:
             "parcel": parcel,
         })
 
+    if is_analysis_current(parcel) and not _forced(request):
+        return render(request, "parcels/partials/analysis_result.html", {"parcel": parcel})
+
     try:
-        climate_zone = get_koppen_zone(parcel.latitude, parcel.longitude)
+        await asyncio.to_thread(apply_climate, parcel, parcel.latitude, parcel.longitude)
     except KoppenError as exc:
         return render(request, "parcels/partials/analysis_error.html", {
             "error": str(exc),
             "parcel": parcel,
         })
 
-    parcel.climate_zone = climate_zone
-    parcel.save()
+    await parcel.asave()
     return render(request, "parcels/partials/analysis_result.html", {"parcel": parcel})
 
 
 @require_POST
 @login_required
-def parcel_soil_analyze(request: HttpRequest, pk: int) -> HttpResponse:
-    parcel = get_object_or_404(Parcel, pk=pk, user=request.user)
+@_admission_controlled
+async def parcel_soil_analyze(request: HttpRequest, pk: int) -> HttpResponse:
+    parcel = await aget_object_or_404(Parcel, pk=pk, user=await request.auser())
 
     if parcel.latitude is None or parcel.longitude is None:
         return render(request, "parcels/partials/soil_error.html", {
@@ -183,23 +313,23 @@ def parcel_soil_analyze(request: HttpRequest, pk: int) -> HttpResponse:
             "parcel": parcel,
         })
 
+    if is_analysis_current(parcel) and not _forced(request):
+        return render(request, "parcels/partials/soil_result.html", {
+            "parcel": parcel,
+            "approximate": parcel.soil_approximate,
+            "source": parcel.soil_source,
+        })
+
     try:
-        soil_data = get_soil_data(parcel.latitude, parcel.longitude)
-        source = "measured"
-    except SoilGridsError:
-        try:
-            soil_data = get_geology_soil_data(parcel.latitude, parcel.longitude)
-            source = "inferred"
-        except MacrostratError:
-            return render(request, "parcels/partials/soil_error.html", {
-                "error": "We couldn't reach our soil data source.",
-                "parcel": parcel,
-            })
-
-    parcel.soil_ph = soil_data.ph
-    parcel.soil_drainage = soil_data.drainage
-    parcel.soil_source = source
-    parcel.save()
+        soil_data, source = await asyncio.to_thread(in_worker, fetch_soil, parcel.latitude, parcel.longitude)
+    except MacrostratError:
+        return render(request, "parcels/partials/soil_error.html", {
+            "error": "We couldn't reach our soil data source.",
+            "parcel": parcel,
+        })
+
+    apply_soil(parcel, soil_data, source)
+    await parcel.asave()
     return render(request, "parcels/partials/soil_result.html", {
         "parcel": parcel,
         "approximate": soil_data.approximate,
@@ -209,8 +339,15 @@ def parcel_soil_analyze(request: HttpRequest, pk: int) -> HttpResponse:
 
 @require_POST
 @login_required
-def parcel_full_analyze(request: HttpRequest, pk: int) -> HttpResponse:
-    parcel = get_object_or_404(Parcel, pk=pk, user=request.user)
+async def parcel_full_analyze(request: HttpRequest, pk: int) -> HttpResponse:
+    """Analyze climate and soil; the only entry point that starts or forces a run.
+
+    With ``stream=1`` under ASGI the run continues in the background and the
+    response is the partial whose SSE stream follows it. WSGI servers buffer
+    streamed responses to the end, so there the finished profile is returned.
+    """
+    user = await request.auser()
+    parcel = await aget_object_or_404(Parcel, pk=pk, user=user)
 
     if parcel.latitude is None or parcel.longitude is None:
         return render(request, "parcels/partials/analysis_error.html", {
@@ -218,33 +355,251 @@ def parcel_full_analyze(request: HttpRequest, pk: int) -> HttpResponse:
             "parcel": parcel,
         })
 
+    if is_analysis_current(parcel) and not _forced(request):
+        return render(request, "parcels/partials/profile.html", {"parcel": parcel})
+    if settings.ANALYSIS_BACKGROUND:
+        await sync_to_async(enqueue_analysis)(parcel)
+        return render(request, "parcels/partials/analysis_pending.html", {"parcel": parcel})
+
+    lat, lon = parcel.latitude, parcel.longitude
     try:
-        climate_zone = get_koppen_zone(parcel.latitude, parcel.longitude)
-        parcel.climate_zone = climate_zone
-    except KoppenError:
-        return render(request, "parcels/partials/analysis_error.html", {
+        if request.POST.get("stream") == "1" and isinstance(request, ASGIRequest):
+            await _start_streamed_analysis(parcel, lat, lon, cast(int, user.pk))
+            return render(request, "parcels/partials/analysis_stream.html", {"parcel": parcel})
+        async with admit(cast(int, user.pk)):
+            template, context = await single_flight(
+                _analysis_key(parcel), lambda waited: _full_analysis(parcel, lat, lon, waited),
+            )
+    except AdmissionRejected as exc:
+        return _busy_response(request, exc)
+    return render(request, template, context)
+
+
+def _analysis_key(parcel: Parcel) -> str:
+    """Single-flight key shared by streamed and plain runs for the parcel at its location."""
+    return f"parcel-analysis:{parcel.pk}:{location_fingerprint(parcel)}"
+
+
+async def _full_analysis(
+    parcel: Parcel, lat: float, lon: float, waited: bool,
+) -> tuple[str, dict[str, object]]:
+    """Analyze and save the parcel; returns the partial and context to render."""
+    if waited:
+        # Another process just analyzed this location; reuse what it stored.
+        await parcel.arefresh_from_db()
+        if parcel.climate_zone:
+            return "parcels/partials/profile.html", {"parcel": parcel}
+
+    # The raster lookup and the soil chain block on I/O, so both run in
+    # threads and the request takes as long as the slower of the two.
+    climate, soil = await asyncio.gather(
+        asyncio.to_thread(apply_climate, parcel, lat, lon),
+        asyncio.to_thread(in_worker, fetch_soil, lat, lon),
+        return_exceptions=True,
+    )
+    if isinstance(climate, KoppenError):
+        return "parcels/partials/analysis_error.html", {
             "error": "Could not determine climate zone for this location.",
             "parcel": parcel,
-        })
+        }
+    if isinstance(climate, BaseException):
+        raise climate
+    if isinstance(soil, BaseException) and not isinstance(soil, MacrostratError):
+        raise soil
+    if not isinstance(soil, BaseException):
+        apply_soil(parcel, *soil)
 
-    try:
-        soil_data = get_soil_data(parcel.latitude, parcel.longitude)
-        parcel.soil_ph = soil_data.ph
-        parcel.soil_drainage = soil_data.drainage
-        parcel.soil_source = "measured"
-    except SoilGridsError:
+    record_fingerprint(parcel)
+    await parcel.asave()
+    return "parcels/partials/profile.html", {"parcel": parcel}
+
+
+def _sse_event(event: str, html: str) -> str:
+    data = "\n".join(f"data: {line}" for line in html.splitlines())
+    return f"event: {event}\n{data}\n\n"
+
+
+class _StreamedRun:
+    """Events of an analysis started by a POST, replayed to every SSE stream that follows it."""
+
+    def __init__(self) -> None:
+        self.events: list[tuple[str, str]] = []
+        self.finished = False
+
+    def emit(self, event: str, html: str) -> None:
+        self.events.append((event, html))
+
+
+# Runs on this process's event loop (streaming requires ASGI), by analysis key.
+_streamed_runs: dict[str, _StreamedRun] = {}
+_streamed_tasks: set[asyncio.Task[None]] = set()
+
+
+def _forget_streamed_run(key: str, run: _StreamedRun) -> None:
+    if _streamed_runs.get(key) is run:
+        del _streamed_runs[key]
+
+
+async def _start_streamed_analysis(parcel: Parcel, lat: float, lon: float, user_id: int) -> None:
+    """Start the parcel's analysis in the background, or join the one already streaming.
+
+    The run holds an admission slot for as long as it lasts; raises
+    AdmissionRejected when it is shed before starting.
+    """
+    key = _analysis_key(parcel)
+    current = _streamed_runs.get(key)
+    if current is not None and not current.finished:
+        return
+    run = _streamed_runs[key] = _StreamedRun()
+    loop = asyncio.get_running_loop()
+    admitted: asyncio.Future[None] = loop.create_future()
+
+    async def compute(waited: bool) -> tuple[str, dict[str, object]]:
+        if waited:
+            # Another process just analyzed this location; reuse what it stored.
+            await parcel.arefresh_from_db()
+            if parcel.climate_zone:
+                return "parcels/partials/profile.html", {"parcel": parcel}
+        return await _staged_analysis(parcel, lat, lon, run.emit)
+
+    async def analyze() -> None:
         try:
-            soil_data = get_geology_soil_data(parcel.latitude, parcel.longitude)
-            parcel.soil_ph = soil_data.ph
-            parcel.soil_drainage = soil_data.drainage
-            parcel.soil_source = "inferred"
+            async with admit(user_id):
+                admitted.set_result(None)
+                template, context = await single_flight(key, compute)
+            run.emit("done", render_to_string(template, context))
+        except AdmissionRejected as exc:
+            admitted.set_exception(exc)
+        except Exception:
+            run.emit("done", render_to_string("parcels/partials/analysis_error.html", {
+                "error": ANALYSIS_FAILED, "parcel": parcel,
+            }))
+            raise
+        finally:
+            run.finished = True
+            # Kept a little longer for a stream that connects after a quick run ended.
+            loop.call_later(STREAM_REPLAY_SECONDS, _forget_streamed_run, key, run)
+
+    # Held here so the running task is not garbage-collected once the POST returns.
+    task = asyncio.ensure_future(analyze())
+    _streamed_tasks.add(task)
+    task.add_done_callback(_streamed_tasks.discard)
+    await admitted
+
+
+async def _analysis_events(parcel: Parcel) -> AsyncIterator[str]:
+    """Follow the run the POST started, ending with ``done``; never starts one itself.
+
+    A stream with no run on this process waits for one in flight elsewhere,
+    then sends whatever profile is stored.
+    """
+    key = _analysis_key(parcel)
+    run = _streamed_runs.get(key)
+    if run is None:
+        await wait_for_flight(key)
+    else:
+        sent = 0
+        while not (run.finished and sent == len(run.events)):
+            if sent == len(run.events):
+                await asyncio.sleep(STREAM_POLL_SECONDS)
+                continue
+            event, html = run.events[sent]
+            sent += 1
+            yield _sse_event(event, html)
+            if event == "done":
+                return
+    await parcel.arefresh_from_db()
+    if parcel.climate_zone:
+        yield _sse_event("done", render_to_string("parcels/partials/profile.html", {"parcel": parcel}))
+    else:
+        yield _sse_event("done", render_to_string("parcels/partials/analysis_error.html", {
+            "error": ANALYSIS_FAILED, "parcel": parcel,
+        }))
+
+
+async def _staged_analysis(
+    parcel: Parcel, lat: float, lon: float, emit: Callable[[str, str], None],
+) -> tuple[str, dict[str, object]]:
+    """Analyze and save the parcel, emitting each stage's partial the moment it completes.
+
+    Climate and soil run concurrently, with a ``notice`` when soil falls back
+    to geology. Returns the final partial and context, like _full_analysis.
+    """
+    loop = asyncio.get_running_loop()
+    notice = render_to_string("parcels/partials/soil_fallback_notice.html")
+    climate_failed = False
+
+    async def climate_stage() -> None:
+        nonlocal climate_failed
+        try:
+            await asyncio.to_thread(apply_climate, parcel, lat, lon)
+        except KoppenError:
+            climate_failed = True
+        emit("climate", render_to_string("parcels/partials/profile_climate.html", {
+            "parcel": parcel,
+            "climate_error": climate_failed,
+        }))
+
+    def on_fallback() -> None:
+        loop.call_soon_threadsafe(emit, "notice", notice)
+
+    async def soil_stage() -> None:
+        try:
+            soil_data, source = await asyncio.to_thread(in_worker, fetch_soil, lat, lon, on_fallback=on_fallback)
         except MacrostratError:
-            pass
+            html = render_to_string("parcels/partials/profile_soil.html", {"parcel": parcel, "soil_unavailable": True})
+        else:
+            apply_soil(parcel, soil_data, source)
+            html = render_to_string("parcels/partials/profile_soil.html", {"parcel": parcel})
+        emit("soil", html)
+
+    await asyncio.gather(climate_stage(), soil_stage())
+    if climate_failed:
+        return "parcels/partials/analysis_error.html", {
+            "error": "Could not determine climate zone for this location.",
+            "parcel": parcel,
+        }
+    record_fingerprint(parcel)
+    await parcel.asave()
+    return "parcels/partials/profile.html", {"parcel": parcel}
 
-    parcel.save()
+
+@require_GET
+@login_required
+async def parcel_analysis_stream(request: HttpRequest, pk: int) -> HttpResponseBase:
+    parcel = await aget_object_or_404(Parcel, pk=pk, user=await request.auser())
+    if parcel.latitude is None or parcel.longitude is None:
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(_analysis_events(parcel), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream into one response.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@require_GET
+@login_required
+def parcel_analysis_status(request: HttpRequest, pk: int) -> HttpResponse:
+    parcel = get_object_or_404(Parcel, pk=pk, user=request.user)
+    job = parcel.analysis_jobs.order_by("-created_at").first()
+    if job is not None and is_retrying_soil(job):
+        return render(request, "parcels/partials/analysis_soil_retry.html", {"parcel": parcel})
+    if job is not None and job.status in ACTIVE_STATUSES:
+        return render(request, "parcels/partials/analysis_pending.html", {"parcel": parcel})
+    if job is not None and job.status == AnalysisJob.Status.FAILED:
+        return render(request, "parcels/partials/analysis_error.html", {
+            "error": "Could not determine climate zone for this location." if failed_on_climate(job) else ANALYSIS_FAILED,
+            "parcel": parcel,
+        })
     return render(request, "parcels/partials/profile.html", {"parcel": parcel})
 
 
+@require_GET
+@staff_member_required
+def analysis_metrics(request: HttpRequest) -> JsonResponse:
+    return JsonResponse({"admission": admission_stats()._asdict()})
+
+
 @require_POST
 @login_required
 def parcel_soil_skip(request: HttpRequest, pk: int) -> HttpResponse:
@@ -92,4 +92,50 @@ LOGIN_REDIRECT_URL = "/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+HTTP_USER_AGENT = os.environ.get("HTTP_USER_AGENT", "TreeManagerApp/1.0")
+HTTP_MAX_CONNECTIONS_PER_UPSTREAM = int(os.environ.get("HTTP_MAX_CONNECTIONS_PER_UPSTREAM", "10"))
+
+GEOCODE_CACHE_TTL_SECONDS = int(os.environ.get("GEOCODE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# How long a geocode request may queue for a Nominatim slot before giving up.
+NOMINATIM_MAX_WAIT_SECONDS = float(os.environ.get("NOMINATIM_MAX_WAIT_SECONDS", "5"))
+
+GAZETTEER_PATH = BASE_DIR / "data" / "gazetteer" / "cities500.txt"
+# Prebuilt by scripts/build_gazetteer_index.py; used when it matches GAZETTEER_PATH.
+GAZETTEER_INDEX_PATH = BASE_DIR / "data" / "gazetteer" / "cities500_index.npz"
+GAZETTEER_REVERSE_MAX_KM = float(os.environ.get("GAZETTEER_REVERSE_MAX_KM", "25"))
+SUGGESTIONS_MIN_CHARS = 3
+SUGGESTIONS_REFRESH_SECONDS = 300
+
 KOPPEN_GEOTIFF_PATH = BASE_DIR / "data" / "koppen" / "koppen_geiger_0p00833333.tif"
+KOPPEN_GRID_PATH = BASE_DIR / "data" / "koppen" / "koppen_grid.npy"
+KOPPEN_RASTER_POOL_SIZE = int(os.environ.get("KOPPEN_RASTER_POOL_SIZE", "4"))
+
+# "coverage" fetches one WCS box per property for nearby fallback; "offsets"
+# probes 12 fixed nearby points through the REST API.
+SOILGRIDS_NEARBY_MODE = os.environ.get("SOILGRIDS_NEARBY_MODE", "coverage")
+SOILGRIDS_RASTER_DIR = BASE_DIR / "data" / "soilgrids"
+SOILGRIDS_RASTER_POOL_SIZE = int(os.environ.get("SOILGRIDS_RASTER_POOL_SIZE", "4"))
+SOILGRIDS_CACHE_TTL_SECONDS = int(os.environ.get("SOILGRIDS_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# Hard upper bound for a soil lookup, SoilGrids and the Macrostrat fallback together.
+SOIL_LOOKUP_DEADLINE_SECONDS = float(os.environ.get("SOIL_LOOKUP_DEADLINE_SECONDS", "20"))
+# Start Macrostrat in parallel once SoilGrids has been pending this long (its
+# p95 latency); empty disables hedging.
+_soil_hedge_after = os.environ.get("SOIL_HEDGE_AFTER_SECONDS", "3")
+SOIL_HEDGE_AFTER_SECONDS = float(_soil_hedge_after) if _soil_hedge_after else None
+
+# Run full analyses on the `run_analysis_worker` process instead of in the request.
+ANALYSIS_BACKGROUND = os.environ.get("ANALYSIS_BACKGROUND", "") == "1"
+ANALYSIS_WORKER_CONCURRENCY = int(os.environ.get("ANALYSIS_WORKER_CONCURRENCY", "4"))
+ANALYSIS_WORKER_POLL_SECONDS = 1.0
+ANALYSIS_JOB_MAX_ATTEMPTS = 5
+ANALYSIS_JOB_RETRY_BASE_SECONDS = 30.0
+# A running job whose worker died is picked up again after this long.
+ANALYSIS_JOB_LEASE_SECONDS = 300
+
+# Admission control for the analysis endpoints, per process. Requests beyond
+# the queue or the per-user limit get a retry partial with Retry-After.
+ANALYSIS_MAX_CONCURRENT = int(os.environ.get("ANALYSIS_MAX_CONCURRENT", "8"))
+ANALYSIS_MAX_QUEUED = int(os.environ.get("ANALYSIS_MAX_QUEUED", "16"))
+ANALYSIS_MAX_PER_USER = int(os.environ.get("ANALYSIS_MAX_PER_USER", "2"))
+ANALYSIS_QUEUE_TIMEOUT_SECONDS = 5.0
+ANALYSIS_RETRY_AFTER_SECONDS = 10
@@ -1,6 +1,8 @@
 import pytest
 from django.contrib.auth import get_user_model
 
+import apps.parcels.services.gazetteer as gazetteer_module
+
 
 @pytest.fixture
 def user_data():
@@ -19,3 +21,27 @@ def user(db):
         email="test@example.com",
         password="SecurePass123!",
     )
+
+
+# geonameid, name, asciiname, alternatenames, lat, lon, class, code, country, cc2,
+# admin1-4, population, elevation, dem, timezone, modified
+GEONAMES_ROWS = [
+    ("2988507", "Paris", "Paris", "", "48.85341", "2.3488", "P", "PPLC", "FR", "", "11", "75", "", "", "2138551", "", "42", "Europe/Paris", "2024-01-01"),
+    ("4717560", "Paris", "Paris", "", "33.66094", "-95.55551", "P", "PPLA2", "US", "", "TX", "277", "", "", "24171", "", "183", "America/Chicago", "2024-01-01"),
+    ("2996944", "Lyon", "Lyon", "", "45.74846", "4.84671", "P", "PPLA", "FR", "", "84", "69", "", "", "522969", "", "174", "Europe/Paris", "2024-01-01"),
+    ("2972315", "Toulouse", "Toulouse", "", "43.60426", "1.44367", "P", "PPLA", "FR", "", "76", "31", "", "", "493465", "", "150", "Europe/Paris", "2024-01-01"),
+    ("2950159", "Berlin", "Berlin", "", "52.52437", "13.41053", "P", "PPLC", "DE", "", "16", "00", "", "", "3426354", "", "74", "Europe/Berlin", "2024-01-01"),
+    ("3060972", "Bratislava", "Bratislava", "", "48.14816", "17.10674", "P", "PPLC", "SK", "", "02", "", "", "", "423737", "", "139", "Europe/Bratislava", "2024-01-01"),
+    ("2643743", "Zürich", "Zurich", "", "47.36667", "8.55", "P", "PPLA", "CH", "", "ZH", "", "", "", "341730", "", "429", "Europe/Zurich", "2024-01-01"),
+]
+
+
+@pytest.fixture
+def gazetteer_file(tmp_path, settings):
+    path = tmp_path / "cities500.txt"
+    path.write_text("".join("\t".join(row) + "\n" for row in GEONAMES_ROWS), encoding="utf-8")
+    settings.GAZETTEER_PATH = path
+    settings.GAZETTEER_INDEX_PATH = tmp_path / "cities500_index.npz"
+    gazetteer_module._gazetteer = None
+    yield path
+    gazetteer_module._gazetteer = None
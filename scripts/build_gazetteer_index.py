@@ -0,0 +1,36 @@
+"""Prebuild the gazetteer search index so web workers load it instead of building it.
+
+Writes data/gazetteer/cities500_index.npz (name keys, trigram postings and the
+k-d tree as plain arrays) tagged with the source file's mtime; get_gazetteer()
+falls back to building in-process when it is missing or stale. Run after
+scripts/download_gazetteer.py and again whenever cities500.txt is replaced:
+
+    uv run python -m scripts.build_gazetteer_index
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from apps.parcels.services.gazetteer import Gazetteer
+from scripts.download_gazetteer import OUTPUT_DIR, OUTPUT_FILE
+
+INDEX_FILE = OUTPUT_DIR / "cities500_index.npz"
+
+
+def build_index(source: Path = OUTPUT_FILE, index_path: Path = INDEX_FILE) -> None:
+    mtime_ns = source.stat().st_mtime_ns
+    gazetteer = Gazetteer.from_tsv(source)
+    # Written aside and swapped in, so a worker never loads a half-written index.
+    partial = index_path.with_name(f"{index_path.stem}.tmp.npz")
+    gazetteer.save(partial, mtime_ns)
+    os.replace(partial, index_path)
+
+
+if __name__ == "__main__":
+    if not OUTPUT_FILE.exists():
+        print(f"Gazetteer not found: {OUTPUT_FILE}\nRun scripts/download_gazetteer.py first.")
+    else:
+        print(f"Building {INDEX_FILE}...")
+        build_index()
+        print(f"Done: {INDEX_FILE}")
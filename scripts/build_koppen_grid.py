@@ -0,0 +1,190 @@
+"""Stack the Köppen GeoTIFFs into a raw uint8 grid that workers can memory-map.
+
+Writes data/koppen/koppen_grid.npy with shape (rows, cols, periods), so one
+indexed read returns every period for a pixel. A koppen_grid.json sidecar holds
+the affine transform and period labels, next to a nearest-valid-pixel index for
+nodata pixels close to land (coasts, lakes). Run after scripts/download_koppen.py
+and again whenever the GeoTIFFs are replaced:
+
+    uv run python -m scripts.build_koppen_grid
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import rasterio
+import rasterio.windows
+
+from scripts.download_koppen import OUTPUT_DIR, PERIOD_FILES
+
+GRID_FILE = OUTPUT_DIR / "koppen_grid.npy"
+
+ROWS_PER_STRIP = 1024
+# ~9 km at the 30 arc-second resolution of the Beck et al. grid.
+NEAREST_RADIUS_PIXELS = 10
+
+
+def _offsets_by_distance(radius: int) -> npt.NDArray[np.int64]:
+    span = np.arange(-radius, radius + 1)
+    row_offsets, col_offsets = (axis.ravel() for axis in np.meshgrid(span, span, indexing="ij"))
+    distances = row_offsets**2 + col_offsets**2
+    keep = (distances > 0) & (distances <= radius**2)
+    order = np.argsort(distances[keep], kind="stable")
+    return np.column_stack([row_offsets[keep], col_offsets[keep]])[order]
+
+
+def _near_valid(valid: npt.NDArray[np.bool_], radius: int) -> npt.NDArray[np.bool_]:
+    """True where any valid pixel lies in the surrounding (2r+1)² square."""
+    padded = np.pad(valid.astype(np.int32), radius + 1)
+    summed = padded.cumsum(axis=0).cumsum(axis=1)
+    size = 2 * radius + 1
+    box = summed[size:, size:] - summed[:-size, size:] - summed[size:, :-size] + summed[:-size, :-size]
+    return np.asarray(box[: valid.shape[0], : valid.shape[1]] > 0, dtype=np.bool_)
+
+
+def dataset_version(period_files: dict[str, Path]) -> str:
+    """Hash of the periods and their source GeoTIFFs; stored analyses record it."""
+    sources = [
+        [label, path.name, path.stat().st_size, path.stat().st_mtime_ns]
+        for label, path in period_files.items()
+    ]
+    payload = json.dumps([sources, NEAREST_RADIUS_PIXELS])
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def build_nearest_index(
+    grid: npt.NDArray[np.uint8], radius: int = NEAREST_RADIUS_PIXELS,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int8]]:
+    """Find the nearest valid pixel for every nodata pixel within ``radius``.
+
+    Returns flat pixel indices (sorted) and matching (row, col) offsets. Offsets
+    are tried in order of increasing distance, so the first hit is the nearest.
+    """
+    height, width = grid.shape
+    offsets = _offsets_by_distance(radius)
+    pixel_chunks: list[npt.NDArray[np.int64]] = []
+    offset_chunks: list[npt.NDArray[np.int8]] = []
+
+    for row_off in range(0, height, ROWS_PER_STRIP):
+        halo_start = max(row_off - radius, 0)
+        halo_stop = min(row_off + ROWS_PER_STRIP + radius, height)
+        valid = np.asarray(grid[halo_start:halo_stop]) != 0
+        core_start = row_off - halo_start
+        core_stop = core_start + min(ROWS_PER_STRIP, height - row_off)
+
+        candidates = ~valid & _near_valid(valid, radius)
+        candidates[:core_start] = False
+        candidates[core_stop:] = False
+        rows, cols = np.nonzero(candidates)
+        found = np.zeros((len(rows), 2), dtype=np.int8)
+        unresolved = np.ones(len(rows), dtype=np.bool_)
+
+        for row_offset, col_offset in offsets:
+            pending = np.flatnonzero(unresolved)
+            if pending.size == 0:
+                break
+            target_rows = rows[pending] + row_offset
+            target_cols = cols[pending] + col_offset
+            in_bounds = (
+                (target_rows >= 0) & (target_rows < valid.shape[0])
+                & (target_cols >= 0) & (target_cols < width)
+            )
+            hits = np.zeros(pending.size, dtype=np.bool_)
+            hits[in_bounds] = valid[target_rows[in_bounds], target_cols[in_bounds]]
+            found[pending[hits]] = (row_offset, col_offset)
+            unresolved[pending[hits]] = False
+
+        resolved = ~unresolved
+        pixel_chunks.append((rows[resolved] + halo_start).astype(np.int64) * width + cols[resolved])
+        offset_chunks.append(found[resolved])
+
+    return np.concatenate(pixel_chunks), np.concatenate(offset_chunks)
+
+
+def build_grid(period_files: dict[str, Path], grid_path: Path) -> None:
+    """Stack band 1 of each period's GeoTIFF into a .npy grid with sidecar and nearest index.
+
+    ``period_files`` maps period labels to GeoTIFFs; the first entry is the
+    baseline used for current lookups and the nearest-pixel index.
+    """
+    tmp_grid_path = grid_path.with_name(f"{grid_path.stem}.tmp.npy")
+    sources = [rasterio.open(path) for path in period_files.values()]
+    try:
+        baseline = sources[0]
+        for src in sources[1:]:
+            if src.shape != baseline.shape or src.transform != baseline.transform:
+                raise ValueError(f"{src.name} is not aligned with {baseline.name}")
+
+        grid = np.lib.format.open_memmap(
+            tmp_grid_path, mode="w+", dtype=np.uint8,
+            shape=(baseline.height, baseline.width, len(sources)),
+        )
+        for row_off in range(0, baseline.height, ROWS_PER_STRIP):
+            strip_height = min(ROWS_PER_STRIP, baseline.height - row_off)
+            window = rasterio.windows.Window(0, row_off, baseline.width, strip_height)
+            grid[row_off:row_off + strip_height] = np.stack(
+                [src.read(1, window=window) for src in sources], axis=-1,
+            )
+            print(f"\r  {(row_off + strip_height) * 100 // baseline.height}%", end="", flush=True)
+        print()
+        grid.flush()
+        transform = list(baseline.transform)[:6]
+        shape = [baseline.height, baseline.width]
+    finally:
+        for src in sources:
+            src.close()
+
+    print("Building nearest-valid-pixel index...")
+    nearest_pixels, nearest_offsets = build_nearest_index(grid[:, :, 0])
+    del grid
+    # Running workers map the previous index files, so each build writes new
+    # ones instead of truncating those.
+    build_id = time.time_ns()
+    pixels_name = f"{grid_path.stem}_nearest_pixels.{build_id}.npy"
+    offsets_name = f"{grid_path.stem}_nearest_offsets.{build_id}.npy"
+    np.save(grid_path.with_name(pixels_name), nearest_pixels)
+    np.save(grid_path.with_name(offsets_name), nearest_offsets)
+
+    sidecar_path = grid_path.with_suffix(".json")
+    previous = json.loads(sidecar_path.read_text()) if sidecar_path.exists() else {}
+    sidecar = {
+        "version": dataset_version(period_files),
+        "transform": transform,
+        "shape": shape,
+        "periods": list(period_files),
+        "sources": [path.name for path in period_files.values()],
+        "nearest_pixels": pixels_name,
+        "nearest_offsets": offsets_name,
+        "nearest_radius": NEAREST_RADIUS_PIXELS,
+        # os.replace keeps the mtime, so workers can tell whether the grid
+        # they see is the one this sidecar describes.
+        "grid_mtime_ns": tmp_grid_path.stat().st_mtime_ns,
+    }
+    tmp_sidecar_path = sidecar_path.with_name(f"{sidecar_path.stem}.tmp.json")
+    tmp_sidecar_path.write_text(json.dumps(sidecar))
+    os.replace(tmp_sidecar_path, sidecar_path)
+    # Workers reload when the grid's mtime changes, so it is swapped in last
+    # and never mapped half-written.
+    os.replace(tmp_grid_path, grid_path)
+
+    # Workers still mapping the old index keep it until they reload.
+    for key in ("nearest_pixels", "nearest_offsets"):
+        if previous.get(key) and previous[key] != sidecar[key]:
+            grid_path.with_name(previous[key]).unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    period_files = {label: output for label, (_, output) in PERIOD_FILES.items()}
+    missing = [path for path in period_files.values() if not path.exists()]
+    if missing:
+        print(f"GeoTIFF not found: {missing[0]}\nRun scripts/download_koppen.py first.")
+    else:
+        print(f"Building {GRID_FILE} from {len(period_files)} periods...")
+        build_grid(period_files, GRID_FILE)
+        print(f"Done: {GRID_FILE}")
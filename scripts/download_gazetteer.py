@@ -0,0 +1,51 @@
+"""Download the GeoNames cities500 gazetteer to data/gazetteer/ for offline geocoding.
+
+Every populated place with at least 500 inhabitants, one tab-separated line
+each. get_gazetteer() loads it on first use and reloads when it changes; run
+scripts/build_gazetteer_index.py afterwards so workers skip building the index.
+
+Source: https://download.geonames.org/export/dump/ (CC BY 4.0)
+"""
+from __future__ import annotations
+
+import shutil
+import zipfile
+from pathlib import Path
+
+import httpx
+
+DOWNLOAD_URL = "https://download.geonames.org/export/dump/cities500.zip"
+FILE_IN_ZIP = "cities500.txt"
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent / "data" / "gazetteer"
+OUTPUT_FILE = OUTPUT_DIR / FILE_IN_ZIP
+
+
+def download() -> None:
+    if OUTPUT_FILE.exists():
+        print(f"File already exists: {OUTPUT_FILE}")
+        return
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    zip_path = OUTPUT_DIR / "cities500.zip"
+
+    print(f"Downloading {DOWNLOAD_URL}...")
+    try:
+        with httpx.stream("GET", DOWNLOAD_URL, follow_redirects=True, timeout=600) as response:
+            response.raise_for_status()
+            with open(zip_path, "wb") as file:
+                for chunk in response.iter_bytes(chunk_size=8192):
+                    file.write(chunk)
+    except httpx.HTTPError as exc:
+        zip_path.unlink(missing_ok=True)
+        print(f"Download failed: {exc}")
+        return
+
+    with zipfile.ZipFile(zip_path) as zf, zf.open(FILE_IN_ZIP) as src, open(OUTPUT_FILE, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    zip_path.unlink()
+    print(f"Done: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    download()
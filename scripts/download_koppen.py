@@ -1,9 +1,13 @@
-"""Download the Beck et al. (2023) Köppen-Geiger GeoTIFF to data/koppen/.
+"""Download the Beck et al. (2023) Köppen-Geiger GeoTIFFs to data/koppen/.
+
+Extracts the 1991-2020 baseline plus the 2041-2070 and 2071-2099 projections
+for one emissions scenario.
 
 Source: https://figshare.com/articles/dataset/High-resolution_1_km_K_ppen-Geiger_maps_for_1901_2099_based_on_constrained_CMIP6_projections/21789074
 """
 from __future__ import annotations
 
+import shutil
 import zipfile
 from pathlib import Path
 
@@ -13,16 +17,37 @@ ARTICLE_ID = "21789074"
 API_URL = f"https://api.figshare.com/v2/articles/{ARTICLE_ID}/files"
 ZIP_NAME = "koppen_geiger_tif.zip"
 GEOTIFF_IN_ZIP = "koppen_geiger_tif/1991_2020/koppen_geiger_0p00833333.tif"
+SCENARIO = "ssp245"
+SCENARIO_LABEL = "SSP2-4.5"
 
 OUTPUT_DIR = Path(__file__).resolve().parent.parent / "data" / "koppen"
 OUTPUT_FILE = OUTPUT_DIR / "koppen_geiger_0p00833333.tif"
 
+# Period label -> (path inside the zip, extracted file). The baseline comes first.
+PERIOD_FILES: dict[str, tuple[str, Path]] = {
+    "1991-2020": (GEOTIFF_IN_ZIP, OUTPUT_FILE),
+    f"2041-2070 ({SCENARIO_LABEL})": (
+        f"koppen_geiger_tif/2041_2070/{SCENARIO}/koppen_geiger_0p00833333.tif",
+        OUTPUT_DIR / f"koppen_geiger_2041_2070_{SCENARIO}_0p00833333.tif",
+    ),
+    f"2071-2099 ({SCENARIO_LABEL})": (
+        f"koppen_geiger_tif/2071_2099/{SCENARIO}/koppen_geiger_0p00833333.tif",
+        OUTPUT_DIR / f"koppen_geiger_2071_2099_{SCENARIO}_0p00833333.tif",
+    ),
+}
+
 MANUAL_URL = (
     "https://figshare.com/articles/dataset/"
     "High-resolution_1_km_K_ppen-Geiger_maps_for_1901_2099_based_on_constrained_CMIP6_projections/21789074"
 )
 
 
+def _print_manual_extract_hint() -> None:
+    print(f"\nDownload manually from:\n  {MANUAL_URL}")
+    for member, output in PERIOD_FILES.values():
+        print(f"Then extract '{member}' to:\n  {output}")
+
+
 def _get_download_url() -> str:
     """Resolve the download URL for the GeoTIFF zip via figshare API."""
     response = httpx.get(API_URL, timeout=30)
@@ -34,8 +59,8 @@ def _get_download_url() -> str:
 
 
 def download() -> None:
-    if OUTPUT_FILE.exists():
-        print(f"File already exists: {OUTPUT_FILE}")
+    if all(output.exists() for _, output in PERIOD_FILES.values()):
+        print(f"Files already exist in: {OUTPUT_DIR}")
         return
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -46,8 +71,7 @@ def download() -> None:
         url = _get_download_url()
     except (httpx.HTTPError, RuntimeError) as exc:
         print(f"Failed to resolve download URL: {exc}")
-        print(f"\nDownload manually from:\n  {MANUAL_URL}")
-        print(f"Then extract '{GEOTIFF_IN_ZIP}' to:\n  {OUTPUT_FILE}")
+        _print_manual_extract_hint()
         return
 
     print(f"Downloading {ZIP_NAME}...")
@@ -67,17 +91,18 @@ def download() -> None:
     except httpx.HTTPError as exc:
         zip_path.unlink(missing_ok=True)
         print(f"Download failed: {exc}")
-        print(f"\nDownload manually from:\n  {MANUAL_URL}")
-        print(f"Then extract '{GEOTIFF_IN_ZIP}' to:\n  {OUTPUT_FILE}")
+        _print_manual_extract_hint()
         return
 
-    print("Extracting GeoTIFF...")
+    print("Extracting GeoTIFFs...")
     with zipfile.ZipFile(zip_path) as zf:
-        with zf.open(GEOTIFF_IN_ZIP) as src, open(OUTPUT_FILE, "wb") as dst:
-            dst.write(src.read())
+        for member, output in PERIOD_FILES.values():
+            with zf.open(member) as src, open(output, "wb") as dst:
+                shutil.copyfileobj(src, dst)
 
     zip_path.unlink()
-    print(f"Done: {OUTPUT_FILE}")
+    print(f"Done: {', '.join(output.name for _, output in PERIOD_FILES.values())}")
+    print("Run `python -m scripts.build_koppen_grid` to build the memory-mapped lookup grid.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,66 @@
+"""Download regional SoilGrids 0-5cm mean rasters to data/soilgrids/ for offline soil lookups.
+
+Fetches phh2o, clay and sand for a lon/lat bounding box from the ISRIC WCS as
+EPSG:4326 GeoTIFFs, which get_soil_data reads before calling the REST API:
+
+    uv run python -m scripts.download_soilgrids MIN_LON MIN_LAT MAX_LON MAX_LAT
+
+Several regions can be combined by downloading each to its own directory and
+mosaicking them with `gdalbuildvrt data/soilgrids/phh2o_0-5cm_mean.vrt ...`.
+
+Source: https://www.isric.org/explore/soilgrids
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import httpx
+
+WCS_URL = "https://maps.isric.org/mapserv"
+PROPERTIES = ("phh2o", "clay", "sand")
+EPSG_4326 = "http://www.opengis.net/def/crs/EPSG/0/4326"
+# Keep a margin around the region so nearby-data fallback works at its edges.
+MARGIN_DEGREES = 0.25
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent / "data" / "soilgrids"
+
+
+def download(min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> None:
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    for name in PROPERTIES:
+        output = OUTPUT_DIR / f"{name}_0-5cm_mean.tif"
+        params: dict[str, str | list[str]] = {
+            "map": f"/map/{name}.map",
+            "SERVICE": "WCS",
+            "VERSION": "2.0.1",
+            "REQUEST": "GetCoverage",
+            "COVERAGEID": f"{name}_0-5cm_mean",
+            "FORMAT": "GEOTIFF_INT16",
+            "SUBSET": [
+                f"long({min_lon - MARGIN_DEGREES},{max_lon + MARGIN_DEGREES})",
+                f"lat({min_lat - MARGIN_DEGREES},{max_lat + MARGIN_DEGREES})",
+            ],
+            "SUBSETTINGCRS": EPSG_4326,
+            "OUTPUTCRS": EPSG_4326,
+        }
+        print(f"Downloading {output.name}...")
+        try:
+            with httpx.stream("GET", WCS_URL, params=params, timeout=600) as response:
+                response.raise_for_status()
+                tmp_output = output.with_suffix(".tmp")
+                with open(tmp_output, "wb") as file:
+                    for chunk in response.iter_bytes(chunk_size=8192):
+                        file.write(chunk)
+        except httpx.HTTPError as exc:
+            print(f"Download failed: {exc}")
+            return
+        tmp_output.replace(output)
+    print(f"Done: {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print(__doc__)
+        sys.exit(1)
+    download(*(float(arg) for arg in sys.argv[1:]))
@@ -37,6 +37,13 @@
     var lon = event.latlng.lng;
     placeMarker(lat, lon);
     map.setView([lat, lon], Math.max(map.getZoom(), 15));
+    var reverseUrl = mapElement.dataset.reverseGeocodeUrl;
+    if (reverseUrl) {
+      htmx.ajax("GET", reverseUrl + "?lat=" + lat + "&lon=" + lon, {
+        target: "#parcels-reverse-geocode",
+        swap: "innerHTML",
+      });
+    }
   });
 
   document.body.addEventListener("htmx:afterSwap", function (event) {
@@ -48,6 +55,17 @@
     map.setView([lat, lon], 17);
   });
 
+  // Picking a type-ahead suggestion places the marker without a Nominatim call
+  document.body.addEventListener("click", function (event) {
+    var item = event.target.closest("[data-suggestion-lat]");
+    if (!item) return;
+    var lat = parseFloat(item.dataset.suggestionLat);
+    var lon = parseFloat(item.dataset.suggestionLon);
+    placeMarker(lat, lon);
+    map.setView([lat, lon], 15);
+    document.getElementById("parcels-geocode-suggestions").innerHTML = "";
+  });
+
   // Section 3: leaflet-draw polygon drawing
   var drawnItems = new L.FeatureGroup();
   map.addLayer(drawnItems);